@@ -1,24 +1,35 @@
 #!/usr/bin/env python3
 """
 Generate AI study aids for UAV license quiz questions.
-Reads professional.json, calls Claude Haiku API, outputs professional_study_aids.json.
+Reads <bank>.json, calls Claude Haiku API, outputs <bank>_study_aids.json.
+
+Before calling the API, questions that near-duplicate an already-aided question
+of another bank (scripts/images/near_duplicates.py, same correct answer) reuse
+that aid, with option letters remapped; only genuinely new questions are sent.
 
 Usage:
     export ANTHROPIC_API_KEY=sk-ant-...
     uv run generate_study_aids.py
+    uv run generate_study_aids.py --bank general --reuse-only   # free: reuse only, no API calls
 """
 
+import argparse
 import asyncio
 import json
 import os
+import re
 import sys
 from pathlib import Path
 
 import anthropic
 from tqdm import tqdm
 
-INPUT_FILE = Path("public/data/professional.json")
-OUTPUT_FILE = Path("public/data/professional_study_aids.json")
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts" / "images"))
+from near_duplicates import DEFAULT_THRESHOLD, find_matches  # noqa: E402
+from question_bank import BANKS, DATA_DIR, Question, QuestionBank  # noqa: E402
+from telemetry import Telemetry, error_cause  # noqa: E402  (shared with the image scripts)
+
+BANK = "professional"
 CHECKPOINT_EVERY = 50
 CONCURRENCY = 3  # ~9,000 output tokens/min, under the 10,000/min rate limit
 MODEL = "claude-haiku-4-5-20251001"
@@ -54,43 +65,54 @@ TOOL = {
 }
 
 
-def build_prompt(q: dict) -> str:
-    options_text = "\n".join(f"{k}. {v}" for k, v in q["options"].items())
+def build_prompt(q: Question) -> str:
+    options_text = "\n".join(f"{k}. {v}" for k, v in q.options.items())
     return f"""以下是一道選擇題，請產生學習輔助資料。
 
-題目：{q["question"]}
+題目：{q.question}
 
 選項：
 {options_text}
 
-正確答案：{q["answer"]}"""
+正確答案：{q.answer}"""
 
 
 async def generate_aid(
-    client: anthropic.AsyncAnthropic, q: dict, idx: int, semaphore: asyncio.Semaphore
+    client: anthropic.AsyncAnthropic,
+    q: Question,
+    semaphore: asyncio.Semaphore,
+    telemetry: Telemetry,
 ) -> tuple[str, dict]:
-    key = str(idx)  # 0-based array index; q["id"] restarts per chapter so is NOT unique
+    key = str(q.index)  # 0-based array index; q.id restarts per chapter so is NOT unique
     async with semaphore:
         for attempt in range(2):
             try:
-                response = await client.messages.create(
-                    model=MODEL,
-                    max_tokens=800,
-                    system=SYSTEM_PROMPT,
-                    tools=[TOOL],
-                    tool_choice={"type": "tool", "name": "submit_study_aid"},
-                    messages=[{"role": "user", "content": build_prompt(q)}],
-                )
-                aid = response.content[0].input  # guaranteed dict, no json.loads needed
+                with telemetry.request("messages", MODEL, key=key) as span:
+                    # Streaming-response wrapper: headers arrive first, so TTFB is measurable
+                    async with client.messages.with_streaming_response.create(
+                        model=MODEL,
+                        max_tokens=800,
+                        system=SYSTEM_PROMPT,
+                        tools=[TOOL],
+                        tool_choice={"type": "tool", "name": "submit_study_aid"},
+                        messages=[{"role": "user", "content": build_prompt(q)}],
+                    ) as raw:
+                        span.first_byte()
+                        response = await raw.parse()
+                    span.usage(response.usage.input_tokens, response.usage.output_tokens)
+                    aid = response.content[0].input  # guaranteed dict, no json.loads needed
+                    span.output(1)
                 return key, aid
             except anthropic.APIError as e:
                 if attempt == 0:
+                    telemetry.retry(error_cause(e), key, 2)
                     await asyncio.sleep(2)
                     continue
                 print(f"\n[WARN] Question {key} API error: {e}", file=sys.stderr)
                 return key, {}
             except Exception as e:
                 if attempt == 0:
+                    telemetry.retry(error_cause(e), key, 1)
                     await asyncio.sleep(1)
                     continue
                 print(f"\n[WARN] Question {key} unexpected error: {e}", file=sys.stderr)
@@ -98,61 +120,111 @@ async def generate_aid(
     return key, {}
 
 
+_LETTER_REF = re.compile(r"(?<![A-Za-z])[ABCD](?![A-Za-z])")
+
+
+def remap_aid(aid: dict, option_map: dict[str, str | None]) -> dict | None:
+    """The aid with wrong_options re-lettered for the target question; None if that is unsafe."""
+    if all(target == source for target, source in option_map.items()):
+        return dict(aid)
+    if _LETTER_REF.search(aid.get("explanation", "") + aid.get("mnemonic", "")):
+        return None  # prose refers to option letters that would now be wrong
+    to_target = {source: target for target, source in option_map.items() if source}
+    wrong = {to_target[k]: v for k, v in aid.get("wrong_options", {}).items() if k in to_target}
+    return {**aid, "wrong_options": wrong}
+
+
+def reuse_aids(bank: QuestionBank, results: dict, threshold: float) -> dict[str, dict]:
+    """Aids copied from near-duplicate questions of other banks, for questions without one."""
+    sources = [b for b in map(QuestionBank.load, BANKS) if b.bank != bank.bank and b.exists() and b.study_aids]
+    keep = {b.bank: {int(k) for k, v in b.study_aids.items() if v} for b in sources}
+    reused = {}
+    for idx, match in find_matches(bank, sources, threshold, keep).items():
+        if str(idx) in results or not match["answer_consistent"]:
+            continue
+        source = QuestionBank.load(match["bank"])
+        aid = remap_aid(source.study_aids[str(match["index"])], match["option_map"])
+        if aid is not None:
+            aid["reused_from"] = f"{match['bank']}:{match['index']}"
+            aid["similarity"] = match["similarity"]
+            reused[str(idx)] = aid
+    return reused
+
+
+def save_results(results: dict, output_file: Path) -> None:
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
 async def main():
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        print("Error: ANTHROPIC_API_KEY environment variable not set", file=sys.stderr)
+    parser = argparse.ArgumentParser(description="Generate AI study aids")
+    parser.add_argument("--bank", default=BANK, choices=BANKS, help=f"題庫 id（預設 {BANK}）")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help=f"沿用其他題庫學習輔助的相似度下限（預設 {DEFAULT_THRESHOLD}）",
+    )
+    parser.add_argument("--reuse-only", action="store_true", help="只沿用其他題庫的結果，不呼叫 API")
+    args = parser.parse_args()
+
+    bank = QuestionBank.load(args.bank)
+    if not bank.exists():
+        print(f"Error: {bank.path} not found. Run uv run update_question_bank.py first.", file=sys.stderr)
         sys.exit(1)
+    output_file = DATA_DIR / f"{args.bank}_study_aids.json"
 
-    if not INPUT_FILE.exists():
-        print(f"Error: {INPUT_FILE} not found. Run uv run update_question_bank.py first.", file=sys.stderr)
-        sys.exit(1)
+    print(f"Loaded {len(bank)} questions from {bank.path}")
 
-    with open(INPUT_FILE) as f:
-        data = json.load(f)
+    # Resume support: skip already-processed questions
+    existing = bank.study_aids
+    if existing:
+        print(f"Resuming: {len(existing)} already done, {len(bank) - len(existing)} remaining")
+    results = dict(existing)
 
-    questions = data["questions"] if isinstance(data, dict) else data
-    print(f"Loaded {len(questions)} questions from {INPUT_FILE}")
+    reused = reuse_aids(bank, results, args.threshold)
+    if reused:
+        results.update(reused)
+        save_results(results, output_file)
+        print(f"Reused {len(reused)} aids from near-duplicate questions in other banks")
 
-    # Resume support: skip already-processed questions
-    existing: dict = {}
-    if OUTPUT_FILE.exists():
-        with open(OUTPUT_FILE) as f:
-            existing = json.load(f)
-        done_count = len(existing)
-        print(f"Resuming: {done_count} already done, {len(questions) - done_count} remaining")
-
-    pending = [(i, q) for i, q in enumerate(questions) if str(i) not in existing]
+    pending = [q for q in bank if str(q.index) not in results]
     if not pending:
         print("All questions already processed!")
         return
+    if args.reuse_only:
+        print(f"{len(pending)} questions still need the API (run without --reuse-only)")
+        return
+
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("Error: ANTHROPIC_API_KEY environment variable not set", file=sys.stderr)
+        sys.exit(1)
 
     client = anthropic.AsyncAnthropic(api_key=api_key)
     semaphore = asyncio.Semaphore(CONCURRENCY)
-    results = dict(existing)
+    telemetry = Telemetry("study_aids", output_unit="aids")
 
-    tasks = [generate_aid(client, q, i, semaphore) for i, q in pending]
-    completed = 0
+    try:
+        tasks = [generate_aid(client, q, semaphore, telemetry) for q in pending]
+        completed = 0
 
-    with tqdm(total=len(pending), desc="Generating study aids") as pbar:
-        for coro in asyncio.as_completed(tasks):
-            key, aid = await coro
-            results[key] = aid
-            completed += 1
-            pbar.update(1)
+        with tqdm(total=len(pending), desc="Generating study aids") as pbar:
+            for coro in asyncio.as_completed(tasks):
+                key, aid = await coro
+                results[key] = aid
+                completed += 1
+                pbar.update(1)
 
-            if completed % CHECKPOINT_EVERY == 0:
-                OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-                with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
-                tqdm.write(f"  Checkpoint saved ({completed}/{len(pending)})")
+                if completed % CHECKPOINT_EVERY == 0:
+                    save_results(results, output_file)
+                    tqdm.write(f"  Checkpoint saved ({completed}/{len(pending)})")
 
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+        save_results(results, output_file)
 
-    failed = sum(1 for v in results.values() if not v)
-    print(f"\nDone! {len(results)} total ({failed} failed/empty) → {OUTPUT_FILE}")
+        failed = sum(1 for v in results.values() if not v)
+        print(f"\nDone! {len(results)} total ({failed} failed/empty) → {output_file}")
+    finally:
+        telemetry.close()
 
 
 if __name__ == "__main__":
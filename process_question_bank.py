@@ -1,12 +1,186 @@
+import argparse
 import json
 import os
 
-def process_question_bank(input_filename, output_filename):
+READ_CHUNK = 1 << 16   # 串流模式每次讀取的字元數
+OUTPUT_INDENT = 4
+
+
+# --- 共用邏輯：兩種模式都呼叫同一組函式，結果保證一致 ---
+
+def collect_option_sets(questions):
+    """步驟 1：收集「曾是正確答案」與「曾是錯誤選項」的文字集合（可為任何可迭代物件）。"""
+    correct_set = set()   # 曾是正確答案的集合
+    incorrect_set = set() # 曾是錯誤選項的集合
+    count = 0
+
+    for question in questions:
+        ans_key = question.get('answer')      # 例如 "A"
+        options = question.get('options', {}) # 選項 Dict
+
+        # 遍歷該題所有選項
+        for key, opt_text in options.items():
+            clean_text = opt_text.strip()
+
+            if key == ans_key:
+                # 這是正確答案
+                correct_set.add(clean_text)
+            else:
+                # 這是錯誤選項
+                incorrect_set.add(clean_text)
+        count += 1
+
+    return correct_set, incorrect_set, count
+
+
+def annotate(question, final_whitelist_set):
+    """步驟 2：為單題加上 can_memorize_directly 欄位，回傳是否可直接背答案。"""
+    ans_key = question.get('answer')
+    options = question.get('options', {})
+
+    can_memorize = False
+
+    if ans_key and ans_key in options:
+        correct_text = options[ans_key].strip()
+
+        # 只要正確答案在「嚴格白名單」內，就代表此題可無腦背
+        # 因為根據定義，此清單內的文字絕不會是錯誤選項，所以不用擔心選錯。
+        if correct_text in final_whitelist_set:
+            can_memorize = True
+
+    # 新增欄位
+    question['can_memorize_directly'] = can_memorize
+    return can_memorize
+
+
+def print_summary(total, whitelist_size, count_memorizable, output_filename):
+    print("-" * 30)
+    print(f"處理完成！")
+    print(f"總題數: {total}")
+    print(f"白名單答案總數: {whitelist_size}")
+    print(f"可「無腦秒選」的題目數: {count_memorizable}")
+    print(f"需「看題目判斷」的題目數: {total - count_memorizable}")
+    print("-" * 30)
+    print(f"新檔案已儲存為: {output_filename}")
+
+
+# --- 串流模式：逐題解析 JSON 陣列，記憶體用量與題數無關 ---
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """逐一產生頂層 JSON 陣列中的元素，一次只保留一個元素與一小段緩衝。"""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError("輸入資料格式不符，預期為列表 List [...]")
+    pos += 1
+
+    skip_whitespace()
+    if pos < len(buf) and buf[pos] == ']':
+        return
+    while True:
+        skip_whitespace()
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if end == len(buf) and not eof:
+            # 數字等純量可能被切在緩衝區邊界，多讀一段再解析一次
+            fill()
+            continue
+        pos = end
+        yield item
+
+        skip_whitespace()
+        if pos >= len(buf):
+            raise ValueError("JSON 陣列未結束")
+        if buf[pos] == ',':
+            pos += 1
+        elif buf[pos] == ']':
+            return
+        else:
+            raise ValueError(f"JSON 陣列中出現非預期字元 {buf[pos]!r}")
+
+
+def _indented(value, level):
+    """json.dump(indent=4) 在第 level 層輸出 value 時的文字（不含開頭縮排）。"""
+    text = json.dumps(value, ensure_ascii=False, indent=OUTPUT_INDENT)
+    return text.replace('\n', '\n' + ' ' * (OUTPUT_INDENT * level))
+
+
+def process_question_bank_streaming(input_filename, output_filename):
+    """與 process_question_bank 相同的輸出（逐位元組一致），但兩次掃描都以串流進行。"""
+    # 第一次掃描：只保留選項文字集合
+    with open(input_filename, 'r', encoding='utf-8') as f:
+        correct_set, incorrect_set, total = collect_option_sets(iter_json_array(f))
+
+    final_whitelist_set = correct_set - incorrect_set
+    answer_option_whitelist = sorted(final_whitelist_set)
+    del correct_set, incorrect_set
+
+    # 第二次掃描：逐題標註並直接寫出，格式與 json.dump(..., indent=4) 相同
+    count_memorizable = 0
+    pad = ' ' * OUTPUT_INDENT
+    tmp_filename = output_filename + '.tmp'   # 中途失敗時不留下半份輸出
+    with open(input_filename, 'r', encoding='utf-8') as f, \
+            open(tmp_filename, 'w', encoding='utf-8') as out:
+        out.write('{\n')
+        out.write(f'{pad}"answer_option_whitelist": {_indented(answer_option_whitelist, 1)},\n')
+        out.write(f'{pad}"questions": ')
+        first = True
+        for question in iter_json_array(f):
+            if annotate(question, final_whitelist_set):
+                count_memorizable += 1
+            out.write('[\n' if first else ',\n')
+            out.write(pad * 2 + _indented(question, 2))
+            first = False
+        out.write('[]' if first else f'\n{pad}]')
+        out.write('\n}')
+    os.replace(tmp_filename, output_filename)
+
+    print_summary(total, len(answer_option_whitelist), count_memorizable, output_filename)
+
+
+# --- 一般模式：整份載入記憶體 ---
+
+def process_question_bank(input_filename, output_filename, stream=False):
     # 檢查輸入檔案是否存在
     if not os.path.exists(input_filename):
         print(f"錯誤: 找不到檔案 '{input_filename}'")
         return
 
+    if stream:
+        try:
+            process_question_bank_streaming(input_filename, output_filename)
+        except ValueError as e:
+            print(f"錯誤: {e}")
+        except Exception as e:
+            print(f"發生未預期的錯誤: {e}")
+        return
+
     try:
         # 讀取 JSON 檔案
         with open(input_filename, 'r', encoding='utf-8') as f:
@@ -20,54 +194,17 @@ def process_question_bank(input_filename, output_filename):
         # 規則：
         # 1. 曾經是正確答案
         # 2. 且「從未」在其他題目中變成錯誤選項 (誘答)
-        
-        correct_set = set()   # 曾是正確答案的集合
-        incorrect_set = set() # 曾是錯誤選項的集合
-
-        for question in data:
-            ans_key = question.get('answer')      # 例如 "A"
-            options = question.get('options', {}) # 選項 Dict
-            
-            # 遍歷該題所有選項
-            for key, opt_text in options.items():
-                clean_text = opt_text.strip()
-                
-                if key == ans_key:
-                    # 這是正確答案
-                    correct_set.add(clean_text)
-                else:
-                    # 這是錯誤選項
-                    incorrect_set.add(clean_text)
+        correct_set, incorrect_set, _ = collect_option_sets(data)
 
         # 嚴格白名單 = 曾經正確 - 曾經錯誤
         # 也就是說：只要這個選項出現在題目裡，它就一定是正確答案，絕對不會是干擾項。
         final_whitelist_set = correct_set - incorrect_set
-        
+
         # 將 Set 轉為 List 供輸出用
         answer_option_whitelist = sorted(list(final_whitelist_set))
 
         # --- 步驟 2: 逐題標註 ---
-        count_memorizable = 0
-
-        for question in data:
-            ans_key = question.get('answer')
-            options = question.get('options', {})
-            
-            can_memorize = False
-            
-            if ans_key and ans_key in options:
-                correct_text = options[ans_key].strip()
-                
-                # 只要正確答案在「嚴格白名單」內，就代表此題可無腦背
-                # 因為根據定義，此清單內的文字絕不會是錯誤選項，所以不用擔心選錯。
-                if correct_text in final_whitelist_set:
-                    can_memorize = True
-            
-            # 新增欄位
-            question['can_memorize_directly'] = can_memorize
-            
-            if can_memorize:
-                count_memorizable += 1
+        count_memorizable = sum(annotate(question, final_whitelist_set) for question in data)
 
         # --- 步驟 3: 輸出結果 ---
         output_data = {
@@ -76,20 +213,22 @@ def process_question_bank(input_filename, output_filename):
         }
 
         with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=4)
+            json.dump(output_data, f, ensure_ascii=False, indent=OUTPUT_INDENT)
 
-        print("-" * 30)
-        print(f"處理完成！")
-        print(f"總題數: {len(data)}")
-        print(f"白名單答案總數: {len(answer_option_whitelist)}")
-        print(f"可「無腦秒選」的題目數: {count_memorizable}")
-        print(f"需「看題目判斷」的題目數: {len(data) - count_memorizable}")
-        print("-" * 30)
-        print(f"新檔案已儲存為: {output_filename}")
+        print_summary(len(data), len(answer_option_whitelist), count_memorizable, output_filename)
 
     except Exception as e:
         print(f"發生未預期的錯誤: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="計算嚴格白名單並標註可直接背答案的題目")
+    parser.add_argument("input", nargs="?", default="question_bank.json", help="題目列表 JSON（預設 question_bank.json）")
+    parser.add_argument("output", nargs="?", default="process_question_bank.json", help="輸出檔（預設 process_question_bank.json）")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="串流模式：逐題解析與寫出，記憶體用量不隨題數成長（適合合併多年題庫等大型輸入）",
+    )
+    args = parser.parse_args()
+
     # 請確保資料夾中有 question_bank.json
-    process_question_bank('question_bank.json', 'process_question_bank.json')
\ No newline at end of file
+    process_question_bank(args.input, args.output, stream=args.stream)
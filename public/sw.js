@@ -0,0 +1,202 @@
+// Service worker: keeps the data buckets listed in precache-manifest.json
+// (scripts/generate_precache_manifest.py) in Cache Storage and serves them
+// cache-first, so repeat visits and offline exam practice need no network.
+//
+// - `core` of every bank is precached on install; `study` / `images` only for the
+//   banks the page asks for (postMessage { type: 'precache', bucket, bank }).
+// - Every sync (install, and each page load via { type: 'sync' }) re-reads the
+//   manifest and downloads only entries whose revision changed, then deletes
+//   entries no longer listed. Data is therefore at most one visit stale.
+// - The app shell (index.html and the hashed files it references) is cached too:
+//   network first for navigations, cache first for everything else.
+
+const MANIFEST_URL = 'precache-manifest.json'
+const META_CACHE = 'uav-quiz-meta'
+const SHELL_CACHE = 'uav-quiz-shell'
+const STATE_KEY = 'precache-state'
+const MANIFEST_KEY = 'precache-manifest'
+const DEFAULT_SELECTION = ['core:*']
+const CONCURRENCY = 6
+
+const scoped = (url) => new URL(url, self.registration.scope).href
+const bucketCache = (bucket) => `uav-quiz-${bucket}`
+
+async function readMeta(key, fallback) {
+  const res = await (await caches.open(META_CACHE)).match(key)
+  return res ? res.json() : fallback
+}
+
+async function writeMeta(key, value) {
+  const body = new Response(JSON.stringify(value), { headers: { 'Content-Type': 'application/json' } })
+  await (await caches.open(META_CACHE)).put(key, body)
+}
+
+// "bucket:bank" or "bucket:*"; entries with no banks belong to every bank
+function selectedEntries(manifest, selection) {
+  const [bucket, bank] = selection.split(':')
+  const entries = manifest.buckets[bucket]?.entries ?? []
+  return entries.filter((e) => bank === '*' || e.banks.length === 0 || e.banks.includes(bank))
+}
+
+// Image URLs stay the same when an image is re-uploaded: bypass the HTTP cache.
+// A storage bucket without CORS headers makes the cors fetch throw; <img> loads
+// images without CORS, so an opaque copy serves the page just as well (it only
+// takes more of the storage quota). HTTP errors are never retried opaquely.
+async function fetchEntry(url, bucket) {
+  let res
+  try {
+    res = await fetch(url, { cache: 'reload', mode: 'cors' })
+  } catch (err) {
+    if (bucket !== 'images') throw err
+    return fetch(url, { cache: 'reload', mode: 'no-cors' })
+  }
+  if (!res.ok) throw new Error(`HTTP ${res.status}`)
+  return res
+}
+
+// Syncs run one at a time, in order
+let queue = Promise.resolve()
+function sync(selection, onProgress) {
+  const run = queue.then(() => runSync(selection, onProgress))
+  queue = run.catch(() => {})
+  return run
+}
+
+async function runSync(selection, onProgress) {
+  const manifest = await (await fetch(scoped(MANIFEST_URL), { cache: 'no-store' })).json()
+  const state = await readMeta(STATE_KEY, { selected: DEFAULT_SELECTION, revisions: {} })
+  if (selection && !state.selected.includes(selection)) state.selected.push(selection)
+
+  const wanted = new Map() // absolute URL → [bucket, entry]
+  for (const sel of state.selected) {
+    for (const entry of selectedEntries(manifest, sel)) wanted.set(scoped(entry.url), [sel.split(':')[0], entry])
+  }
+  const stale = [...wanted].filter(([url, [, entry]]) => state.revisions[url] !== entry.revision)
+
+  let done = 0
+  let failed = 0
+  const pending = [...stale]
+  async function worker() {
+    while (pending.length > 0) {
+      const [url, [bucket, entry]] = pending.shift()
+      try {
+        const res = await fetchEntry(url, bucket)
+        await (await caches.open(bucketCache(bucket))).put(url, res)
+        state.revisions[url] = entry.revision
+      } catch {
+        failed++
+      }
+      onProgress?.(++done, stale.length)
+    }
+  }
+  await Promise.all(Array.from({ length: CONCURRENCY }, worker))
+
+  for (const bucket of Object.keys(manifest.buckets)) {
+    const cache = await caches.open(bucketCache(bucket))
+    for (const req of await cache.keys()) {
+      if (!wanted.has(req.url)) {
+        await cache.delete(req)
+        delete state.revisions[req.url]
+      }
+    }
+  }
+  await writeMeta(STATE_KEY, state)
+  await writeMeta(MANIFEST_KEY, manifest)
+  return { updated: stale.length - failed, failed, selected: state.selected }
+}
+
+// index.html plus the same-origin files it references (hashed bundles, icons);
+// shell files of older builds are dropped
+async function cacheShell() {
+  const res = await fetch(self.registration.scope, { cache: 'no-store' })
+  if (!res.ok) return
+  const html = await res.clone().text()
+  const urls = new Set([self.registration.scope])
+  for (const [, ref] of html.matchAll(/(?:src|href)="([^"]+)"/g)) {
+    const url = new URL(ref, self.registration.scope)
+    if (url.origin === self.location.origin) urls.add(url.href)
+  }
+  const cache = await caches.open(SHELL_CACHE)
+  await cache.put(self.registration.scope, res)
+  await Promise.all(
+    [...urls].filter((url) => url !== self.registration.scope).map(async (url) => {
+      if (await cache.match(url)) return
+      const asset = await fetch(url)
+      if (asset.ok) await cache.put(url, asset)
+    }),
+  )
+  for (const req of await cache.keys()) if (!urls.has(req.url)) await cache.delete(req)
+}
+
+// Offline, a missing image variant can be replaced by any cached variant of the same image
+async function cachedSibling(url) {
+  const manifest = await readMeta(MANIFEST_KEY, null)
+  const entries = manifest?.buckets.images?.entries ?? []
+  const group = entries.find((e) => e.url === url)?.group
+  if (!group) return undefined
+  for (const e of entries) {
+    if (e.group !== group || e.url === url) continue
+    const hit = await caches.match(e.url)
+    if (hit) return hit
+  }
+  return undefined
+}
+
+// Only the app's own page replaces the cached shell; static reading pages (read/) are not cached
+async function networkFirst(request) {
+  const isShell = request.url === self.registration.scope || request.url === scoped('index.html')
+  try {
+    const res = await fetch(request)
+    if (res.ok && isShell) await (await caches.open(SHELL_CACHE)).put(self.registration.scope, res.clone())
+    return res
+  } catch (err) {
+    const cached = await caches.match(self.registration.scope)
+    if (cached) return cached
+    throw err
+  }
+}
+
+async function cacheFirst(request) {
+  const cached = await caches.match(request.url)
+  if (cached) return cached
+  try {
+    return await fetch(request)
+  } catch (err) {
+    const sibling = await cachedSibling(request.url)
+    if (sibling) return sibling
+    throw err
+  }
+}
+
+self.addEventListener('install', (event) => {
+  self.skipWaiting()
+  // Offline installs still succeed; the next sync fills the caches
+  event.waitUntil(Promise.all([cacheShell(), sync(null)]).catch(() => {}))
+})
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil(self.clients.claim())
+})
+
+self.addEventListener('fetch', (event) => {
+  const { request } = event
+  if (request.method !== 'GET' || request.url === scoped(MANIFEST_URL)) return
+  event.respondWith(request.mode === 'navigate' ? networkFirst(request) : cacheFirst(request))
+})
+
+self.addEventListener('message', (event) => {
+  const port = event.ports[0]
+  const reply = (message) => port?.postMessage(message)
+  const { type, bucket, bank } = event.data ?? {}
+
+  if (type === 'status') {
+    event.waitUntil(readMeta(STATE_KEY, { selected: DEFAULT_SELECTION }).then((s) => reply({ type: 'status', selected: s.selected })))
+    return
+  }
+  if (type !== 'sync' && type !== 'precache') return
+  const selection = type === 'precache' ? `${bucket}:${bank}` : null
+  const work = Promise.all([sync(selection, (done, total) => reply({ type: 'progress', done, total })), type === 'sync' ? cacheShell() : null])
+    .then(([result]) => reply({ type: 'done', ...result }))
+    .catch((err) => reply({ type: 'error', message: String(err) }))
+  event.waitUntil(work)
+})
@@ -0,0 +1,304 @@
+"""
+answer_patterns.py
+
+Measures how well simple test-taking heuristics would do on every bank and
+chapter — "pick the longest option", "pick 以上皆是", "always pick D", … — and
+writes public/data/answer_patterns.json for LicenseAdvisorView plus a report on
+stdout. The answer whitelist (update_question_bank.py) only captures option
+texts that are never wrong; these are the softer patterns around it.
+
+All banks are encoded once into NumPy arrays over every question:
+
+    lengths    (N, 4)  option length in characters (NFKC, trailing 。/spaces stripped)
+    answer     (N,)    index of the correct option, 0–3
+    group      (N,)    (bank, chapter) id
+    all_above  (N, 4)  option contains 以上皆是
+    none_above (N, 4)  option contains 以上皆非
+    whitelist  (N, 4)  option text is in the bank's answer_option_whitelist
+
+A heuristic turns them into one pick per question (0–3, or -1 to abstain).
+Every variant — fixed letters, longest / shortest / most unusual option above a
+length z-score threshold (the option vs the other options of its question),
+and chains such as whitelist → 以上皆是 → longest — is stacked into one (H, N)
+array and scored with two products against a one-hot (N, groups) matrix, so
+a couple of hundred variants over every bank and chapter take a few ms.
+
+    {
+      "version": 1,
+      "banks": {
+        "professional": {
+          "questions": 588,
+          "answers": {"A": 151, "B": 151, "C": 141, "D": 145},
+          "answer_skew_p": 0.921,     # chi-square of the answer letters vs uniform
+          "heuristics": [             # headline heuristics, then the best variant
+            {"id": "all_above", "label": "有「以上皆是」就選它", "covered": 131, "correct": 93}, ...
+          ]
+        }, ...
+      }
+    }
+
+The best variant is picked on the same questions it is scored on: it describes
+the current bank, it does not predict a new one.
+
+Usage:
+    uv run scripts/answer_patterns.py                   # report + JSON
+    uv run scripts/answer_patterns.py --chapters --top 15
+"""
+
+import argparse
+import json
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from scipy import stats
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "images"))
+from question_bank import BANKS, DATA_DIR, QuestionBank  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+VERSION = 1
+OUTPUT_FILE = DATA_DIR / "answer_patterns.json"
+LETTERS = "ABCD"
+ALL_ABOVE = "以上皆是"
+NONE_ABOVE = "以上皆非"
+Z_THRESHOLDS = np.round(np.arange(0.0, 1.75, 0.05), 2)  # length z-score cut-offs; 4 options cap z at √3
+STRATEGY_Z = 0.5  # threshold of the headline whitelist → 以上皆是 → longest chain
+MIN_COVERAGE = 0.1  # share of a bank a variant must answer to count as "best"
+DEFAULT_TOP = 8
+
+
+@dataclass
+class Encoded:
+    banks: list[str]
+    groups: list[tuple[int, str]]  # group id → (bank position, chapter)
+    group_bank: np.ndarray  # (G,) bank position of each group
+    lengths: np.ndarray  # (N, 4) int32
+    answer: np.ndarray  # (N,) int8
+    group: np.ndarray  # (N,) int32
+    all_above: np.ndarray  # (N, 4) bool
+    none_above: np.ndarray  # (N, 4) bool
+    whitelist: np.ndarray  # (N, 4) bool
+
+
+def option_length(text: str) -> int:
+    return len(unicodedata.normalize("NFKC", text).strip().rstrip("。．. "))
+
+
+def encode(banks: list[QuestionBank]) -> Encoded:
+    lengths, answer, group, all_above, none_above, whitelist = [], [], [], [], [], []
+    group_ids: dict[tuple[int, str], int] = {}
+    for position, bank in enumerate(banks):
+        allowed = set(bank.whitelist)
+        for q in bank:
+            texts = [q.options.get(letter, "") for letter in LETTERS]
+            lengths.append([option_length(t) for t in texts])
+            answer.append(LETTERS.find(q.answer))
+            group.append(group_ids.setdefault((position, q.chapter), len(group_ids)))
+            all_above.append([ALL_ABOVE in t for t in texts])
+            none_above.append([NONE_ABOVE in t for t in texts])
+            whitelist.append([t.strip() in allowed for t in texts])
+    groups = list(group_ids)
+    return Encoded(
+        banks=[b.bank for b in banks],
+        groups=groups,
+        group_bank=np.array([position for position, _ in groups], dtype=np.int32),
+        lengths=np.array(lengths, dtype=np.int32).reshape(-1, 4),
+        answer=np.array(answer, dtype=np.int8),
+        group=np.array(group, dtype=np.int32),
+        all_above=np.array(all_above, dtype=bool).reshape(-1, 4),
+        none_above=np.array(none_above, dtype=bool).reshape(-1, 4),
+        whitelist=np.array(whitelist, dtype=bool).reshape(-1, 4),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Heuristics
+# ---------------------------------------------------------------------------
+
+def flagged(flags: np.ndarray) -> np.ndarray:
+    """The flagged option where exactly one option is flagged, else -1."""
+    return np.where(flags.sum(axis=1) == 1, flags.argmax(axis=1), -1)
+
+
+def above_threshold(scores: np.ndarray) -> np.ndarray:
+    """(T, N): the option with the unique highest score where that score ≥ each Z_THRESHOLDS entry."""
+    best = scores.argmax(axis=1)
+    top = np.take_along_axis(scores, best[:, None], axis=1)[:, 0]
+    unique = (scores == top[:, None]).sum(axis=1) == 1
+    return np.where(unique & (top >= Z_THRESHOLDS[:, None]), best, -1)
+
+
+def fallback(*picks: np.ndarray) -> np.ndarray:
+    """First non-abstaining pick, left to right (arrays broadcast: (N,) with (T, N))."""
+    result = picks[0]
+    for pick in picks[1:]:
+        result = np.where(result >= 0, result, pick)
+    return result
+
+
+def heuristics(enc: Encoded) -> tuple[list[str], list[str], np.ndarray]:
+    """Ids, labels and the (H, N) int8 pick matrix of every variant."""
+    n = len(enc.answer)
+    lengths = enc.lengths.astype(np.float32)
+    std = lengths.std(axis=1, keepdims=True)
+    z = np.divide(lengths - lengths.mean(axis=1, keepdims=True), std, out=np.zeros_like(lengths), where=std > 0)
+
+    all_above = flagged(enc.all_above)
+    whitelist = flagged(enc.whitelist)
+    longest = above_threshold(z)
+    families = {
+        "longest": (longest, "選最長的選項"),
+        "shortest": (above_threshold(-z), "選最短的選項"),
+        "outlier": (above_threshold(np.abs(z)), "選長度最突出的選項"),
+        "all_above>longest": (fallback(all_above, longest), "以上皆是，否則最長選項"),
+        "whitelist>all_above>longest": (fallback(whitelist, all_above, longest), "白名單 → 以上皆是 → 最長選項"),
+    }
+
+    ids, labels, picks = [], [], []
+
+    def add(id_: str, label: str, pick: np.ndarray) -> None:
+        ids.append(id_)
+        labels.append(label)
+        picks.append(pick)
+
+    add("whitelist", "選白名單中的選項", whitelist)
+    add("all_above", f"有「{ALL_ABOVE}」就選它", all_above)
+    add("none_above", f"有「{NONE_ABOVE}」就選它", flagged(enc.none_above))
+    for i, letter in enumerate(LETTERS):
+        add(f"letter:{letter}", f"一律選 {letter}", np.full(n, i))
+        add(f"all_above>letter:{letter}", f"以上皆是，否則選 {letter}", fallback(all_above, np.full(n, i)))
+    for family, (rows, label) in families.items():
+        for t, row in zip(Z_THRESHOLDS, rows):
+            if t == 0:
+                add(family, label, row)
+            else:
+                add(f"{family}@z{t:.2f}", f"{label}（長度 z ≥ {t:.2f}）", row)
+    return ids, labels, np.stack(picks).astype(np.int8)
+
+
+def score(enc: Encoded, picks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(H, G) answered and correct counts per heuristic and (bank, chapter) group."""
+    onehot = np.zeros((len(enc.group), len(enc.groups)), dtype=np.float32)
+    onehot[np.arange(len(enc.group)), enc.group] = 1
+    covered = (picks >= 0).astype(np.float32) @ onehot
+    correct = (picks == enc.answer).astype(np.float32) @ onehot
+    return np.rint(covered).astype(np.int64), np.rint(correct).astype(np.int64)
+
+
+def per_bank(enc: Encoded, by_group: np.ndarray) -> np.ndarray:
+    """(H, G) → (H, banks)."""
+    out = np.zeros((by_group.shape[0], len(enc.banks)), dtype=by_group.dtype)
+    np.add.at(out.T, enc.group_bank, by_group.T)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def ranked(ids: list[str], covered: np.ndarray, correct: np.ndarray, total: int) -> list[int]:
+    """Variants answering at least MIN_COVERAGE of the bank, most accurate (then widest) first.
+    Whitelist chains are left out: the whitelist is right by construction."""
+    eligible = np.array([not i.startswith("whitelist") for i in ids]) & (covered >= MIN_COVERAGE * total)
+    accuracy = correct / np.maximum(covered, 1)
+    return [int(h) for h in np.lexsort((-covered, -accuracy)) if eligible[h]]
+
+
+def build_report(enc: Encoded, ids: list[str], labels: list[str], covered: np.ndarray, correct: np.ndarray) -> dict:
+    bank_covered, bank_correct = per_bank(enc, covered), per_bank(enc, correct)
+    index = {id_: h for h, id_ in enumerate(ids)}
+    banks = {}
+    for b, bank in enumerate(enc.banks):
+        answers = np.bincount(enc.answer[enc.group_bank[enc.group] == b], minlength=4)
+        total = int(answers.sum())
+        top_letter = LETTERS[int(answers.argmax())]
+        headline = [
+            index["whitelist"], index["all_above"], index["longest"], index["shortest"],
+            index[f"letter:{top_letter}"], index[f"whitelist>all_above>longest@z{STRATEGY_Z:.2f}"],
+        ]
+        best = ranked(ids, bank_covered[:, b], bank_correct[:, b], total)[0]
+        if best not in headline:
+            headline.append(best)
+        banks[bank] = {
+            "questions": total,
+            "answers": dict(zip(LETTERS, answers.tolist())),
+            "answer_skew_p": round(float(stats.chisquare(answers).pvalue), 4),
+            "heuristics": [
+                {"id": ids[h], "label": labels[h], "covered": int(bank_covered[h, b]), "correct": int(bank_correct[h, b])}
+                for h in headline
+            ],
+        }
+    return {"version": VERSION, "banks": banks}
+
+
+def print_table(title: str, rows: list[tuple[str, int, int]], total: int) -> None:
+    print(title)
+    print(f"  {'heuristic':<36} {'answered':>9} {'accuracy':>9}")
+    for id_, cov, cor in rows:
+        accuracy = f"{cor / cov:.1%}" if cov else "-"
+        print(f"  {id_:<36} {cov:>4}/{total:<4} {accuracy:>9}")
+
+
+def print_report(enc: Encoded, ids: list[str], covered: np.ndarray, correct: np.ndarray, report: dict,
+                 top: int, chapters: bool) -> None:
+    bank_covered, bank_correct = per_bank(enc, covered), per_bank(enc, correct)
+    for b, bank in enumerate(enc.banks):
+        summary = report["banks"][bank]
+        total = summary["questions"]
+        letters = "  ".join(f"{k} {v}" for k, v in summary["answers"].items())
+        print(f"\n[{bank}] {total} 題　正解分布 {letters}（卡方 p = {summary['answer_skew_p']:.3f}）")
+
+        headline = [ids.index(h["id"]) for h in summary["heuristics"]]
+        print_table("  主要啟發法：", [(ids[h], bank_covered[h, b], bank_correct[h, b]) for h in headline], total)
+        best = ranked(ids, bank_covered[:, b], bank_correct[:, b], total)[:top]
+        print_table(
+            f"  準確率最高（涵蓋 ≥ {MIN_COVERAGE:.0%}，不含白名單）：",
+            [(ids[h], bank_covered[h, b], bank_correct[h, b]) for h in best], total,
+        )
+
+        if chapters:
+            for g in np.flatnonzero(enc.group_bank == b):
+                size = int((enc.group == g).sum())
+                print_table(f"  {enc.groups[g][1]}（{size} 題）：", [(ids[h], covered[h, g], correct[h, g]) for h in headline], size)
+
+
+def write_report(report: dict, path: Path) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(report, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score answer-pattern heuristics on every bank and chapter")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"每個題庫列出幾個最佳啟發法（預設 {DEFAULT_TOP}）")
+    parser.add_argument("--chapters", action="store_true", help="另列各章節的主要啟發法成績")
+    parser.add_argument("--no-write", action="store_true", help="只印報告，不寫 answer_patterns.json")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    enc = encode([b for b in map(QuestionBank.load, BANKS) if b.exists()])
+    encoded = time.perf_counter()
+    ids, labels, picks = heuristics(enc)
+    covered, correct = score(enc, picks)
+    scored = time.perf_counter()
+    print(
+        f"{len(enc.answer)} 題 × {len(ids)} 種啟發法，{len(enc.groups)} 個題庫章節："
+        f"編碼 {(encoded - started) * 1000:.0f} ms，評估 {(scored - encoded) * 1000:.1f} ms"
+    )
+
+    report = build_report(enc, ids, labels, covered, correct)
+    print_report(enc, ids, covered, correct, report, args.top, args.chapters)
+    if not args.no_write:
+        write_report(report, OUTPUT_FILE)
+        print(f"\n→ {OUTPUT_FILE}（{OUTPUT_FILE.stat().st_size / 1024:.1f} KB）")
+
+
+if __name__ == "__main__":
+    main()
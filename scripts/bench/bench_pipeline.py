@@ -0,0 +1,232 @@
+"""
+bench_pipeline.py
+
+Offline benchmark suite for the AI generation scripts, run against fake_api.py.
+
+For every (scenario × target) pair it starts a fresh fake server in-process,
+copies a truncated slice of the real data into a temporary workspace, runs the
+unmodified script as a subprocess pointed at the server, and reports:
+
+  wall time, throughput (results/min), completeness (results produced ÷ expected),
+  retries and failures by cause (from the script's own telemetry/events.jsonl),
+  and what the server saw (requests, injected errors, 429s).
+
+Scenarios are fake_api profile overrides: `baseline` (latency only), `flaky`
+(5xx / overloaded errors), `rate_limited` (a low requests-per-minute quota),
+`slow_images` (some images arrive after the per-attempt deadline, which is
+shortened through SCENARIO_ENV; they must still be saved, with the number of
+open requests bounded). All simulated delays are multiplied by --time-scale,
+so a run takes seconds.
+
+Usage:
+    uv run scripts/bench/bench_pipeline.py
+    uv run scripts/bench/bench_pipeline.py --targets analyze images --scenarios flaky -n 120
+    uv run scripts/bench/bench_pipeline.py --replay api_session.jsonl --json bench.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from fake_api import Behaviour, Cassette, FakeAPIServer, load_profile
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = ROOT / "public" / "data"
+DEFAULT_QUESTIONS = 60
+DEFAULT_TIME_SCALE = 0.02
+RUN_TIMEOUT = 600  # seconds per script run
+
+SCENARIOS: dict[str, dict[str, dict[str, Any]]] = {
+    "baseline": {},
+    "flaky": {
+        "anthropic": {"errors": {"529": 0.08, "500": 0.04}},
+        "gemini_text": {"errors": {"503": 0.1, "500": 0.05}},
+        "gemini_image": {"errors": {"503": 0.1, "429": 0.05}},
+    },
+    "rate_limited": {
+        "anthropic": {"rpm": 20},
+        "gemini_text": {"rpm": 6},
+        "gemini_image": {"rpm": 6},
+    },
+    "slow_images": {
+        "gemini_image": {"errors": {"late": 0.2}, "late_seconds": 2.0},
+    },
+}
+# Extra environment for the script under test (scripts/images/image_request.py deadlines)
+SCENARIO_ENV: dict[str, dict[str, str]] = {
+    "slow_images": {"GEMINI_ATTEMPT_TIMEOUT": "1", "GEMINI_LATE_TIMEOUT": "10"},
+}
+
+
+# ---------------------------------------------------------------------------
+# Targets: workspace setup + how to count results
+# ---------------------------------------------------------------------------
+
+def _questions(n: int) -> dict:
+    bank = json.loads((DATA_DIR / "professional.json").read_text(encoding="utf-8"))
+    return {**bank, "questions": bank["questions"][:n]}
+
+
+def _write(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def setup_study_aids(ws: Path, n: int) -> int:
+    _write(ws / "public/data/professional.json", _questions(n))
+    return n
+
+
+def count_study_aids(ws: Path) -> int:
+    out = ws / "public/data/professional_study_aids.json"
+    return sum(1 for v in json.loads(out.read_text(encoding="utf-8")).values() if v) if out.exists() else 0
+
+
+def setup_analyze(ws: Path, n: int) -> int:
+    _write(ws / "public/data/professional.json", _questions(n))
+    return n
+
+
+def count_analyze(ws: Path) -> int:
+    out = ws / "public/data/professional_image_analysis.json"
+    return len(json.loads(out.read_text(encoding="utf-8"))) if out.exists() else 0
+
+
+def setup_images(ws: Path, n: int) -> int:
+    analysis = json.loads((DATA_DIR / "professional_image_analysis.json").read_text(encoding="utf-8"))
+    picked = [k for k, v in analysis.items() if str(v.get("tier")) in ("1", "2") and "shared_with" not in v][:n]
+    _write(ws / "public/data/professional_image_analysis.json", {k: analysis[k] for k in picked})
+    _write(ws / "public/data/professional.json", json.loads((DATA_DIR / "professional.json").read_text(encoding="utf-8")))
+    return len(picked)
+
+
+def count_images(ws: Path) -> int:
+    return len(list((ws / "public/data/images/professional").glob("*.png")))
+
+
+TARGETS: dict[str, tuple[list[str], Callable[[Path, int], int], Callable[[Path], int], str]] = {
+    # name: (command, setup → expected results, count results, telemetry script name)
+    "study_aids": ([str(ROOT / "generate_study_aids.py")], setup_study_aids, count_study_aids, "study_aids"),
+    "analyze": ([str(ROOT / "scripts/images/analyze_questions_gemini.py")], setup_analyze, count_analyze, "analyze_questions"),
+    "images": (
+        [str(ROOT / "scripts/images/generate_images_v2.py"), "--budget-twd", "1000000"],
+        setup_images, count_images, "generate_images",
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def run_telemetry(ws: Path, script: str) -> dict:
+    """The final `run` event the script's Telemetry wrote, or {}."""
+    events = ws / "telemetry" / "events.jsonl"
+    if not events.exists():
+        return {}
+    runs = [e for e in map(json.loads, events.read_text(encoding="utf-8").splitlines())
+            if e.get("event") == "run" and e.get("script") == script]
+    return runs[-1] if runs else {}
+
+
+def run_one(
+    target: str, scenario: str, n: int, time_scale: float, seed: int, replay: Optional[Path]
+) -> dict:
+    command, setup, count, script = TARGETS[target]
+    profile = load_profile(None)
+    for service, overrides in SCENARIOS[scenario].items():
+        profile[service].update(overrides)
+    server = FakeAPIServer(
+        ("127.0.0.1", 0), Behaviour(profile, time_scale, seed),
+        cassette=Cassette(replay) if replay else None, replay=bool(replay),
+    )
+    server.start_in_thread()
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{target}-") as tmp:
+            ws = Path(tmp)
+            expected = setup(ws, n)
+            env = {**os.environ, **server.env(), **SCENARIO_ENV.get(scenario, {}), "PYTHONUNBUFFERED": "1"}
+            start = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, *command], cwd=ws, env=env,
+                capture_output=True, text=True, timeout=RUN_TIMEOUT,
+            )
+            wall = time.perf_counter() - start
+            produced = count(ws)
+            telemetry = run_telemetry(ws, script)
+            if proc.returncode != 0:
+                print(f"[{target}/{scenario}] exit {proc.returncode}:\n{proc.stderr[-2000:]}", file=sys.stderr)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "target": target, "scenario": scenario, "exit_code": proc.returncode,
+        "expected": expected, "produced": produced,
+        "completeness": produced / expected if expected else 1.0,
+        "wall_s": round(wall, 3),
+        "per_minute": round(produced / (wall / 60), 1) if wall else 0.0,
+        "retries": telemetry.get("retries", {}), "failures": telemetry.get("failures", {}),
+        "tokens_in": telemetry.get("tokens_in", 0), "tokens_out": telemetry.get("tokens_out", 0),
+        "server": dict(server.behaviour.stats),
+        "time_scale": time_scale,
+    }
+
+
+def print_table(results: list[dict]) -> None:
+    print(
+        f"\n{'target':<11} {'scenario':<13} {'done':>9} {'wall':>8} {'per min':>8}  "
+        "script retries / failures  |  server-side errors"
+    )
+    for r in results:
+        retries = ", ".join(f"{k} {v}" for k, v in sorted(r["retries"].items())) or "-"
+        failures = ", ".join(f"{k} {v}" for k, v in sorted(r["failures"].items())) or "-"
+        # SDK-internal retries never reach the script; the server's counts show them
+        injected = ", ".join(
+            f"{k.split(':')[1]} {v}" for k, v in sorted(r["server"].items())
+            if not k.endswith((":requests", ":ok"))
+        ) or "-"
+        print(
+            f"{r['target']:<11} {r['scenario']:<13} {r['produced']:>4}/{r['expected']:<4} "
+            f"{r['wall_s']:>7.1f}s {r['per_minute']:>8.1f}  {retries} / {failures}  |  {injected}"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against the fake API server")
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("-n", "--questions", type=int, default=DEFAULT_QUESTIONS, help="workload size per target")
+    parser.add_argument("--time-scale", type=float, default=DEFAULT_TIME_SCALE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", type=Path, help="serve a recorded cassette (fake_api.py --record) instead")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    for target in args.targets:
+        for scenario in args.scenarios:
+            print(f"running {target} / {scenario} ...", flush=True)
+            results.append(run_one(target, scenario, args.questions, args.time_scale, args.seed, args.replay))
+    print_table(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nWritten to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+bench_startup.py
+
+Import-time / startup benchmark for the `uav-quiz-tools` CLI (uav_quiz_tools.py).
+
+Each case is started N times as a fresh interpreter; the table shows the median
+wall time and the heaviest top-level imports reported by `python -X importtime`.
+The fast cases (help, status, stats, pure-JSON commands) have a budget: the
+script exits 1 if any of them exceeds --budget-ms, so a stray top-level SDK
+import shows up as a failure rather than a slow drift. The `direct` cases run
+an SDK-importing script's own --help for comparison. A case whose command exits
+non-zero is a failure too, budget or not: its error output is printed and the
+script exits 1.
+
+Usage:
+    uv run scripts/bench/bench_startup.py
+    uv run scripts/bench/bench_startup.py -n 20 --budget-ms 150 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[2]
+CLI = ROOT / "uav_quiz_tools.py"
+DEFAULT_RUNS = 10
+DEFAULT_BUDGET_MS = 200
+TOP_IMPORTS = 3
+
+CASES: list[tuple[str, list[str], bool]] = [
+    # (name, argv, has budget)
+    ("--help", [str(CLI), "--help"], True),
+    ("status", [str(CLI), "status"], True),
+    ("stats", [str(CLI), "stats"], True),
+    ("whitelist --check", [str(CLI), "whitelist", "--check"], True),
+    ("analyze --help", [str(CLI), "analyze", "--help"], True),
+    ("upload --help", [str(CLI), "upload", "--help"], True),
+    ("direct: analyze --help", [str(ROOT / "scripts/images/analyze_questions_gemini.py"), "--help"], False),
+    ("direct: study_aids import", ["-c", "import generate_study_aids"], False),
+]
+
+
+def run_once(argv: list[str]) -> tuple[float, str, int]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv], cwd=ROOT,
+        capture_output=True, text=True, env={**os.environ, "PYTHONPATH": str(ROOT / "scripts/images")},
+    )
+    return time.perf_counter() - start, proc.stderr, proc.returncode
+
+
+def error_output(stderr: str) -> str:
+    """stderr without the `-X importtime` lines."""
+    return "\n".join(line for line in stderr.splitlines() if not line.startswith("import time:"))
+
+
+def heaviest_imports(importtime: str, n: int = TOP_IMPORTS) -> list[tuple[str, int]]:
+    """Top-level packages by cumulative import time (µs) from `-X importtime` output."""
+    found = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" ") and "." not in name:  # top level: no nesting indent
+            found.append((name.strip(), int(cumulative)))
+    return sorted(found, key=lambda item: -item[1])[:n]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup benchmark for uav-quiz-tools")
+    parser.add_argument("-n", "--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="limit for the fast cases")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<26} {'median':>8} {'max':>8}  heaviest imports")
+    for name, argv, budgeted in CASES:
+        times, importtime, returncode = [], "", 0
+        for _ in range(args.runs):
+            elapsed, importtime, returncode = run_once(argv)
+            times.append(elapsed * 1000)
+            if returncode != 0:
+                break  # a crash is not a timing: report it instead
+        if returncode != 0:
+            results.append({"case": name, "returncode": returncode, "failed": True})
+            print(f"{name:<26} {'FAILED':>8} {'':>8}  exit {returncode}")
+            print(error_output(importtime), file=sys.stderr)
+            continue
+        median = statistics.median(times)
+        heavy = heaviest_imports(importtime)
+        over = budgeted and median > args.budget_ms
+        results.append({
+            "case": name, "median_ms": round(median, 1), "max_ms": round(max(times), 1),
+            "budget_ms": args.budget_ms if budgeted else None, "over_budget": over,
+            "imports": [{"module": m, "cumulative_us": us} for m, us in heavy],
+        })
+        imports = ", ".join(f"{m} {us / 1000:.0f}ms" for m, us in heavy)
+        print(f"{name:<26} {median:>6.0f}ms {max(times):>6.0f}ms  {imports}{'  ← over budget' if over else ''}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nWritten to {args.json}")
+    if any(r.get("failed") or r["over_budget"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
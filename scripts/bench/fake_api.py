@@ -0,0 +1,621 @@
+"""
+fake_api.py
+
+Local stand-in for the three remote services the data pipeline talks to:
+
+  - Anthropic Messages API        POST /v1/messages
+  - Gemini generateContent        POST /v1beta/models/{model}:generateContent
+  - Cloud Storage JSON API subset upload / list / get / patch under /storage/v1 and
+                                  /upload/storage/v1 (what google-cloud-storage, and so
+                                  firebase_admin, uses when STORAGE_EMULATOR_HOST is set)
+
+Each service has a latency distribution, a requests-per-minute limit (429 once
+exhausted) and error injection (status codes with weights, a hang that
+outlasts the client timeout, or a late success that arrives after it). Profiles are plain JSON; --time-scale shrinks
+every simulated delay so a benchmark of hundreds of requests runs in seconds.
+
+Three modes:
+  synthetic (default)  responses are generated from the request: tool_use input
+                       from the tool's input_schema, JSON from Gemini's
+                       responseSchema (one array item per "索引 N" marker in the
+                       prompt), a small PNG for image models
+  --record UPSTREAMS   proxy to the real APIs and append every exchange to a
+                       cassette (JSONL; request bodies are stored as SHA-256 only,
+                       API keys never)
+  --replay CASSETTE    answer from the cassette by (method, path, body hash) with the
+                       recorded latency, falling back to synthetic responses
+
+Point the scripts at it with:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+    GEMINI_BASE_URL=http://127.0.0.1:8765
+    STORAGE_EMULATOR_HOST=http://127.0.0.1:8765
+
+Usage:
+    uv run scripts/bench/fake_api.py                                  # synthetic, port 8765
+    uv run scripts/bench/fake_api.py --profile flaky.json --time-scale 0.05
+    uv run scripts/bench/fake_api.py --record anthropic=https://api.anthropic.com \\
+        --record gemini=https://generativelanguage.googleapis.com --cassette session.jsonl
+    uv run scripts/bench/fake_api.py --replay session.jsonl
+"""
+
+import argparse
+import base64
+import copy
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+DEFAULT_PORT = 8765
+SERVICES = ("anthropic", "gemini_text", "gemini_image", "storage")
+DEFAULT_PROFILE: dict[str, dict[str, Any]] = {
+    # latency: lognormal around `median` seconds; ttfb_fraction of it elapses before headers
+    "anthropic": {
+        "latency": {"median": 2.0, "sigma": 0.4}, "ttfb_fraction": 0.3,
+        "rpm": 50, "errors": {},
+    },
+    "gemini_text": {
+        "latency": {"median": 12.0, "sigma": 0.5}, "ttfb_fraction": 1.0,
+        "rpm": 60, "errors": {},
+    },
+    "gemini_image": {
+        "latency": {"median": 15.0, "sigma": 0.4}, "ttfb_fraction": 1.0,
+        "rpm": 20, "errors": {}, "image_size": 256,
+    },
+    "storage": {
+        "latency": {"median": 0.15, "sigma": 0.3}, "ttfb_fraction": 1.0,
+        "rpm": 6000, "errors": {},
+    },
+}
+# errors: {"<status>": probability, ..., "hang": probability, "late": probability}
+# "hang" sleeps HANG_SECONDS then fails; "late" sleeps late_seconds (default LATE_SECONDS) then
+# answers normally. Both are unscaled, so they outlast the client's per-attempt deadline.
+HANG_SECONDS = 90.0
+LATE_SECONDS = 75.0
+UPSTREAM_TIMEOUT = 180
+
+
+def load_profile(path: Optional[str]) -> dict[str, dict[str, Any]]:
+    """DEFAULT_PROFILE overlaid with the services/fields given in a JSON file."""
+    profile = copy.deepcopy(DEFAULT_PROFILE)
+    if path:
+        for service, overrides in json.loads(Path(path).read_text(encoding="utf-8")).items():
+            profile.setdefault(service, {}).update(overrides)
+    return profile
+
+
+# ---------------------------------------------------------------------------
+# Behaviour: latency, rate limits, injected errors
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """Token bucket refilled at rpm / 60 per (scaled) second, burst of one minute's quota / 6."""
+
+    def __init__(self, rpm: float, time_scale: float) -> None:
+        self.rate = rpm / 60 / max(time_scale, 1e-9)
+        self.capacity = max(rpm / 6, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class Behaviour:
+    def __init__(self, profile: dict[str, dict[str, Any]], time_scale: float, seed: int) -> None:
+        self.profile = profile
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.limiters = {s: RateLimiter(cfg.get("rpm", math.inf), time_scale) for s, cfg in profile.items()}
+        self.stats: Counter = Counter()
+        self.stats_lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def latency(self, service: str) -> float:
+        cfg = self.profile[service]["latency"]
+        with self.rng_lock:
+            value = self.rng.lognormvariate(math.log(cfg["median"]), cfg.get("sigma", 0.0))
+        return value * self.time_scale
+
+    def injected_error(self, service: str) -> Optional[str]:
+        """"hang", an HTTP status string, or None."""
+        errors: dict[str, float] = self.profile[service].get("errors", {})
+        with self.rng_lock:
+            roll = self.rng.random()
+        for kind, prob in errors.items():
+            if roll < prob:
+                return kind
+            roll -= prob
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Synthetic responses
+# ---------------------------------------------------------------------------
+
+def estimate_tokens(text: str) -> int:
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def synth_from_schema(schema: dict, name: str, context: dict) -> Any:
+    """Deterministic value shaped like a JSON schema (Anthropic or Gemini flavour)."""
+    kind = str(schema.get("type", "object")).lower()
+    if "enum" in schema:
+        return schema["enum"][context["seed"] % len(schema["enum"])]
+    if kind == "object":
+        props = schema.get("properties", {})
+        return {k: synth_from_schema(v, k, context) for k, v in props.items()}
+    if kind == "array":
+        item_schema = schema.get("items", {})
+        indices = context.get("indices") or [0]
+        if "index" in item_schema.get("properties", {}):
+            items = []
+            for i in indices:
+                item = synth_from_schema(item_schema, name, {**context, "seed": context["seed"] + i})
+                item["index"] = i
+                items.append(item)
+            return items
+        return [synth_from_schema(item_schema, name, context)]
+    if kind == "integer":
+        return context["seed"] % 100
+    if kind == "number":
+        return round((context["seed"] % 100) / 100, 2)
+    if kind == "boolean":
+        return context["seed"] % 2 == 0
+    return f"模擬{name}"
+
+
+def tiny_png(size: int, seed: int) -> bytes:
+    """Solid-colour PNG built with zlib only (no Pillow needed in the server)."""
+    rgb = bytes(((seed >> s) & 0xFF) for s in (0, 8, 16))
+    raw = b"".join(b"\x00" + rgb * size for _ in range(size))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def anthropic_response(body: dict) -> dict:
+    prompt = json.dumps(body.get("messages", []), ensure_ascii=False)
+    seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+    content: list[dict] = []
+    tools = body.get("tools") or []
+    choice = body.get("tool_choice") or {}
+    tool = next((t for t in tools if t.get("name") == choice.get("name")), tools[0] if tools else None)
+    if tool:
+        content.append({
+            "type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:20]}", "name": tool["name"],
+            "input": synth_from_schema(tool.get("input_schema", {}), tool["name"], {"seed": seed}),
+        })
+    else:
+        content.append({"type": "text", "text": "模擬回應"})
+    output_tokens = min(body.get("max_tokens", 1024), 150 + seed % 250)
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+        "model": body.get("model", "fake"), "content": content,
+        "stop_reason": "tool_use" if tool else "end_turn", "stop_sequence": None,
+        "usage": {"input_tokens": estimate_tokens(prompt) + 200, "output_tokens": output_tokens},
+    }
+
+
+def gemini_response(model: str, body: dict, image_size: int) -> dict:
+    texts = [p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", [])]
+    prompt = "\n".join(texts)
+    seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+    config = body.get("generationConfig", {})
+    if "image" in model:
+        parts = [
+            {"text": "模擬圖片"},
+            {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(tiny_png(image_size, seed)).decode()}},
+        ]
+        output_tokens = 1290
+    else:
+        schema = config.get("responseSchema") or config.get("responseJsonSchema")
+        if schema:
+            indices = [int(m) for m in re.findall(r"索引 (\d+)", prompt)]
+            text = json.dumps(synth_from_schema(schema, "result", {"seed": seed, "indices": indices}), ensure_ascii=False)
+        else:
+            text = "模擬回應"
+        parts = [{"text": text}]
+        output_tokens = estimate_tokens(text)
+    return {
+        "candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {
+            "promptTokenCount": estimate_tokens(prompt),
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": estimate_tokens(prompt) + output_tokens,
+        },
+        "modelVersion": model,
+    }
+
+
+def error_body(service: str, status: int) -> dict:
+    if service == "anthropic":
+        kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+        return {"type": "error", "error": {"type": kind, "message": f"injected {status}"}}
+    if service == "storage":
+        return {"error": {"code": status, "message": f"injected {status}"}}
+    name = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}.get(status, "UNKNOWN")
+    return {"error": {"code": status, "message": f"injected {status}", "status": name}}
+
+
+# ---------------------------------------------------------------------------
+# Storage (in-memory GCS JSON API subset)
+# ---------------------------------------------------------------------------
+
+class FakeBucketStore:
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def resource(self, bucket: str, name: str) -> dict:
+        obj = self.objects[(bucket, name)]
+        return {
+            "kind": "storage#object", "id": f"{bucket}/{name}/{obj['generation']}",
+            "bucket": bucket, "name": name, "generation": str(obj["generation"]),
+            "size": str(len(obj["data"])), "contentType": obj["contentType"],
+            "md5Hash": base64.b64encode(hashlib.md5(obj["data"]).digest()).decode(),
+            "metadata": obj["metadata"], "acl": obj["acl"],
+            "mediaLink": f"/download/storage/v1/b/{bucket}/o/{quote(name, safe='')}?alt=media",
+        }
+
+    def put(self, bucket: str, name: str, data: bytes, meta: dict) -> dict:
+        with self.lock:
+            self.objects[(bucket, name)] = {
+                "data": data,
+                "contentType": meta.get("contentType", "application/octet-stream"),
+                "metadata": meta.get("metadata") or {},
+                "acl": meta.get("acl") or [],
+                "generation": time.time_ns(),
+            }
+            return self.resource(bucket, name)
+
+    def patch(self, bucket: str, name: str, changes: dict) -> Optional[dict]:
+        with self.lock:
+            obj = self.objects.get((bucket, name))
+            if obj is None:
+                return None
+            if "metadata" in changes:
+                obj["metadata"] = {**obj["metadata"], **(changes["metadata"] or {})}
+            for field in ("acl", "contentType"):
+                if field in changes:
+                    obj[field] = changes[field]
+            return self.resource(bucket, name)
+
+    def list(self, bucket: str, prefix: str) -> dict:
+        with self.lock:
+            names = sorted(n for b, n in self.objects if b == bucket and n.startswith(prefix))
+            return {"kind": "storage#objects", "items": [self.resource(bucket, n) for n in names]}
+
+
+# ---------------------------------------------------------------------------
+# Recording / replay
+# ---------------------------------------------------------------------------
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    path = re.sub(r"([?&])key=[^&]*&?", r"\1", path).rstrip("?&")
+    return hashlib.sha256(f"{method} {path} ".encode() + body).hexdigest()
+
+
+class Cassette:
+    """JSONL of recorded exchanges; replay pops matching entries in recorded order."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: dict[str, list[dict]] = {}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries.setdefault(entry["key"], []).append(entry)
+
+    def append(self, entry: dict) -> None:
+        with self.lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def take(self, key: str) -> Optional[dict]:
+        with self.lock:
+            queue = self.entries.get(key)
+            if not queue:
+                return None
+            # Keep the last one so repeated identical requests keep replaying
+            return queue.pop(0) if len(queue) > 1 else queue[0]
+
+
+# ---------------------------------------------------------------------------
+# HTTP server
+# ---------------------------------------------------------------------------
+
+class FakeAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        behaviour: Behaviour,
+        upstreams: Optional[dict[str, str]] = None,
+        cassette: Optional[Cassette] = None,
+        replay: bool = False,
+    ) -> None:
+        super().__init__(address, FakeAPIHandler)
+        self.behaviour = behaviour
+        self.store = FakeBucketStore()
+        self.upstreams = upstreams or {}
+        self.cassette = cassette
+        self.replay = replay
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict[str, str]:
+        """Environment variables that point the pipeline scripts at this server."""
+        return {
+            "ANTHROPIC_BASE_URL": self.base_url,
+            "GEMINI_BASE_URL": self.base_url,
+            "STORAGE_EMULATOR_HOST": self.base_url,
+            "ANTHROPIC_API_KEY": "fake-key",
+            "GEMINI_API_KEY": "fake-key",
+            "FIREBASE_BUCKET": "fake-bucket",
+        }
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    server: FakeAPIServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler API
+        pass
+
+    # -- plumbing ----------------------------------------------------------
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, payload: Any, content_type: str = "application/json",
+              headers: Optional[dict[str, str]] = None) -> None:
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _service(self, path: str) -> Optional[str]:
+        if path.startswith("/v1/messages"):
+            return "anthropic"
+        if ":generateContent" in path:
+            return "gemini_image" if "image" in path else "gemini_text"
+        if path.startswith(("/storage/v1/", "/upload/storage/v1/", "/download/storage/v1/")):
+            return "storage"
+        return None
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PATCH(self) -> None:
+        self._dispatch("PATCH")
+
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def _dispatch(self, method: str) -> None:
+        body = self._body()
+        path = urlsplit(self.path).path
+        service = self._service(path)
+        behaviour = self.server.behaviour
+        if service is None:
+            self._send(404, {"error": {"code": 404, "message": f"unknown endpoint {path}"}})
+            return
+        behaviour.count(f"{service}:requests")
+
+        if self.server.upstreams.get(service.split("_")[0]) and not self.server.replay:
+            self._proxy(method, service, body)
+            return
+        if self.server.replay and self.server.cassette:
+            entry = self.server.cassette.take(request_key(method, self.path, body))
+            if entry is not None:
+                behaviour.count(f"{service}:replayed")
+                time.sleep(entry["latency_s"] * behaviour.time_scale)
+                self._send(entry["status"], base64.b64decode(entry["body_b64"]), entry["content_type"])
+                return
+
+        if not behaviour.limiters[service].acquire():
+            behaviour.count(f"{service}:429")
+            self._send(429, error_body(service, 429), headers={"Retry-After": "1"})
+            return
+        injected = behaviour.injected_error(service)
+        total = behaviour.latency(service)
+        if injected == "hang":
+            behaviour.count(f"{service}:hang")
+            time.sleep(HANG_SECONDS)
+            self._send(504, error_body(service, 504))
+            return
+        if injected == "late":
+            behaviour.count(f"{service}:late")
+            time.sleep(behaviour.profile[service].get("late_seconds", LATE_SECONDS))
+        elif injected is not None:
+            behaviour.count(f"{service}:{injected}")
+            time.sleep(total * 0.2)
+            self._send(int(injected), error_body(service, int(injected)))
+            return
+
+        ttfb = total * self.server.behaviour.profile[service].get("ttfb_fraction", 1.0)
+        time.sleep(ttfb)
+        status, payload, content_type = self._synthetic(method, service, path, body)
+        if total > ttfb:
+            # Headers go out first so clients can measure time-to-first-byte
+            data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.flush()
+            time.sleep(total - ttfb)
+            self.wfile.write(data)
+        else:
+            self._send(status, payload, content_type)
+        behaviour.count(f"{service}:ok" if status < 400 else f"{service}:{status}")
+
+    # -- synthetic ---------------------------------------------------------
+
+    def _synthetic(self, method: str, service: str, path: str, body: bytes) -> tuple[int, Any, str]:
+        if service == "anthropic":
+            return 200, anthropic_response(json.loads(body or b"{}")), "application/json"
+        if service.startswith("gemini"):
+            model = unquote(path.split("/models/")[1].split(":")[0])
+            size = self.server.behaviour.profile["gemini_image"].get("image_size", 256)
+            return 200, gemini_response(model, json.loads(body or b"{}"), size), "application/json"
+        return self._storage(method, path, body)
+
+    def _storage(self, method: str, path: str, body: bytes) -> tuple[int, Any, str]:
+        store = self.server.store
+        query = parse_qs(urlsplit(self.path).query)
+        bucket_only = re.match(r"^/storage/v1/b/([^/]+)$", path)
+        if bucket_only:
+            return 200, {"kind": "storage#bucket", "id": bucket_only.group(1), "name": bucket_only.group(1)}, "application/json"
+        m = re.match(r"^/(?:upload/|download/)?storage/v1/b/([^/]+)/o(?:/(.+))?$", path)
+        if not m:
+            return 404, {"error": {"code": 404, "message": "not found"}}, "application/json"
+        bucket, name = m.group(1), unquote(m.group(2)) if m.group(2) else None
+        acl_only = name is not None and name.endswith("/acl")
+        if acl_only:
+            name = name[: -len("/acl")]
+
+        if method == "POST" and path.startswith("/upload/"):
+            upload_type = query.get("uploadType", ["media"])[0]
+            if upload_type == "multipart":
+                meta, data = self._multipart(body)
+            else:
+                meta, data = {"name": query.get("name", [""])[0], "contentType": self.headers.get("Content-Type")}, body
+            return 200, store.put(bucket, meta.get("name") or name or "", data, meta), "application/json"
+        if method == "GET" and name is None:
+            return 200, store.list(bucket, query.get("prefix", [""])[0]), "application/json"
+        if name is not None and (bucket, name) not in store.objects:
+            return 404, {"error": {"code": 404, "message": f"No such object: {bucket}/{name}"}}, "application/json"
+        if acl_only and method == "GET":
+            return 200, {"kind": "storage#objectAccessControls", "items": store.objects[(bucket, name)]["acl"]}, "application/json"
+        if method == "GET" and (query.get("alt") == ["media"] or path.startswith("/download/")):
+            obj = store.objects[(bucket, name)]
+            return 200, obj["data"], obj["contentType"]
+        if method == "GET":
+            return 200, store.resource(bucket, name), "application/json"
+        if method in ("PATCH", "PUT"):
+            return 200, store.patch(bucket, name, json.loads(body or b"{}")), "application/json"
+        return 405, {"error": {"code": 405, "message": method}}, "application/json"
+
+    def _multipart(self, body: bytes) -> tuple[dict, bytes]:
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode()
+        message = BytesParser(policy=HTTP).parse(io.BytesIO(header + body))
+        parts = list(message.iter_parts())
+        meta = json.loads(parts[0].get_payload(decode=True) or b"{}")
+        meta.setdefault("contentType", parts[1].get_content_type())
+        return meta, parts[1].get_payload(decode=True) or b""
+
+    # -- record ------------------------------------------------------------
+
+    def _proxy(self, method: str, service: str, body: bytes) -> None:
+        import requests
+
+        upstream = self.server.upstreams[service.split("_")[0]].rstrip("/")
+        skip = {"host", "content-length", "accept-encoding", "connection"}
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in skip}
+        start = time.perf_counter()
+        resp = requests.request(method, upstream + self.path, headers=headers, data=body, timeout=UPSTREAM_TIMEOUT)
+        latency = time.perf_counter() - start
+        content_type = resp.headers.get("Content-Type", "application/json")
+        if self.server.cassette:
+            self.server.cassette.append({
+                "key": request_key(method, self.path, body),
+                "service": service, "method": method, "path": re.sub(r"key=[^&]*", "key=REDACTED", self.path),
+                "request_sha256": hashlib.sha256(body).hexdigest(),
+                "status": resp.status_code, "content_type": content_type,
+                "latency_s": round(latency, 4), "body_b64": base64.b64encode(resp.content).decode(),
+            })
+        self.server.behaviour.count(f"{service}:recorded")
+        self._send(resp.status_code, resp.content, content_type)
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Anthropic / Gemini / Cloud Storage server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--profile", help="JSON file overriding DEFAULT_PROFILE per service")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply every simulated delay (e.g. 0.05)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--record", action="append", default=[], metavar="SERVICE=URL",
+        help="proxy a service (anthropic / gemini / storage) to its real endpoint and record it",
+    )
+    parser.add_argument("--cassette", default="api_session.jsonl", help="recording file (default api_session.jsonl)")
+    parser.add_argument("--replay", metavar="CASSETTE", help="serve recorded responses from this cassette")
+    args = parser.parse_args()
+
+    upstreams = dict(item.split("=", 1) for item in args.record)
+    cassette = Cassette(Path(args.replay or args.cassette)) if (upstreams or args.replay) else None
+    behaviour = Behaviour(load_profile(args.profile), args.time_scale, args.seed)
+    server = FakeAPIServer((args.host, args.port), behaviour, upstreams, cassette, replay=bool(args.replay))
+
+    print(f"Fake API listening on {server.base_url}")
+    for key, value in server.env().items():
+        print(f"  export {key}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\n" + ", ".join(f"{k} {v}" for k, v in sorted(behaviour.stats.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+"""
+build_pipeline.py
+
+Incremental build of the whole data pipeline as a DAG of stages.
+
+Each stage declares the script it runs, the files it reads and the files it
+writes; dependencies follow from outputs → inputs:
+
+    update ──▶ study_aids
+       └─────▶ analyze ──▶ images ──▶ upload ──▶ manifest
+
+A stage runs only when the fingerprint of its inputs (content SHA-256 of every
+input file, plus the command line) differs from the one recorded after its last
+successful run, or when one of its outputs is missing. Outputs that are kept
+out of git (`local`, e.g. the generated PNGs) never trigger a run by being
+absent, and a stage with a missing input is reported as blocked instead of run.
+Stages that spend money on AI APIs (`paid`) only run when named as a target or
+forced; otherwise a dirty paid stage is held and reported, and the stages after
+it build from the files already there. Fingerprints are taken
+when the stage becomes ready, so a stage whose upstream re-ran but produced
+byte-identical outputs is still skipped. Independent stages run in parallel
+(e.g. study aids alongside image analysis). File hashes are cached by
+(size, mtime) in .pipeline_state.json, so a no-op refresh reads almost nothing.
+
+`update` depends on the CAA website: its fingerprint includes the list of PDF
+links on the download page (one small HTTP request; --offline skips it).
+
+Usage:
+    uv run scripts/build_pipeline.py --dry-run          # print the plan only
+    uv run scripts/build_pipeline.py                    # minimum work to refresh everything
+    uv run scripts/build_pipeline.py manifest           # a target and whatever free stages it needs
+    uv run scripts/build_pipeline.py images             # paid stages run only when named
+    uv run scripts/build_pipeline.py --force analyze --jobs 3
+    uv run scripts/build_pipeline.py --mark-built --offline # adopt an existing checkout
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_FILE = Path(".pipeline_state.json")
+LOG_DIR = Path("telemetry") / "pipeline"
+DEFAULT_JOBS = 2
+BANKS = ("general", "professional", "renewal", "renewal_basic")
+IMAGES = "scripts/images"
+
+
+def remote_bank_links() -> str:
+    """Fingerprint of the CAA download page: the PDF links it currently offers."""
+    sys.path.insert(0, str(ROOT))
+    from update_question_bank import CAA_URL, scrape_pdf_links
+
+    return json.dumps(scrape_pdf_links(CAA_URL), sort_keys=True)
+
+
+@dataclass
+class Stage:
+    name: str
+    command: list[str]
+    inputs: list[str]
+    outputs: list[str]
+    remote: Optional[Callable[[], str]] = None
+    paid: bool = False  # calls a paid AI API: runs only when named as a target or forced
+    local: list[str] = field(default_factory=list)  # outputs not in git: absence alone is no reason to run
+    optional: list[str] = field(default_factory=list)  # inputs the script can do without
+    deps: list[str] = field(default_factory=list)
+
+
+STAGES = [
+    Stage(
+        "update",
+        ["update_question_bank.py"],
+        inputs=["update_question_bank.py"],
+        outputs=[f"public/data/{b}{suffix}.json" for b in BANKS for suffix in ("", "_stats")],
+        remote=remote_bank_links,
+    ),
+    Stage(
+        "study_aids",
+        ["generate_study_aids.py"],
+        inputs=["generate_study_aids.py", "public/data/professional.json"],
+        outputs=["public/data/professional_study_aids.json"],
+        paid=True,
+    ),
+    Stage(
+        "analyze",
+        [f"{IMAGES}/analyze_questions_gemini.py"],
+        inputs=[
+            f"{IMAGES}/analyze_questions_gemini.py",
+            f"{IMAGES}/preclassify_questions.py",
+            "public/data/professional.json",
+        ],
+        outputs=["public/data/professional_image_analysis.json"],
+        paid=True,
+    ),
+    Stage(
+        "images",
+        [f"{IMAGES}/generate_images_v2.py"],
+        inputs=[f"{IMAGES}/generate_images_v2.py", "public/data/professional_image_analysis.json"],
+        outputs=["public/data/images/professional"],
+        paid=True,
+        local=["public/data/images/professional"],
+    ),
+    Stage(
+        "upload",
+        [f"{IMAGES}/convert_and_upload.py"],
+        inputs=[
+            f"{IMAGES}/convert_and_upload.py",
+            "public/data/images/professional",
+            "public/data/professional_image_analysis.json",
+        ],
+        outputs=["webp_urls.json", "image_placeholders.json"],
+        local=["webp_urls.json", "image_placeholders.json"],
+    ),
+    Stage(
+        "manifest",
+        [f"{IMAGES}/generate_image_manifest.py"],
+        inputs=[
+            f"{IMAGES}/generate_image_manifest.py",
+            "public/data/professional_image_analysis.json",
+            "webp_urls.json",
+            "webp_urls.log",
+            "image_placeholders.json",
+        ],
+        outputs=["public/data/professional_images.json"],
+        # an interrupted upload leaves its checkpoints in the log, possibly with no JSON yet
+        optional=["webp_urls.json", "webp_urls.log"],
+    ),
+    # general is a near-subset of professional: reuse its paid results instead of new API calls
+    Stage(
+        "reuse_aids",
+        ["generate_study_aids.py", "--bank", "general", "--reuse-only"],
+        inputs=[
+            "generate_study_aids.py",
+            f"{IMAGES}/near_duplicates.py",
+            "public/data/general.json",
+            "public/data/professional.json",
+            "public/data/professional_study_aids.json",
+        ],
+        outputs=["public/data/general_study_aids.json"],
+    ),
+    Stage(
+        "reuse_imgs",
+        [f"{IMAGES}/generate_image_manifest.py", "--bank", "general"],
+        inputs=[
+            f"{IMAGES}/generate_image_manifest.py",
+            f"{IMAGES}/near_duplicates.py",
+            "public/data/general.json",
+            "public/data/professional.json",
+            "public/data/professional_images.json",
+        ],
+        outputs=["public/data/general_images.json"],
+    ),
+    Stage(
+        "search",
+        ["scripts/generate_search_index.py"],
+        inputs=[
+            "scripts/generate_search_index.py",
+            *[f"public/data/{b}.json" for b in BANKS],
+            "public/data/professional_study_aids.json",
+            "public/data/general_study_aids.json",
+        ],
+        outputs=[f"public/data/{b}_search.json" for b in BANKS],
+    ),
+    Stage(
+        "related",
+        ["scripts/generate_related.py"],
+        inputs=["scripts/generate_related.py", *[f"public/data/{b}.json" for b in BANKS]],
+        outputs=[f"public/data/{b}_related.json" for b in BANKS],
+    ),
+    Stage(
+        "patterns",
+        ["scripts/answer_patterns.py"],
+        inputs=["scripts/answer_patterns.py", *[f"public/data/{b}.json" for b in BANKS]],
+        outputs=["public/data/answer_patterns.json"],
+    ),
+    Stage(
+        "exams",
+        ["scripts/generate_mock_exams.py"],
+        inputs=["scripts/generate_mock_exams.py", *[f"public/data/{b}.json" for b in BANKS]],
+        outputs=[f"public/data/{b}_exams.json" for b in BANKS],
+    ),
+    Stage(
+        "precache",
+        ["scripts/generate_precache_manifest.py"],
+        inputs=[
+            "scripts/generate_precache_manifest.py",
+            *[f"public/data/{b}{suffix}.json" for b in BANKS for suffix in ("", "_stats", "_exams", "_search", "_related")],
+            "public/data/answer_patterns.json",
+            "public/data/professional_study_aids.json",
+            "public/data/general_study_aids.json",
+            "public/data/professional_images.json",
+            "public/data/general_images.json",
+            "webp_urls.json",
+        ],
+        outputs=["public/precache-manifest.json"],
+        optional=["webp_urls.json"],  # without it image revisions fall back to URL + size
+    ),
+    Stage(
+        "reading",
+        ["scripts/render_reading_pages.py"],
+        inputs=[
+            "scripts/render_reading_pages.py",
+            *[f"public/data/{b}.json" for b in BANKS],
+            "public/data/professional_images.json",
+            "public/data/general_images.json",
+        ],
+        outputs=["public/read", "public/sitemap.xml"],
+    ),
+]
+
+
+def link_stages(stages: list[Stage]) -> dict[str, Stage]:
+    """Fill in deps from output → input overlap (directories cover their contents)."""
+    producers = {out: s.name for s in stages for out in s.outputs}
+    for stage in stages:
+        stage.deps = sorted({
+            producers[out] for inp in stage.inputs for out in producers
+            if producers[out] != stage.name and (inp == out or inp.startswith(out + "/"))
+        })
+    return {s.name: s for s in stages}
+
+
+# ---------------------------------------------------------------------------
+# Fingerprints
+# ---------------------------------------------------------------------------
+
+class Fingerprinter:
+    """Content hashes with a (size, mtime_ns) cache persisted between runs."""
+
+    def __init__(self, cache: dict[str, list], records: dict[str, dict], offline: bool) -> None:
+        self.cache = cache
+        self.records = records
+        self.offline = offline
+        self.remote: dict[str, str] = {}
+
+    def file(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path)
+        cached = self.cache.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        self.cache[key] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def path(self, rel: str) -> Optional[str]:
+        """Fingerprint of a file or directory tree; None if it does not exist."""
+        path = Path(rel)
+        if path.is_file():
+            return self.file(path)
+        if path.is_dir():
+            h = hashlib.sha256()
+            for child in sorted(p for p in path.rglob("*") if p.is_file()):
+                h.update(f"{child.relative_to(path)}\0{self.file(child)}\n".encode())
+            return h.hexdigest()
+        return None
+
+    def remote_part(self, stage: Stage) -> Optional[str]:
+        """Hash of the stage's remote source, fetched once per run; offline reuses the last one."""
+        if self.offline:
+            return self.records.get(stage.name, {}).get("inputs", {}).get("$remote")
+        if stage.name not in self.remote:
+            self.remote[stage.name] = hashlib.sha256(stage.remote().encode()).hexdigest()
+        return self.remote[stage.name]
+
+    def stage(self, stage: Stage) -> tuple[str, dict[str, Optional[str]]]:
+        parts = {rel: self.path(rel) for rel in stage.inputs}
+        parts["$command"] = " ".join(stage.command)
+        if stage.remote:
+            parts["$remote"] = self.remote_part(stage)
+        digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+        return digest, parts
+
+
+def load_state() -> dict:
+    if STATE_FILE.exists():
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    return {"stages": {}, "hashes": {}}
+
+
+def save_state(state: dict) -> None:
+    tmp = STATE_FILE.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=1), encoding="utf-8")
+    tmp.replace(STATE_FILE)
+
+
+def build_record(stage: Stage, fp: Fingerprinter, digest: str, parts: dict, seconds: float) -> dict:
+    return {
+        "fingerprint": digest,
+        "inputs": parts,
+        "outputs": {out: fp.path(out) for out in stage.outputs},
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seconds": round(seconds, 1),
+    }
+
+
+def why_dirty(stage: Stage, record: Optional[dict], parts: dict, digest: str, forced: bool) -> Optional[str]:
+    """Reason the stage must run, or None when it is up to date."""
+    if forced:
+        return "forced"
+    if record is None:
+        return "never built"
+    missing = [out for out in stage.outputs if out not in stage.local and not Path(out).exists()]
+    if missing:
+        return f"output missing: {', '.join(missing)}"
+    if record["fingerprint"] != digest:
+        changed = sorted(k for k, v in parts.items() if record["inputs"].get(k) != v)
+        return f"changed: {', '.join(changed)}"
+    return None
+
+
+def decide(stage: Stage, record: Optional[dict], parts: dict, digest: str, forced: bool,
+           requested: bool) -> tuple[str, str]:
+    """(action, reason): "run", "skip" (up to date), "block" (an input is missing
+    here) or "hold" (dirty paid stage that was not asked for)."""
+    missing_inputs = [
+        k for k, v in parts.items() if v is None and not k.startswith("$") and k not in stage.optional
+    ]
+    if missing_inputs:
+        return "block", f"input missing: {', '.join(missing_inputs)}"
+    reason = why_dirty(stage, record, parts, digest, forced)
+    if reason is None:
+        return "skip", "up to date"
+    if stage.paid and not (forced or requested):
+        return "hold", f"paid stage, name it to run ({reason})"
+    return "run", reason
+
+
+# ---------------------------------------------------------------------------
+# Planning / execution
+# ---------------------------------------------------------------------------
+
+def select(stages: dict[str, Stage], targets: list[str]) -> list[str]:
+    """Targets plus their transitive dependencies, in topological order."""
+    order: list[str] = []
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        for dep in stages[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for name in targets or list(stages):
+        visit(name)
+    return order
+
+
+def plan(stages: dict[str, Stage], order: list[str], state: dict, fp: Fingerprinter,
+         forced: set[str], requested: set[str]) -> list[tuple[str, str, str]]:
+    """(stage, action, reason) rows; stages behind a dirty dependency are decided at run time."""
+    rows = []
+    pending: set[str] = set()
+    for name in order:
+        stage = stages[name]
+        blocked = [d for d in stage.deps if d in pending]
+        if blocked:
+            pending.add(name)
+            rows.append((name, "maybe", f"re-checked after {', '.join(blocked)}"))
+            continue
+        digest, parts = fp.stage(stage)
+        action, reason = decide(stage, state["stages"].get(name), parts, digest, name in forced, name in requested)
+        if action == "run":
+            pending.add(name)
+        rows.append((name, action, reason))
+    return rows
+
+
+async def run_stage(stage: Stage) -> int:
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log_path = LOG_DIR / f"{stage.name}.log"
+    with log_path.open("w", encoding="utf-8") as log:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, str(ROOT / stage.command[0]), *stage.command[1:],
+            stdout=log, stderr=asyncio.subprocess.STDOUT, env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        )
+        return await proc.wait()
+
+
+async def execute(stages: dict[str, Stage], order: list[str], state: dict, fp: Fingerprinter,
+                  forced: set[str], requested: set[str], jobs: int) -> bool:
+    done: dict[str, asyncio.Event] = {name: asyncio.Event() for name in order}
+    failed: set[str] = set()
+    slots = asyncio.Semaphore(jobs)
+
+    async def one(name: str) -> None:
+        stage = stages[name]
+        try:
+            for dep in stage.deps:
+                if dep in done:
+                    await done[dep].wait()
+            if any(dep in failed for dep in stage.deps):
+                failed.add(name)
+                print(f"  ✗ {name:<11} skipped (dependency failed)")
+                return
+            async with slots:
+                digest, parts = await asyncio.to_thread(fp.stage, stage)
+                action, reason = decide(stage, state["stages"].get(name), parts, digest,
+                                        name in forced, name in requested)
+                if action == "skip":
+                    print(f"  · {name:<11} up to date")
+                    return
+                if action in ("block", "hold"):
+                    # Not a failure: later stages build from the files already there
+                    print(f"  ‖ {name:<11} {'blocked' if action == 'block' else 'held'} ({reason})")
+                    return
+                print(f"  ▶ {name:<11} running ({reason}) → {LOG_DIR / (name + '.log')}")
+                start = time.perf_counter()
+                code = await run_stage(stage)
+                elapsed = time.perf_counter() - start
+                if code != 0:
+                    failed.add(name)
+                    print(f"  ✗ {name:<11} failed (exit {code}, {elapsed:.1f}s)")
+                    return
+                # Record the fingerprint the stage actually ran against
+                state["stages"][name] = build_record(stage, fp, digest, parts, elapsed)
+                save_state(state)
+                print(f"  ✓ {name:<11} done ({elapsed:.1f}s)")
+        finally:
+            done[name].set()
+
+    await asyncio.gather(*(one(name) for name in order))
+    return not failed
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    stages = link_stages(STAGES)
+    parser = argparse.ArgumentParser(description="Incremental build of the data pipeline")
+    parser.add_argument("targets", nargs="*", metavar="STAGE", help=f"stages to build (default: all of {', '.join(stages)})")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan and exit")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help=f"stages run in parallel (default {DEFAULT_JOBS})")
+    parser.add_argument("--force", nargs="+", default=[], choices=list(stages), metavar="STAGE", help="rebuild these stages")
+    parser.add_argument("--offline", action="store_true", help="do not check the CAA website for new PDFs")
+    parser.add_argument(
+        "--mark-built", action="store_true",
+        help="record the current files as up to date without running anything (adopt an existing checkout)",
+    )
+    args = parser.parse_args()
+    unknown = [t for t in args.targets if t not in stages]
+    if unknown:
+        parser.error(f"unknown stage: {', '.join(unknown)}")
+
+    os.chdir(ROOT)
+    state = load_state()
+    fp = Fingerprinter(state.setdefault("hashes", {}), state.setdefault("stages", {}), args.offline)
+    order = select(stages, args.targets)
+    forced = set(args.force)
+    requested = set(args.targets)
+
+    if args.mark_built:
+        for name in order:
+            stage = stages[name]
+            digest, parts = fp.stage(stage)
+            state["stages"][name] = build_record(stage, fp, digest, parts, 0.0)
+        save_state(state)
+        print(f"Marked {', '.join(order)} as built.")
+        return
+
+    print(f"{'stage':<11} {'action':<6} reason")
+    for name, action, reason in plan(stages, order, state, fp, forced, requested):
+        print(f"{name:<11} {action:<6} {reason}")
+    save_state(state)  # keep freshly computed hashes even on a dry run
+    if args.dry_run:
+        return
+
+    print()
+    ok = asyncio.run(execute(stages, order, state, fp, forced, requested, args.jobs))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
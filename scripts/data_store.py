@@ -0,0 +1,468 @@
+"""
+data_store.py
+
+One indexed SQLite database (uav_quiz.db, not committed) holding everything
+the pipeline writes as separate JSON files — the banks and their whitelists,
+<bank>_study_aids.json, <bank>_image_analysis.json, <bank>_images.json and
+webp_urls.json — so ad-hoc questions are one query instead of a hand-written
+join:
+
+    uv run scripts/data_store.py questions --tier 1 --chapter 第三章 --no-image
+    uv run scripts/data_store.py sql "SELECT chapter, count(*) FROM question_overview
+                                      WHERE bank = 'professional' AND NOT has_aid GROUP BY chapter"
+
+Tables are keyed by (bank, idx), idx being the array position used by every
+join file (see question_bank.py). Typed columns hold what is filtered on
+(chapter, tier, reused_from, image URL…); join tables also keep each record's
+original JSON in `data`, so `export` writes the JSON artifacts back byte for
+byte. The `question_overview` view joins them per question, and the FTS5
+table `search` (trigram tokenizer, so Chinese substrings of 3+ characters are
+indexed) covers question, option and study-aid text.
+
+Every command first refreshes the database incrementally: a source is reloaded
+only when its content hash changed (hashes cached by size and mtime), and the
+search rows of a bank are rebuilt only when its questions or aids changed. A
+source file that has disappeared keeps its rows, so `export` can regenerate it.
+`export` never overwrites a file whose content differs from what the database
+last loaded (possible with --no-refresh): it reports the file and exits 1.
+
+Usage:
+    uv run scripts/data_store.py refresh                  # load what changed
+    uv run scripts/data_store.py search 升力係數 --bank professional
+    uv run scripts/data_store.py questions --bank general --no-aid --limit 20
+    uv run scripts/data_store.py report                   # coverage per bank and chapter
+    uv run scripts/data_store.py sql "SELECT * FROM image_analysis WHERE tier = '1' LIMIT 5"
+    uv run scripts/data_store.py export --check           # would export reproduce the JSON files?
+    uv run scripts/data_store.py export --out /tmp/data   # regenerate the JSON artifacts
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "images"))
+from question_bank import BANKS, DATA_DIR, Question  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+DB_FILE = Path("uav_quiz.db")
+WEBP_URLS_FILE = Path("webp_urls.json")
+WEBP_URLS_BANK = "professional"  # convert_and_upload.py only handles professional images
+QUESTION_FIELDS = ("id", "question", "options", "answer", "chapter", "can_memorize_directly")
+JOIN_TABLES = ("study_aids", "image_analysis", "images", "webp_urls")
+MIN_MATCH_CHARS = 3  # trigram tokenizer: shorter queries fall back to LIKE
+DEFAULT_LIMIT = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT, loaded_at TEXT
+);
+CREATE TABLE IF NOT EXISTS banks (
+    bank TEXT PRIMARY KEY,
+    key_order TEXT NOT NULL,       -- top-level keys of <bank>.json, in file order
+    chapter_note TEXT,
+    extra TEXT                     -- any other top-level keys, as JSON
+);
+CREATE TABLE IF NOT EXISTS questions (
+    bank TEXT, idx INTEGER, id INTEGER, chapter TEXT, question TEXT,
+    a TEXT, b TEXT, c TEXT, d TEXT, answer TEXT, can_memorize INTEGER, key TEXT,
+    PRIMARY KEY (bank, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS questions_chapter ON questions (bank, chapter);
+CREATE INDEX IF NOT EXISTS questions_key ON questions (key);
+CREATE TABLE IF NOT EXISTS whitelist (
+    bank TEXT, position INTEGER, text TEXT, PRIMARY KEY (bank, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS study_aids (
+    bank TEXT, idx INTEGER, position INTEGER,
+    keywords TEXT, mnemonic TEXT, explanation TEXT, reused_from TEXT, data TEXT NOT NULL,
+    PRIMARY KEY (bank, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS image_analysis (
+    bank TEXT, idx INTEGER, position INTEGER, tier TEXT, shared_with INTEGER, data TEXT NOT NULL,
+    PRIMARY KEY (bank, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS image_analysis_tier ON image_analysis (bank, tier);
+CREATE TABLE IF NOT EXISTS images (
+    bank TEXT, idx INTEGER, position INTEGER, url TEXT, data TEXT NOT NULL,
+    PRIMARY KEY (bank, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS webp_urls (
+    bank TEXT, idx INTEGER, position INTEGER, data TEXT NOT NULL,
+    PRIMARY KEY (bank, idx)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+    bank UNINDEXED, idx UNINDEXED, question, options, aid, tokenize = 'trigram'
+);
+CREATE VIEW IF NOT EXISTS question_overview AS
+    SELECT q.bank, q.idx, q.id, q.chapter, q.question, q.answer, q.can_memorize,
+           a.tier, a.shared_with,
+           s.idx IS NOT NULL AS has_aid, s.reused_from,
+           i.idx IS NOT NULL AS has_image, i.url AS image_url
+    FROM questions q
+    LEFT JOIN image_analysis a USING (bank, idx)
+    LEFT JOIN study_aids s USING (bank, idx)
+    LEFT JOIN images i USING (bank, idx);
+"""
+
+
+@dataclass(frozen=True)
+class Source:
+    path: Path
+    table: str  # "questions" for a bank file, else one of JOIN_TABLES
+    bank: str
+
+
+def sources(data_dir: Path = DATA_DIR) -> list[Source]:
+    found = []
+    for bank in BANKS:
+        found.append(Source(data_dir / f"{bank}.json", "questions", bank))
+        for table in JOIN_TABLES[:3]:
+            found.append(Source(data_dir / f"{bank}_{table}.json", table, bank))
+    found.append(Source(WEBP_URLS_FILE, "webp_urls", WEBP_URLS_BANK))
+    return found
+
+
+def connect(path: Path = DB_FILE, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        if not path.exists():
+            sys.exit(f"找不到資料庫 {path}，請先執行 refresh")
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def load_bank(conn: sqlite3.Connection, bank: str, data: dict) -> None:
+    for table in ("banks", "questions", "whitelist"):
+        conn.execute(f"DELETE FROM {table} WHERE bank = ?", (bank,))
+    known = {"questions", "answer_option_whitelist", "chapter_note"}
+    extra = {k: v for k, v in data.items() if k not in known}
+    conn.execute(
+        "INSERT INTO banks VALUES (?, ?, ?, ?)",
+        (bank, json.dumps(list(data)), data.get("chapter_note"), json.dumps(extra, ensure_ascii=False) if extra else None),
+    )
+    rows = []
+    for i, raw in enumerate(data["questions"]):
+        q = Question(i, raw, bank)
+        options = [q.options.get(letter) for letter in "ABCD"]
+        memorize = raw.get("can_memorize_directly")
+        rows.append((bank, i, q.id, q.chapter, q.question, *options, q.answer,
+                     None if memorize is None else int(memorize), q.key))
+    conn.executemany("INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT INTO whitelist VALUES (?, ?, ?)",
+        [(bank, i, text) for i, text in enumerate(data.get("answer_option_whitelist", []))],
+    )
+
+
+def join_columns(table: str, value) -> tuple:
+    """Typed columns of one join-file record (besides bank, idx, position, data)."""
+    if table == "study_aids":
+        return tuple(value.get(k) for k in ("keywords", "mnemonic", "explanation", "reused_from"))
+    if table == "image_analysis":
+        return (value.get("tier"), value.get("shared_with"))
+    if table == "images":
+        return (value if isinstance(value, str) else value.get("src"),)
+    return ()
+
+
+def load_join(conn: sqlite3.Connection, table: str, bank: str, data: dict) -> None:
+    conn.execute(f"DELETE FROM {table} WHERE bank = ?", (bank,))
+    rows = [
+        (bank, int(idx), position, *join_columns(table, value), json.dumps(value, ensure_ascii=False))
+        for position, (idx, value) in enumerate(data.items())
+    ]
+    if rows:
+        conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+
+
+def rebuild_search(conn: sqlite3.Connection, bank: str) -> None:
+    conn.execute("DELETE FROM search WHERE bank = ?", (bank,))
+    conn.execute(
+        """
+        INSERT INTO search (bank, idx, question, options, aid)
+        SELECT q.bank, q.idx, q.question,
+               ifnull(q.a, '') || ' ' || ifnull(q.b, '') || ' ' || ifnull(q.c, '') || ' ' || ifnull(q.d, ''),
+               ifnull(s.keywords, '') || ' ' || ifnull(s.mnemonic, '') || ' ' || ifnull(s.explanation, '') || ' '
+               || ifnull((SELECT group_concat(value, ' ') FROM json_each(s.data, '$.wrong_options')), '')
+        FROM questions q LEFT JOIN study_aids s USING (bank, idx)
+        WHERE q.bank = ?
+        """,
+        (bank,),
+    )
+
+
+def file_hash(conn: sqlite3.Connection, path: Path) -> tuple[int, int, str, bool]:
+    """(size, mtime_ns, sha256, changed) — the file is only read when size or mtime moved."""
+    st = path.stat()
+    row = conn.execute("SELECT size, mtime_ns, sha256 FROM sources WHERE path = ?", (str(path),)).fetchone()
+    if row and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns:
+        return st.st_size, st.st_mtime_ns, row["sha256"], False
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    return st.st_size, st.st_mtime_ns, digest, row is None or row["sha256"] != digest
+
+
+def refresh(conn: sqlite3.Connection, force: bool = False, quiet: bool = False) -> list[Source]:
+    """Reload every source whose content changed; returns the reloaded ones."""
+    started = time.perf_counter()
+    reloaded = []
+    with conn:
+        for source in sources():
+            if not source.path.exists():
+                continue
+            size, mtime_ns, digest, changed = file_hash(conn, source.path)
+            if changed or force:
+                data = json.loads(source.path.read_text(encoding="utf-8"))
+                if source.table == "questions":
+                    load_bank(conn, source.bank, data)
+                else:
+                    load_join(conn, source.table, source.bank, data)
+                reloaded.append(source)
+            conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, datetime('now'))",
+                (str(source.path), size, mtime_ns, digest),
+            )
+        for bank in sorted({s.bank for s in reloaded if s.table in ("questions", "study_aids")}):
+            rebuild_search(conn, bank)
+    if reloaded and not quiet:
+        names = ", ".join(str(s.path) for s in reloaded)
+        print(f"已更新 {len(reloaded)} 個來源（{time.perf_counter() - started:.2f}s）：{names}", file=sys.stderr)
+    return reloaded
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def export_bank(conn: sqlite3.Connection, bank: str) -> dict | None:
+    meta = conn.execute("SELECT * FROM banks WHERE bank = ?", (bank,)).fetchone()
+    if meta is None:
+        return None
+    questions = []
+    for row in conn.execute("SELECT * FROM questions WHERE bank = ? ORDER BY idx", (bank,)):
+        record = {
+            "id": row["id"], "question": row["question"],
+            "options": {letter: row[letter.lower()] for letter in "ABCD" if row[letter.lower()] is not None},
+            "answer": row["answer"], "chapter": row["chapter"],
+            "can_memorize_directly": None if row["can_memorize"] is None else bool(row["can_memorize"]),
+        }
+        questions.append({k: record[k] for k in QUESTION_FIELDS if record[k] is not None})
+    whitelist = [r["text"] for r in conn.execute("SELECT text FROM whitelist WHERE bank = ? ORDER BY position", (bank,))]
+    values = {"questions": questions, "answer_option_whitelist": whitelist, "chapter_note": meta["chapter_note"]}
+    values.update(json.loads(meta["extra"]) if meta["extra"] else {})
+    return {k: values[k] for k in json.loads(meta["key_order"])}
+
+
+def export_join(conn: sqlite3.Connection, table: str, bank: str) -> dict | None:
+    rows = conn.execute(f"SELECT idx, data FROM {table} WHERE bank = ? ORDER BY position", (bank,)).fetchall()
+    loaded = conn.execute("SELECT 1 FROM sources WHERE path = ?", (str(source_path(table, bank)),)).fetchone()
+    if not rows and not loaded:
+        return None
+    return {str(r["idx"]): json.loads(r["data"]) for r in rows}
+
+
+def source_path(table: str, bank: str) -> Path:
+    return next(s.path for s in sources() if s.table == table and s.bank == bank)
+
+
+def newer_than_db(conn: sqlite3.Connection, path: Path) -> bool:
+    """The file changed since the database last loaded it (exporting would discard that change)."""
+    if not path.exists():
+        return False
+    row = conn.execute("SELECT sha256 FROM sources WHERE path = ?", (str(path),)).fetchone()
+    return row is not None and row["sha256"] != hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def cmd_export(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    differing = []
+    for source in sources():
+        data = export_bank(conn, source.bank) if source.table == "questions" else export_join(conn, source.table, source.bank)
+        if data is None:
+            continue
+        text = json.dumps(data, ensure_ascii=False, indent=2)  # the layout every pipeline script writes
+        target = Path(args.out) / source.path.name if args.out else source.path
+        if args.check:
+            same = target.exists() and target.read_text(encoding="utf-8") == text
+            print(f"{'一致' if same else '不一致':<4} {target}")
+            if not same:
+                differing.append(target)
+            continue
+        if target == source.path and newer_than_db(conn, target):
+            print(f"跳過 {target}：檔案比資料庫新，請先 refresh", file=sys.stderr)
+            differing.append(target)
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".json.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(target)
+        print(f"→ {target}")
+    if differing:
+        sys.exit(1)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def print_rows(rows: list[sqlite3.Row], width: int = 60) -> None:
+    if not rows:
+        print("（沒有結果）")
+        return
+    columns = rows[0].keys()
+    cells = [[("" if v is None else str(v)).replace("\n", " ")[:width] for v in row] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+    print(f"（{len(rows)} 筆）")
+
+
+def cmd_search(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    bank_filter = "AND bank = :bank" if args.bank else ""
+    if len(args.text) >= MIN_MATCH_CHARS:
+        sql = f"""
+            SELECT bank, idx, snippet(search, -1, '[', ']', '…', 12) AS hit
+            FROM search WHERE search MATCH :match {bank_filter} ORDER BY rank LIMIT :limit
+        """
+    else:
+        sql = f"""
+            SELECT bank, idx, question AS hit FROM search
+            WHERE (question LIKE :like OR options LIKE :like OR aid LIKE :like) {bank_filter}
+            ORDER BY bank, idx LIMIT :limit
+        """
+    params = {
+        "match": '"' + args.text.replace('"', '""') + '"', "like": f"%{args.text}%",
+        "bank": args.bank, "limit": args.limit,
+    }
+    print_rows(conn.execute(sql, params).fetchall(), width=80)
+
+
+def cmd_questions(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    where, params = [], {}
+    if args.bank:
+        where.append("bank = :bank")
+        params["bank"] = args.bank
+    if args.chapter:
+        where.append("chapter LIKE :chapter")
+        params["chapter"] = f"%{args.chapter}%"
+    if args.tier:
+        where.append("tier = :tier")
+        params["tier"] = args.tier
+    if args.no_image:
+        where.append("NOT has_image")
+    if args.has_image:
+        where.append("has_image")
+    if args.no_aid:
+        where.append("NOT has_aid")
+    if args.memorizable:
+        where.append("can_memorize")
+    sql = (
+        "SELECT bank, idx, id, chapter, tier, has_aid, has_image, question FROM question_overview"
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + " ORDER BY bank, idx LIMIT :limit"
+    )
+    params["limit"] = args.limit
+    print_rows(conn.execute(sql, params).fetchall())
+
+
+def cmd_report(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    rows = conn.execute(
+        """
+        SELECT bank, chapter, count(*) AS questions, sum(can_memorize) AS memorize,
+               sum(has_aid) AS aids, sum(reused_from IS NOT NULL) AS reused,
+               sum(tier = '1') AS tier1, sum(tier = '2') AS tier2, sum(tier = '3') AS tier3,
+               sum(has_image) AS images,
+               sum(tier IN ('1', '2') AND NOT has_image) AS missing
+        FROM question_overview
+        WHERE :bank IS NULL OR bank = :bank
+        GROUP BY bank, chapter ORDER BY bank, min(idx)
+        """,
+        {"bank": args.bank},
+    ).fetchall()
+    print_rows(rows, width=24)
+
+
+def cmd_sql(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    try:
+        print_rows(conn.execute(args.query).fetchall())
+    except sqlite3.Error as e:
+        sys.exit(f"SQL 錯誤：{e}")
+
+
+def cmd_refresh(conn: sqlite3.Connection, args: argparse.Namespace) -> None:
+    if not refresh(conn, force=args.force):
+        print("資料庫已是最新", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite/FTS5 store of every pipeline artifact, with queries")
+    parser.add_argument("--db", type=Path, default=DB_FILE, help=f"資料庫路徑（預設 {DB_FILE}）")
+    parser.add_argument("--no-refresh", action="store_true", help="查詢前不檢查 JSON 來源是否有變更")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("refresh", help="從 JSON 來源增量更新資料庫")
+    p.add_argument("--force", action="store_true", help="全部重新載入")
+    p.set_defaults(func=cmd_refresh)
+
+    p = sub.add_parser("search", help="全文搜尋題目、選項與學習輔助")
+    p.add_argument("text", help="搜尋字串（3 字以上走 FTS5 索引）")
+    p.add_argument("--bank", choices=BANKS, help="只搜尋此題庫")
+    p.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"最多幾筆（預設 {DEFAULT_LIMIT}）")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("questions", help="依條件列出題目")
+    p.add_argument("--bank", choices=BANKS, help="題庫 id")
+    p.add_argument("--chapter", help="章節名稱包含此字串，例如 第三章")
+    p.add_argument("--tier", choices=("1", "2", "3"), help="圖片分析 tier")
+    images = p.add_mutually_exclusive_group()
+    images.add_argument("--no-image", action="store_true", help="只列沒有圖片的題目")
+    images.add_argument("--has-image", action="store_true", help="只列有圖片的題目")
+    p.add_argument("--no-aid", action="store_true", help="只列沒有學習輔助的題目")
+    p.add_argument("--memorizable", action="store_true", help="只列可無腦背的題目")
+    p.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"最多幾筆（預設 {DEFAULT_LIMIT}）")
+    p.set_defaults(func=cmd_questions)
+
+    p = sub.add_parser("report", help="各題庫、章節的學習輔助 / 圖片分析 / 圖片覆蓋率")
+    p.add_argument("--bank", choices=BANKS, help="只列此題庫")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("sql", help="執行任意唯讀 SQL（資料表見 SCHEMA）")
+    p.add_argument("query", help="SQL 查詢")
+    p.set_defaults(func=cmd_sql)
+
+    p = sub.add_parser("export", help="由資料庫重新產生 JSON 檔")
+    p.add_argument("--out", help="輸出目錄（預設寫回原位置）")
+    p.add_argument("--check", action="store_true", help="只比對，不寫檔；有不一致時 exit 1")
+    p.set_defaults(func=cmd_export)
+
+    args = parser.parse_args()
+    if args.command != "refresh" and not args.no_refresh:
+        conn = connect(args.db)
+        try:
+            refresh(conn)
+        finally:
+            conn.close()
+    # Ad-hoc SQL runs on a read-only connection
+    conn = connect(args.db, readonly=args.command == "sql")
+    try:
+        args.func(conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
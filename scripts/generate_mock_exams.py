@@ -0,0 +1,172 @@
+"""
+generate_mock_exams.py
+
+Writes public/data/<bank>_exams.json: thousands of pre-built, reproducible
+mock exam papers per bank, so a paper can be shared by its number ("試卷 #123")
+and practice packs work offline as plain static files. The browser still
+shuffles its own free-practice sets (shuffleArray in src/utils.ts).
+
+Every paper takes a fixed number of questions from each chapter (proportional
+to the chapter's share of the bank unless --quota says otherwise), without
+repeats. --skip-memorizable leaves out the whitelist-trivial questions
+(can_memorize_directly), which need no practice under exam conditions.
+
+Sampling is vectorized with NumPy: per chapter, each paper draws one random
+key per question of the chapter's pool and keeps the `quota` smallest
+(argpartition — a uniform sample without replacement), for a block of
+BLOCK_EXAMS papers at once; the papers' question order is then shuffled by
+argsort of random keys. The same --seed always gives the same papers.
+
+    {
+      "version": 1,
+      "questions": 588,               # bank size the papers were built for
+      "seed": 0,
+      "size": 50,                     # questions per paper
+      "count": 1000,                  # papers
+      "skip_memorizable": false,
+      "chapters": [{"chapter": "第一章 …", "count": 12}, ...],   # quota per chapter
+      "exams": "AQAHAC4B…"            # base64 of count × size uint16 LE question indices
+    }
+
+Paper n is bytes [2·size·n, 2·size·(n+1)) of the decoded `exams`
+(decodeExam() in src/utils.ts decodes just that slice).
+
+Usage:
+    uv run scripts/generate_mock_exams.py                       # every bank, 1000 papers of 50
+    uv run scripts/generate_mock_exams.py --bank general --count 5000 --size 40 --seed 7
+    uv run scripts/generate_mock_exams.py --bank professional --quota 12,20,11,7 --skip-memorizable
+"""
+
+import argparse
+import base64
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "images"))
+from question_bank import BANKS, DATA_DIR, QuestionBank  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+VERSION = 1
+DEFAULT_COUNT = 1000
+DEFAULT_SIZE = 50
+DEFAULT_SEED = 0
+BLOCK_EXAMS = 4096  # papers sampled per block; bounds the (papers × pool) key matrix
+
+
+def chapter_pools(bank: QuestionBank, skip_memorizable: bool) -> dict[str, np.ndarray]:
+    """Question indices per chapter, chapters in order of first appearance."""
+    pools: dict[str, list[int]] = {}
+    for q in bank:
+        pool = pools.setdefault(q.chapter, [])
+        if not (skip_memorizable and q.can_memorize_directly):
+            pool.append(q.index)
+    return {chapter: np.array(pool, dtype=np.int64) for chapter, pool in pools.items()}
+
+
+def proportional_quotas(pool_sizes: list[int], size: int) -> list[int]:
+    """Largest-remainder split of `size` proportional to the pool sizes (never above a pool)."""
+    sizes = np.array(pool_sizes, dtype=np.float64)
+    exact = sizes / sizes.sum() * size
+    quotas = np.floor(exact).astype(np.int64)
+    for i in np.argsort(-(exact - quotas), kind="stable")[: size - quotas.sum()]:
+        quotas[i] += 1
+    return quotas.tolist()
+
+
+def sample_exams(pools: list[np.ndarray], quotas: list[int], count: int, rng: np.random.Generator) -> np.ndarray:
+    """(count, sum(quotas)) question indices: quota[i] distinct questions of pool i per paper, shuffled."""
+    size = sum(quotas)
+    exams = np.empty((count, size), dtype=np.uint16)
+    for start in range(0, count, BLOCK_EXAMS):
+        block = min(BLOCK_EXAMS, count - start)
+        parts = []
+        for pool, quota in zip(pools, quotas):
+            if quota == 0:
+                continue
+            keys = rng.random((block, len(pool)), dtype=np.float32)
+            chosen = keys.argsort(axis=1) if quota == len(pool) else np.argpartition(keys, quota - 1, axis=1)
+            parts.append(pool[chosen[:, :quota]])
+        papers = np.concatenate(parts, axis=1)
+        order = rng.random((block, size), dtype=np.float32).argsort(axis=1)
+        exams[start : start + block] = np.take_along_axis(papers, order, axis=1)
+    return exams
+
+
+def build_exams(bank: QuestionBank, count: int, size: int, quota: list[int] | None, seed: int,
+                skip_memorizable: bool) -> dict:
+    pools = chapter_pools(bank, skip_memorizable)
+    chapters = list(pools)
+    sizes = [len(p) for p in pools.values()]
+    if quota is None:
+        if size > sum(sizes):
+            raise ValueError(f"每份 {size} 題，但可出題的只有 {sum(sizes)} 題")
+        quota = proportional_quotas(sizes, size)
+    elif len(quota) != len(chapters):
+        raise ValueError(f"--quota 需 {len(chapters)} 個數字（{'、'.join(chapters)}）")
+    for chapter, want, have in zip(chapters, quota, sizes):
+        if want > have:
+            raise ValueError(f"{chapter} 配額 {want} 題，但只有 {have} 題可出")
+    if len(bank) > np.iinfo(np.uint16).max + 1:
+        raise ValueError(f"題庫 {len(bank)} 題超出 uint16 索引範圍")
+
+    # One independent stream per bank, so adding a bank never changes another bank's papers
+    rng = np.random.default_rng([seed, BANKS.index(bank.bank)])
+    exams = sample_exams(list(pools.values()), quota, count, rng)
+    return {
+        "version": VERSION,
+        "questions": len(bank),
+        "seed": seed,
+        "size": int(sum(quota)),
+        "count": count,
+        "skip_memorizable": skip_memorizable,
+        "chapters": [{"chapter": c, "count": int(n)} for c, n in zip(chapters, quota)],
+        "exams": base64.b64encode(exams.astype("<u2").tobytes()).decode("ascii"),
+    }
+
+
+def write_exams(exams: dict, path: Path) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(exams, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build seeded mock exam papers per bank")
+    parser.add_argument("--bank", nargs="+", choices=BANKS, help="題庫 id（預設全部）")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help=f"每個題庫幾份試卷（預設 {DEFAULT_COUNT}）")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help=f"每份題數，依章節比例分配（預設 {DEFAULT_SIZE}）")
+    parser.add_argument("--quota", help="各章節題數，逗號分隔、依章節出現順序（覆寫 --size）")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"亂數種子（預設 {DEFAULT_SEED}）")
+    parser.add_argument("--skip-memorizable", action="store_true", help="不出白名單可無腦背的題目")
+    args = parser.parse_args()
+    quota = [int(n) for n in args.quota.split(",")] if args.quota else None
+
+    for bank in map(QuestionBank.load, args.bank or BANKS):
+        if not bank.exists():
+            print(f"[{bank.bank}] 跳過：找不到 {bank.path}")
+            continue
+        started = time.perf_counter()
+        try:
+            exams = build_exams(bank, args.count, args.size, quota, args.seed, args.skip_memorizable)
+        except ValueError as e:
+            print(f"[{bank.bank}] 跳過：{e}")
+            continue
+        elapsed = time.perf_counter() - started
+        path = DATA_DIR / f"{bank.bank}_exams.json"
+        write_exams(exams, path)
+        quotas = "/".join(str(c["count"]) for c in exams["chapters"])
+        print(
+            f"[{bank.bank}] {exams['count']} 份 × {exams['size']} 題（章節 {quotas}），"
+            f"{elapsed * 1000:.0f} ms，{path.stat().st_size / 1024:.0f} KB → {path}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+generate_precache_manifest.py
+
+Writes public/precache-manifest.json: every data file the app fetches and
+every image variant it can show, each with a revision hash and its size,
+grouped into buckets that public/sw.js downloads separately:
+
+    core     <bank>.json, <bank>_stats.json, <bank>_exams.json, answer_patterns.json
+             — precached on install, enough for offline exam practice
+    study    <bank>_study_aids.json, <bank>_search.json, <bank>_related.json
+    images   <bank>_images.json and every image variant it references
+
+    {
+      "version": 1,
+      "revision": "3f9c…",                        # digest of all entries below
+      "buckets": {
+        "core": {
+          "budget": 2500000, "bytes": 1261000,
+          "entries": [{"url": "data/general.json", "revision": "a41b…", "bytes": 172113, "banks": ["general"]}, ...]
+        }, ...
+      }
+    }
+
+Data-file URLs are relative to the site root (the service worker's scope);
+images are absolute. `banks` lists the banks an entry belongs to (images
+shared through near-duplicates list several; [] = every bank), so a bucket
+can be downloaded for one bank only. Revisions are content hashes: SHA-256
+of the file, or for an image the source PNG hash recorded in webp_urls.json
+(the URL stays the same when an image is re-uploaded); images without that
+record — legacy single-URL entries — are identified by URL and have no size.
+
+Each bucket has a size budget; the script exits 1 if a bucket outgrows it,
+so a build that would make the offline download balloon fails loudly.
+
+Usage:
+    uv run scripts/generate_precache_manifest.py
+    uv run scripts/generate_precache_manifest.py --check     # budgets only, write nothing
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "images"))
+from question_bank import BANKS, DATA_DIR  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+VERSION = 1
+OUTPUT_FILE = Path("public/precache-manifest.json")
+WEBP_URLS_FILE = Path("webp_urls.json")
+REVISION_CHARS = 16
+
+# bucket: (per-bank data files, shared data files, budget in bytes)
+BUCKETS = {
+    "core": (("{bank}.json", "{bank}_stats.json", "{bank}_exams.json"), ("answer_patterns.json",), 2_500_000),
+    "study": (("{bank}_study_aids.json", "{bank}_search.json", "{bank}_related.json"), (), 4_000_000),
+    "images": (("{bank}_images.json",), (), 60_000_000),
+}
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:REVISION_CHARS]
+
+
+def file_entry(path: Path, banks: list[str]) -> dict:
+    data = path.read_bytes()
+    return {"url": path.relative_to(OUTPUT_FILE.parent).as_posix(), "revision": digest(data), "bytes": len(data), "banks": banks}
+
+
+def uploaded_revisions() -> dict[str, str]:
+    """Image URL → revision, from the source PNG hash and encode settings convert_and_upload.py recorded."""
+    if not WEBP_URLS_FILE.exists():
+        return {}
+    revisions = {}
+    for variants in json.loads(WEBP_URLS_FILE.read_text(encoding="utf-8")).values():
+        if isinstance(variants, str):
+            continue
+        for v in variants:
+            if v.get("source_sha256"):
+                key = f"{v['source_sha256']}:{v.get('encode_settings', '')}:{v['url']}"
+                revisions[v["url"]] = digest(key.encode())
+    return revisions
+
+
+def image_entries(manifests: dict[str, dict]) -> list[dict]:
+    """One entry per distinct image variant URL across every bank's <bank>_images.json."""
+    revisions = uploaded_revisions()
+    entries: dict[str, dict] = {}
+    for bank, manifest in manifests.items():
+        for image in manifest.values():
+            if isinstance(image, str):
+                variants = [{"url": image}]
+            else:
+                variants = image.get("variants") or [{"url": image["src"]}]
+            for v in variants:
+                entry = entries.get(v["url"])
+                if entry is None:
+                    entry = entries[v["url"]] = {
+                        "url": v["url"],
+                        "revision": revisions.get(v["url"]) or digest(f"{v['url']}:{v.get('bytes')}".encode()),
+                        "bytes": v.get("bytes"),
+                        "banks": [],
+                    }
+                    if isinstance(image, dict):
+                        entry["group"] = image["src"]  # variants of one image: any of them can stand in offline
+                if bank not in entry["banks"]:
+                    entry["banks"].append(bank)
+    return list(entries.values())
+
+
+def build_manifest() -> dict:
+    buckets = {}
+    for name, (per_bank, shared, budget) in BUCKETS.items():
+        entries = []
+        for bank in BANKS:
+            for pattern in per_bank:
+                path = DATA_DIR / pattern.format(bank=bank)
+                if path.exists():
+                    entries.append(file_entry(path, [bank]))
+        entries += [file_entry(DATA_DIR / f, []) for f in shared if (DATA_DIR / f).exists()]
+        if name == "images":
+            manifests = {
+                bank: json.loads((DATA_DIR / f"{bank}_images.json").read_text(encoding="utf-8"))
+                for bank in BANKS if (DATA_DIR / f"{bank}_images.json").exists()
+            }
+            entries += image_entries(manifests)
+        buckets[name] = {"budget": budget, "bytes": sum(e["bytes"] or 0 for e in entries), "entries": entries}
+
+    all_entries = sorted(f"{e['url']}@{e['revision']}" for b in buckets.values() for e in b["entries"])
+    return {"version": VERSION, "revision": digest("\n".join(all_entries).encode()), "buckets": buckets}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the service-worker precache manifest with per-bucket size budgets")
+    parser.add_argument("--check", action="store_true", help="只檢查各 bucket 大小預算，不寫檔")
+    args = parser.parse_args()
+
+    manifest = build_manifest()
+    over = []
+    for name, bucket in manifest["buckets"].items():
+        unknown = sum(1 for e in bucket["entries"] if e["bytes"] is None)
+        note = f"，{unknown} 項大小未知" if unknown else ""
+        print(
+            f"{name:<7} {len(bucket['entries']):>5} 項  {bucket['bytes'] / 1e6:6.2f} MB / "
+            f"預算 {bucket['budget'] / 1e6:.1f} MB{note}"
+        )
+        if bucket["bytes"] > bucket["budget"]:
+            over.append(name)
+            largest = sorted((e for e in bucket["entries"] if e["bytes"]), key=lambda e: -e["bytes"])[:5]
+            for e in largest:
+                print(f"          {e['bytes'] / 1e6:6.2f} MB  {e['url']}")
+
+    if not args.check:
+        tmp = OUTPUT_FILE.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(OUTPUT_FILE)
+        print(f"→ {OUTPUT_FILE}（{OUTPUT_FILE.stat().st_size / 1024:.0f} KB，revision {manifest['revision']}）")
+    if over:
+        sys.exit(f"超出預算：{', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
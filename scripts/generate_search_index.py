@@ -0,0 +1,138 @@
+"""
+generate_search_index.py
+
+Writes public/data/<bank>_search.json: an inverted index of character bigrams
+over each question, its options and its study aid (keywords, mnemonic,
+explanation, wrong-option notes), so StudyView / ReadingView can search
+everything — including text they never render in full — without scanning
+every string on each keystroke.
+
+Text is NFKC-normalised and lower-cased, then split into runs of letters and
+digits (punctuation and whitespace end a run); every adjacent pair of
+characters inside a run is a gram. src/search.ts applies the same rules to the
+query.
+
+    {
+      "version": 1,
+      "questions": 588,                          # bank size the index was built for
+      "fields": ["question", "options", ...],    # bit i of a field mask = fields[i]
+      "grams": "視距視線…",                      # every gram, 2 code points each
+      "postings": "DgBEAk…"                      # one posting list per gram, same order
+    }
+
+A posting list is a varint count followed by one varint per question holding
+it, `gap << 6 | mask`: questions ascending and delta-encoded (the first gap is
+the index itself, each next one the distance from the previous), mask = which
+fields of that question contain the gram. Varints are base64url characters
+carrying 5 bits each, least significant first, with bit 5 set on every
+character but the last, so a typical posting costs two bytes.
+
+Usage:
+    uv run scripts/generate_search_index.py                  # every bank
+    uv run scripts/generate_search_index.py --bank general
+"""
+
+import argparse
+import json
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "images"))
+from question_bank import BANKS, DATA_DIR, Question, QuestionBank  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+VERSION = 1
+FIELDS = ("question", "options", "keywords", "mnemonic", "explanation", "wrong_options")
+MASK_BITS = 6  # one bit per FIELDS entry
+VARINT_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+_RUN = re.compile(r"[^\W_]+")  # letters and digits; same as /[\p{L}\p{N}]+/u in search.ts
+
+
+def grams(text: str) -> set[str]:
+    """Character bigrams within each letter/digit run of the normalised text."""
+    runs = _RUN.findall(unicodedata.normalize("NFKC", text).lower())
+    return {run[i : i + 2] for run in runs for i in range(len(run) - 1)}
+
+
+def field_texts(q: Question, aid: dict | None) -> list[list[str]]:
+    """Texts per FIELDS entry (a field may hold several, e.g. one per option)."""
+    aid = aid or {}
+    return [
+        [q.question],
+        list(q.options.values()),
+        [aid.get("keywords", "")],
+        [aid.get("mnemonic", "")],
+        [aid.get("explanation", "")],
+        list(aid.get("wrong_options", {}).values()),
+    ]
+
+
+def varint(n: int) -> str:
+    out = []
+    while True:
+        digit, n = n & 31, n >> 5
+        out.append(VARINT_ALPHABET[digit | 32 if n else digit])
+        if not n:
+            return "".join(out)
+
+
+def build_index(bank: QuestionBank) -> dict:
+    masks: dict[str, dict[int, int]] = defaultdict(dict)
+    for q in bank:
+        for bit, texts in enumerate(field_texts(q, bank.study_aid(q))):
+            for text in texts:
+                for gram in grams(text):
+                    docs = masks[gram]
+                    docs[q.index] = docs.get(q.index, 0) | (1 << bit)
+
+    ordered = sorted(masks)
+    postings = []
+    for gram in ordered:
+        docs = sorted(masks[gram].items())
+        postings.append(varint(len(docs)))
+        prev = 0
+        for doc, mask in docs:
+            postings.append(varint((doc - prev) << MASK_BITS | mask))
+            prev = doc
+    return {
+        "version": VERSION,
+        "questions": len(bank),
+        "fields": list(FIELDS),
+        "grams": "".join(ordered),
+        "postings": "".join(postings),
+    }
+
+
+def write_index(index: dict, path: Path) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(index, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build per-bank bigram search indexes")
+    parser.add_argument("--bank", nargs="+", choices=BANKS, help="題庫 id（預設全部）")
+    args = parser.parse_args()
+
+    for bank in map(QuestionBank.load, args.bank or BANKS):
+        if not bank.exists():
+            print(f"[{bank.bank}] 跳過：找不到 {bank.path}")
+            continue
+        index = build_index(bank)
+        path = DATA_DIR / f"{bank.bank}_search.json"
+        write_index(index, path)
+        aided = sum(1 for v in bank.study_aids.values() if v)
+        print(
+            f"[{bank.bank}] {len(bank)} 題（{aided} 題含學習輔助）, "
+            f"{len(index['grams']) // 2} grams, {path.stat().st_size / 1024:.0f} KB → {path}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import json
 import os
@@ -7,6 +8,10 @@ from typing import Dict, Any, List
 from tqdm.asyncio import tqdm
 from dotenv import load_dotenv
 
+from preclassify_questions import TARGET_PRECISION, build_classifier, heuristic_result, tokenize
+from question_bank import Question, QuestionBank
+from telemetry import Telemetry, error_cause
+
 try:
     from google import genai
     from google.genai import types
@@ -17,12 +22,18 @@ except ImportError:
 load_dotenv()
 
 # 配置
-INPUT_FILE = Path("public/data/professional.json")
-OUTPUT_FILE = Path("public/data/professional_image_analysis.json")
+DATA_DIR = Path("public/data")
+DEFAULT_BANK = "professional"
 MODEL_ID = "gemini-3-flash-preview"
-BATCH_SIZE = 10 
 CONCURRENCY = 5  # 同時發送 5 個請求，大幅提升速度
-CHECKPOINT_EVERY = 5
+
+# 批次打包：以估計 token 數填滿每個請求，而非固定題數
+TOKEN_BUDGET = 12000          # 每個請求的估計 token 上限（輸入 + 輸出）
+OUTPUT_TOKENS_PER_QUESTION = 350  # 每題分析結果（含英文 prompt）的估計輸出 token
+MAX_BATCH_QUESTIONS = 30      # 單一請求題數上限，避免回應過長被截斷
+PROMPT_OVERHEAD_TOKENS = 600  # system prompt + schema 的固定開銷
+MAX_ROUNDS = 3                # 缺漏題目重新打包的最多輪數
+VALID_TIERS = {"1", "2", "3"}
 
 SYSTEM_PROMPT = """你是一個專業的無人機考照教育專家與物理圖解大師。
 你的任務是分析題目，判斷其是否需要圖片輔助，並為其設計生圖指令(Prompt)。
@@ -32,7 +43,8 @@ SYSTEM_PROMPT = """你是一個專業的無人機考照教育專家與物理圖
 - Tier 2: 情境描述、環境安全距離、一般操作場景。這類題目只需要簡單的背景與物件示意。
 - Tier 3: 純法規、行政程序、數值記憶、抽象概念。這類題目不需要圖片，或是可以用簡單的圖示(Icon/SVG)表示。
 
-對於需要圖片的題目 (Tier 1 & 2)，請提供精確的英文生圖 Prompt，強調「物理正確性」、「教學用途」、「乾淨的背景」。"""
+對於需要圖片的題目 (Tier 1 & 2)，請提供精確的英文生圖 Prompt，強調「物理正確性」、「教學用途」、「乾淨的背景」。
+並以 confidence（0 到 1）表示你有多確定圖片能幫助考生理解此題。"""
 
 RESPONSE_SCHEMA = {
     "type": "object",
@@ -47,7 +59,8 @@ RESPONSE_SCHEMA = {
                     "reason": {"type": "string"},
                     "visual_concept": {"type": "string"},
                     "image_prompt": {"type": "string"},
-                    "svg_path_concept": {"type": "string"}
+                    "svg_path_concept": {"type": "string"},
+                    "confidence": {"type": "number"}
                 },
                 "required": ["index", "tier", "reason", "visual_concept", "image_prompt"]
             }
@@ -55,89 +68,202 @@ RESPONSE_SCHEMA = {
     }
 }
 
-async def analyze_batch(client: genai.Client, questions_batch: List[Dict[str, Any]], start_idx: int, semaphore: asyncio.Semaphore):
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數：CJK 字元約 1 token/字，其餘約 4 字元/token。"""
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def format_question(key: int, q: Question) -> str:
+    return (
+        f"--- 索引 {key} ---\n"
+        f"題目：{q.question}\n"
+        f"選項：{json.dumps(q.options, ensure_ascii=False)}\n"
+        f"答案：{q.answer}\n\n"
+    )
+
+
+def pack_batches(keys: List[int], questions: QuestionBank) -> List[List[int]]:
+    """依估計 token 數將題目打包成請求，每批盡量填滿 TOKEN_BUDGET。
+
+    以 first-fit decreasing 排列：先放長題，短題補空隙，批次數最少且每批接近上限。
+    """
+    costs = {
+        k: estimate_tokens(format_question(k, questions[k])) + OUTPUT_TOKENS_PER_QUESTION
+        for k in keys
+    }
+    capacity = TOKEN_BUDGET - PROMPT_OVERHEAD_TOKENS
+    batches: List[List[int]] = []
+    loads: List[int] = []
+    for k in sorted(keys, key=lambda k: costs[k], reverse=True):
+        for i, batch in enumerate(batches):
+            if len(batch) < MAX_BATCH_QUESTIONS and loads[i] + costs[k] <= capacity:
+                batch.append(k)
+                loads[i] += costs[k]
+                break
+        else:
+            batches.append([k])
+            loads.append(costs[k])
+    return [sorted(b) for b in batches]
+
+
+def validate_results(requested: List[int], results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """只保留索引屬於本批、tier 合法且必填欄位齊全的結果。"""
+    wanted = set(requested)
+    valid: Dict[str, Dict[str, Any]] = {}
+    for res in results:
+        try:
+            idx = int(res.get("index"))
+        except (TypeError, ValueError):
+            continue
+        tier = str(res.get("tier", "")).strip()
+        if idx not in wanted or tier not in VALID_TIERS:
+            continue
+        if not all(isinstance(res.get(f), str) for f in ("reason", "visual_concept", "image_prompt")):
+            continue
+        entry = {**res, "index": idx, "tier": tier}
+        if "confidence" in entry:
+            # 選填欄位：格式不對就丟掉，排程時改用預設值
+            try:
+                entry["confidence"] = min(max(float(entry["confidence"]), 0.0), 1.0)
+            except (TypeError, ValueError):
+                del entry["confidence"]
+        valid[str(idx)] = entry
+    return valid
+
+
+async def analyze_batch(
+    client: genai.Client,
+    questions: QuestionBank,
+    keys: List[int],
+    semaphore: asyncio.Semaphore,
+    telemetry: Telemetry,
+):
     async with semaphore:
-        prompt_text = "請分析以下題目：\n\n"
-        for i, q in enumerate(questions_batch):
-            prompt_text += f"--- 索引 {start_idx + i} ---\n"
-            prompt_text += f"題目：{q['question']}\n"
-            prompt_text += f"選項：{json.dumps(q['options'], ensure_ascii=False)}\n"
-            prompt_text += f"答案：{q['answer']}\n\n"
+        prompt_text = "請分析以下題目（每題的 index 必須與「索引」相同）：\n\n"
+        prompt_text += "".join(format_question(k, questions[k]) for k in keys)
 
         for attempt in range(3): # 加入重試機制
             try:
                 # 使用 await 異步呼叫 (注意：目前 SDK 可能需要用 run_in_executor 或是直接有 async 版本)
                 # 這裡假設 client.models.generate_content 是阻塞的，我們用 loop 運行它
                 loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(None, lambda: client.models.generate_content(
-                    model=MODEL_ID,
-                    contents=prompt_text,
-                    config=types.GenerateContentConfig(
-                        system_instruction=SYSTEM_PROMPT,
-                        response_mime_type="application/json",
-                        response_schema=RESPONSE_SCHEMA,
-                        temperature=0.2
-                    )
-                ))
-                result = json.loads(response.text)
-                return result.get("analysis_results", [])
+                with telemetry.request("analyze", MODEL_ID, key=f"{keys[0]}..{keys[-1]}") as span:
+                    response = await loop.run_in_executor(None, lambda: client.models.generate_content(
+                        model=MODEL_ID,
+                        contents=prompt_text,
+                        config=types.GenerateContentConfig(
+                            system_instruction=SYSTEM_PROMPT,
+                            response_mime_type="application/json",
+                            response_schema=RESPONSE_SCHEMA,
+                            temperature=0.2
+                        )
+                    ))
+                    meta = getattr(response, "usage_metadata", None)
+                    if meta is not None:
+                        span.usage(meta.prompt_token_count, meta.candidates_token_count)
+                    result = json.loads(response.text)
+                    valid = validate_results(keys, result.get("analysis_results", []))
+                    span.output(len(valid))
+                return valid
             except Exception as e:
                 if attempt < 2:
+                    telemetry.retry(error_cause(e), f"{keys[0]}..{keys[-1]}", 2 * (attempt + 1))
                     await asyncio.sleep(2 * (attempt + 1))
                     continue
-                print(f"\n[ERROR] Batch starting at {start_idx} failed: {e}")
-                return []
+                print(f"\n[ERROR] Batch {keys[0]}..{keys[-1]} ({len(keys)} 題) failed: {e}")
+                return {}
+
+
+def save_results(all_results: Dict[str, Any], output_file: Path) -> None:
+    ordered = dict(sorted(all_results.items(), key=lambda kv: int(kv[0])))
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(ordered, f, ensure_ascii=False, indent=2)
+
 
 async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bank", default=DEFAULT_BANK, help="題庫 id，例如 general / renewal（預設 professional）")
+    parser.add_argument(
+        "--preclassify", action="store_true",
+        help="先用本地分類器標註高信心 Tier 3 題目，只把不確定的題目送給 Gemini",
+    )
+    args = parser.parse_args()
+
+    bank = QuestionBank.load(args.bank, DATA_DIR)
+    output_file = DATA_DIR / f"{args.bank}_image_analysis.json"
+
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         print("Error: GEMINI_API_KEY environment variable not set", file=sys.stderr)
         sys.exit(1)
 
-    client = genai.Client(api_key=api_key)
+    base_url = os.environ.get("GEMINI_BASE_URL")  # 可指向 scripts/bench/fake_api.py 做離線測試
+    client = genai.Client(api_key=api_key, http_options={"base_url": base_url} if base_url else None)
 
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    questions = data.get("questions", [])
-    
     all_results = {}
-    if OUTPUT_FILE.exists():
-        with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-            try: all_results = json.load(f)
-            except: pass
+    try: all_results = dict(bank.image_analysis)
+    except json.JSONDecodeError: pass
 
-    pending_indices = [i for i in range(len(questions)) if str(i) not in all_results]
+    pending_indices = [q.index for q in bank if str(q.index) not in all_results]
     if not pending_indices:
         print("All questions analyzed!")
         return
 
+    if args.preclassify:
+        classifier, threshold, report = build_classifier()
+        print(
+            f"本地預分類：threshold {threshold:.3f}，巢狀交叉驗證 precision {report['precision']:.3f} / "
+            f"recall {report['recall']:.3f}"
+        )
+        if report["precision"] < TARGET_PRECISION:
+            # 本地判定會寫成最終結果，之後重跑不會再送 Gemini：未達標就不略過任何題目
+            print(f"  precision 未達 {TARGET_PRECISION}，停用本地預分類，全部 {len(pending_indices)} 題送 Gemini")
+        else:
+            uncertain = []
+            for i in pending_indices:
+                prob = classifier.prob_tier3(tokenize(bank[i]))
+                if prob >= threshold:
+                    all_results[str(i)] = heuristic_result(i, prob)
+                else:
+                    uncertain.append(i)
+            print(f"  {len(pending_indices) - len(uncertain)} 題判定為 Tier 3 免呼叫 API，剩 {len(uncertain)} 題送 Gemini")
+            pending_indices = uncertain
+            save_results(all_results, output_file)
+
     semaphore = asyncio.Semaphore(CONCURRENCY)
-    tasks = []
-    
-    # 建立所有任務
-    for i in range(0, len(pending_indices), BATCH_SIZE):
-        batch_indices = pending_indices[i : i + BATCH_SIZE]
-        questions_batch = [questions[idx] for idx in batch_indices]
-        tasks.append(analyze_batch(client, questions_batch, batch_indices[0], semaphore))
-
-    # 使用 tqdm 顯示進度並執行
-    results_list = await tqdm.gather(*tasks, desc="Parallel Analyzing")
-
-    # 整合結果
-    for results in results_list:
-        for res in results:
-            all_results[str(res["index"])] = res
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_results, f, ensure_ascii=False, indent=2)
-
-    # 統計
-    tiers = {"1": 0, "2": 0, "3": 0}
-    for r in all_results.values():
-        t = str(r.get("tier", "3"))
-        tiers[t] = tiers.get(t, 0) + 1
+    requests_sent = 0
+    telemetry = Telemetry("analyze_questions", output_unit="questions")
+
+    try:
+        # 每輪只重新打包上一輪缺漏（失敗或回傳不合法）的題目
+        for round_no in range(1, MAX_ROUNDS + 1):
+            if not pending_indices:
+                break
+            batches = pack_batches(pending_indices, bank)
+            requests_sent += len(batches)
+            print(f"第 {round_no} 輪：{len(pending_indices)} 題打包為 {len(batches)} 個請求")
+
+            tasks = [analyze_batch(client, bank, keys, semaphore, telemetry) for keys in batches]
+            results_list = await tqdm.gather(*tasks, desc=f"Parallel Analyzing (round {round_no})")
+
+            for results in results_list:
+                all_results.update(results)
+            save_results(all_results, output_file)
+
+            pending_indices = [i for i in pending_indices if str(i) not in all_results]
+
+        # 統計
+        tiers = {"1": 0, "2": 0, "3": 0}
+        for r in all_results.values():
+            t = str(r.get("tier", "3"))
+            tiers[t] = tiers.get(t, 0) + 1
     
-    print(f"\nDone! T1:{tiers['1']}, T2:{tiers['2']}, T3:{tiers['3']} -> {OUTPUT_FILE}")
+        print(f"\nDone! T1:{tiers['1']}, T2:{tiers['2']}, T3:{tiers['3']} -> {output_file}（共 {requests_sent} 個請求）")
+        if pending_indices:
+            print(f"[WARN] {len(pending_indices)} 題在 {MAX_ROUNDS} 輪後仍未取得有效結果，重跑腳本會再次嘗試：{pending_indices}")
+    finally:
+        telemetry.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,7 +1,8 @@
 """
 convert_and_upload.py
 
-Converts PNG images in public/data/images/professional/ to WebP (quality=85),
+Converts PNG images in public/data/images/professional/ to responsive WebP
+variants (320 / 640 / 1024 px wide, quality=85; optionally AVIF as well),
 then uploads them to Firebase Storage.
 
 Prerequisites:
@@ -13,21 +14,46 @@ Prerequisites:
 Usage:
     export FIREBASE_CREDENTIALS=/path/to/serviceAccountKey.json
     export FIREBASE_BUCKET=your-project-id.appspot.com
-    uv run convert_and_upload.py
+    uv run convert_and_upload.py                      # one image at a time
+    uv run convert_and_upload.py --workers 4          # process-pool encode + threaded uploads
+    uv run convert_and_upload.py --storage-dir /tmp/b # local filesystem stand-in, no Firebase
+    uv run convert_and_upload.py --avif               # also emit AVIF variants (Pillow with libavif)
+    uv run convert_and_upload.py verify               # bulk-check the bucket, upload nothing
 
 Output:
-    webp_urls.json  — mapping { "idx": "https://..." }
-
-Resume-friendly: already-uploaded indices in webp_urls.json are skipped.
+    webp_urls.json  — mapping { "idx": [ {url, type, width, height, bytes}, ... ] }
+    webp_urls.log   — append-only JSONL checkpoints, folded into webp_urls.json
+                      at the end of a run (and on the next load after a crash)
+    image_placeholders.json — { "<png sha256>": "data:image/webp;base64,..." }
+                      tiny LQIP previews, computed in parallel once per PNG content
+
+Change detection: every uploaded blob carries custom metadata with the SHA-256
+of its source PNG and a digest of the encode settings (widths, quality, formats).
+One bulk listing of the bucket is compared against the local PNG hashes, so only
+images whose PNG or settings really changed — or whose blobs are missing — are
+re-encoded and re-uploaded. Up-to-date images found remotely are written back to
+webp_urls.json, so a lost URL file is rebuilt without re-encoding anything.
+
+PNGs of questions marked `shared_with` in the analysis file (see dedupe_images.py)
+are skipped: their manifest entries reuse the canonical image's uploads.
 """
 
+import argparse
+import base64
+import hashlib
+import io
 import json
 import os
 import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 
 from dotenv import load_dotenv
 
+from dedupe_images import ANALYSIS_FILE, load_aliases
+
 load_dotenv()
 
 try:
@@ -36,13 +62,6 @@ except ImportError:
     print("Error: Pillow not found. Run: uv sync", file=sys.stderr)
     sys.exit(1)
 
-try:
-    import firebase_admin
-    from firebase_admin import credentials, storage
-except ImportError:
-    print("Error: firebase-admin not found. Run: uv sync", file=sys.stderr)
-    sys.exit(1)
-
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
@@ -50,14 +69,112 @@ except ImportError:
 IMAGE_DIR = Path("public/data/images/professional")
 WEBP_DIR = IMAGE_DIR / "webp"
 URLS_FILE = Path("webp_urls.json")
+URLS_LOG = Path("webp_urls.log")
 STORAGE_PREFIX = "professional"   # folder name inside the Firebase bucket
 WEBP_QUALITY = 85
+VARIANT_WIDTHS = (320, 640, 1024)  # never upscaled beyond the source width
+IMAGE_FORMATS = {                  # format id → (Pillow format, MIME type, extension)
+    "webp": ("WEBP", "image/webp", "webp"),
+    "avif": ("AVIF", "image/avif", "avif"),
+}
+LQIP_WIDTH = 16                    # placeholder width in px; upscaled + blurred by the browser
+LQIP_QUALITY = 30
+PLACEHOLDERS_FILE = Path("image_placeholders.json")
+UPLOAD_ATTEMPTS = 3
+URL_FLUSH_EVERY = 20              # buffered checkpoints per append to URLS_LOG
 
 # ---------------------------------------------------------------------------
-# Init Firebase
+# Storage backends
 # ---------------------------------------------------------------------------
 
+class FirebaseStorage:
+    """Firebase Storage bucket; returns public media URLs."""
+
+    def __init__(self, bucket) -> None:
+        self.bucket = bucket
+        self.name = bucket.name
+
+    def upload(self, blob_name: str, data: bytes, content_type: str, metadata: dict[str, str]) -> str:
+        blob = self.bucket.blob(blob_name)
+        blob.metadata = metadata
+        blob.upload_from_string(data, content_type=content_type)
+        blob.make_public()
+        return self.url_for(blob_name)
+
+    def url_for(self, blob_name: str) -> str:
+        return public_url(self.name, blob_name)
+
+    def list(self, prefix: str) -> dict[str, dict]:
+        """One paginated listing: blob name → {size, content_type, metadata}."""
+        return {
+            blob.name: {
+                "size": blob.size,
+                "content_type": blob.content_type,
+                "metadata": blob.metadata or {},
+            }
+            for blob in self.bucket.list_blobs(prefix=prefix)
+        }
+
+
+class LocalStorage:
+    """Filesystem stand-in for Firebase (tests / dry runs); returns file:// URLs."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root.resolve()
+        self.name = str(self.root)
+
+    META_SUFFIX = ".meta.json"
+
+    def upload(self, blob_name: str, data: bytes, content_type: str, metadata: dict[str, str]) -> str:
+        path = self.root / blob_name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        meta = {"content_type": content_type, "metadata": metadata}
+        Path(f"{path}{self.META_SUFFIX}").write_text(json.dumps(meta), encoding="utf-8")
+        return self.url_for(blob_name)
+
+    def url_for(self, blob_name: str) -> str:
+        return (self.root / blob_name).as_uri()
+
+    def list(self, prefix: str) -> dict[str, dict]:
+        objects: dict[str, dict] = {}
+        for path in self.root.glob(f"{prefix}*"):
+            if not path.is_file() or path.name.endswith(self.META_SUFFIX):
+                continue
+            meta_path = Path(f"{path}{self.META_SUFFIX}")
+            meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+            objects[path.relative_to(self.root).as_posix()] = {
+                "size": path.stat().st_size,
+                "content_type": meta.get("content_type"),
+                "metadata": meta.get("metadata", {}),
+            }
+        return objects
+
+
+def init_storage(storage_dir: str | None = None):
+    """LocalStorage when storage_dir is given, otherwise the Firebase bucket."""
+    if storage_dir:
+        return LocalStorage(Path(storage_dir))
+    return FirebaseStorage(init_firebase())
+
+
 def init_firebase():
+    emulator = os.environ.get("STORAGE_EMULATOR_HOST")
+    if emulator:
+        # Storage emulator (Firebase emulator suite or scripts/bench/fake_api.py): no credentials
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud import storage as gcs
+
+        client = gcs.Client(project="emulator", credentials=AnonymousCredentials())
+        return client.bucket(os.environ.get("FIREBASE_BUCKET", "emulator-bucket"))
+
+    try:
+        import firebase_admin
+        from firebase_admin import credentials, storage
+    except ImportError:
+        print("Error: firebase-admin not found. Run: uv sync", file=sys.stderr)
+        sys.exit(1)
+
     cred_path = os.environ.get("FIREBASE_CREDENTIALS")
     bucket_name = os.environ.get("FIREBASE_BUCKET")
 
@@ -88,79 +205,427 @@ def public_url(bucket_name: str, blob_name: str) -> str:
     )
 
 
-def load_urls() -> dict[str, str]:
-    if URLS_FILE.exists():
-        return json.loads(URLS_FILE.read_text(encoding="utf-8"))
+def encode_settings(formats: tuple[str, ...]) -> str:
+    """Short digest of everything that changes the encoded output besides the PNG."""
+    settings = {"widths": VARIANT_WIDTHS, "quality": WEBP_QUALITY, "formats": sorted(formats)}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def plan_sizes(width: int, height: int) -> list[tuple[int, int]]:
+    """Variant (width, height) pairs for a source image, narrowest first."""
+    widths = sorted({min(w, width) for w in VARIANT_WIDTHS})
+    return [(w, round(height * w / width)) for w in widths]
+
+
+def expected_variants(png_path: Path, formats: tuple[str, ...]) -> list[dict]:
+    """Variants a PNG should have, from its header only (no pixel decoding)."""
+    with Image.open(png_path) as img:
+        sizes = plan_sizes(img.width, img.height)
+    return [{"format": f, "width": w, "height": h} for w, h in sizes for f in formats]
+
+
+def encode_variants(png_bytes: bytes, formats: tuple[str, ...] = ("webp",), quality: int = WEBP_QUALITY) -> list[dict]:
+    """Resize PNG bytes to each VARIANT_WIDTHS width and encode in every format.
+
+    Returns [{format, width, height, data}, ...]; picklable for process pools.
+    """
+    variants: list[dict] = []
+    with Image.open(io.BytesIO(png_bytes)) as img:
+        img.load()
+        for width, height in plan_sizes(img.width, img.height):
+            resized = img if width == img.width else img.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                pil_format, _, _ = IMAGE_FORMATS[fmt]
+                buf = io.BytesIO()
+                resized.save(buf, format=pil_format, quality=quality)
+                variants.append({"format": fmt, "width": width, "height": height, "data": buf.getvalue()})
+    return variants
+
+
+def make_placeholder(png_bytes: bytes) -> str:
+    """Tiny WebP data URI (a few hundred bytes) to paint before the real image arrives."""
+    with Image.open(io.BytesIO(png_bytes)) as img:
+        height = max(1, round(img.height * LQIP_WIDTH / img.width))
+        tiny = img.convert("RGB").resize((LQIP_WIDTH, height), Image.Resampling.BOX)
+    buf = io.BytesIO()
+    tiny.save(buf, format="WEBP", quality=LQIP_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def placeholder_for_file(png_path: str) -> str:
+    return make_placeholder(Path(png_path).read_bytes())
+
+
+def load_placeholders() -> dict[str, str]:
+    if PLACEHOLDERS_FILE.exists():
+        return json.loads(PLACEHOLDERS_FILE.read_text(encoding="utf-8"))
     return {}
 
 
-def save_urls(urls: dict[str, str]) -> None:
+def save_placeholders(placeholders: dict[str, str]) -> None:
+    PLACEHOLDERS_FILE.write_text(json.dumps(placeholders, indent=0), encoding="utf-8")
+
+
+def ensure_placeholders(hashed: list[tuple[Path, str]], workers: int) -> int:
+    """Compute placeholders for PNG contents not in the cache; return how many were new."""
+    placeholders = load_placeholders()
+    todo = [(path, sha) for path, sha in hashed if sha not in placeholders]
+    if not todo:
+        return 0
+    paths = [str(path) for path, _ in todo]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(placeholder_for_file, paths, chunksize=8))
+    else:
+        results = [placeholder_for_file(path) for path in paths]
+    for (_, sha), uri in zip(todo, results):
+        placeholders[sha] = uri
+    save_placeholders(placeholders)
+    return len(todo)
+
+
+def variant_name(idx: str, variant: dict) -> str:
+    """File / blob name for one variant, e.g. 207_640w.webp."""
+    return f"{idx}_{variant['width']}w.{IMAGE_FORMATS[variant['format']][2]}"
+
+
+def encode_png_file(png_path: str, formats: tuple[str, ...] = ("webp",)) -> list[dict]:
+    """Process-pool job: encode one PNG's variants and keep local copies in WEBP_DIR."""
+    idx = Path(png_path).stem
+    variants = encode_variants(Path(png_path).read_bytes(), formats)
+    for variant in variants:
+        (WEBP_DIR / variant_name(idx, variant)).write_bytes(variant["data"])
+    return variants
+
+
+def upload_with_retry(storage_client, blob_name: str, data: bytes, content_type: str, metadata: dict[str, str]) -> str:
+    for attempt in range(UPLOAD_ATTEMPTS):
+        try:
+            return storage_client.upload(blob_name, data, content_type, metadata)
+        except Exception:
+            if attempt == UPLOAD_ATTEMPTS - 1:
+                raise
+            time.sleep(2 ** attempt)
+    raise AssertionError("unreachable")
+
+
+def variant_record(url: str, variant: dict, size: int, source_sha: str, settings: str) -> dict:
+    return {
+        "url": url,
+        "type": IMAGE_FORMATS[variant["format"]][1],
+        "width": variant["width"],
+        "height": variant["height"],
+        "bytes": size,
+        "source_sha256": source_sha,
+        "encode_settings": settings,
+    }
+
+
+def upload_variants(
+    storage_client, idx: str, variants: list[dict], source_sha: str, settings: str
+) -> list[dict]:
+    """Upload every variant as <STORAGE_PREFIX>/<idx>_<w>w.<ext>; return manifest-ready records.
+
+    Each blob is tagged with its source hash and encode settings for later change detection.
+    """
+    records = []
+    for variant in variants:
+        _, mime, _ = IMAGE_FORMATS[variant["format"]]
+        blob_name = f"{STORAGE_PREFIX}/{variant_name(idx, variant)}"
+        metadata = {
+            "source_sha256": source_sha,
+            "encode_settings": settings,
+            "width": str(variant["width"]),
+            "height": str(variant["height"]),
+        }
+        url = upload_with_retry(storage_client, blob_name, variant["data"], mime, metadata)
+        records.append(variant_record(url, variant, len(variant["data"]), source_sha, settings))
+    return records
+
+
+def remote_records(
+    storage_client, idx: str, planned: list[dict], remote: dict[str, dict], source_sha: str, settings: str
+) -> list[dict] | None:
+    """Records for idx rebuilt from the bucket listing, or None if any variant is missing/stale."""
+    records = []
+    for variant in planned:
+        blob_name = f"{STORAGE_PREFIX}/{variant_name(idx, variant)}"
+        obj = remote.get(blob_name)
+        if obj is None:
+            return None
+        meta = obj["metadata"]
+        if meta.get("source_sha256") != source_sha or meta.get("encode_settings") != settings:
+            return None
+        records.append(variant_record(storage_client.url_for(blob_name), variant, obj["size"], source_sha, settings))
+    return records
+
+
+def is_published(entry) -> bool:
+    """True for variant lists; legacy single-URL strings still need re-publishing."""
+    return isinstance(entry, list) and bool(entry)
+
+
+def load_urls() -> dict[str, list[dict] | str]:
+    urls: dict[str, list[dict] | str] = {}
+    if URLS_FILE.exists():
+        urls.update(json.loads(URLS_FILE.read_text(encoding="utf-8")))
+    if URLS_LOG.exists():
+        for line in URLS_LOG.read_text(encoding="utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted append
+            urls[entry["idx"]] = entry["variants"]
+    return urls
+
+
+def save_urls(urls: dict[str, list[dict] | str]) -> None:
+    ordered = dict(sorted(urls.items(), key=lambda kv: int(kv[0])))
     URLS_FILE.write_text(
-        json.dumps(urls, ensure_ascii=False, indent=2), encoding="utf-8"
+        json.dumps(ordered, ensure_ascii=False, indent=2), encoding="utf-8"
     )
 
 
-# ---------------------------------------------------------------------------
-# Main
-# ---------------------------------------------------------------------------
+class UrlLog:
+    """Batched, append-only URL checkpoints.
 
-def main() -> None:
-    WEBP_DIR.mkdir(parents=True, exist_ok=True)
+    add() buffers entries and appends them to URLS_LOG every `flush_every`
+    uploads; close() flushes, folds everything into URLS_FILE and removes the log.
+    """
 
-    png_files = sorted(IMAGE_DIR.glob("*.png"), key=lambda p: int(p.stem))
-    if not png_files:
-        print(f"No PNG files found in {IMAGE_DIR}. Run generate_images_v2.py first.")
-        sys.exit(0)
+    def __init__(self, urls: dict[str, list[dict] | str], flush_every: int = URL_FLUSH_EVERY) -> None:
+        self.urls = urls
+        self.flush_every = flush_every
+        self.buffer: list[tuple[str, list[dict]]] = []
 
-    bucket = init_firebase()
-    urls = load_urls()
+    def add(self, idx: str, variants: list[dict]) -> None:
+        self.urls[idx] = variants
+        self.buffer.append((idx, variants))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
 
-    total = len(png_files)
-    skipped = 0
-    uploaded = 0
-    failed: list[str] = []
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        with URLS_LOG.open("a", encoding="utf-8") as f:
+            for idx, variants in self.buffer:
+                f.write(json.dumps({"idx": idx, "variants": variants}, ensure_ascii=False) + "\n")
+        self.buffer.clear()
 
-    for png_path in png_files:
-        idx = png_path.stem  # e.g. "1", "5", "207"
+    def close(self) -> None:
+        self.flush()
+        save_urls(self.urls)
+        URLS_LOG.unlink(missing_ok=True)
 
-        if idx in urls:
-            skipped += 1
-            continue
 
-        webp_path = WEBP_DIR / f"{idx}.webp"
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
 
-        # -- Convert PNG → WebP --
+def run_serial(
+    pending: list[tuple[Path, str]], storage_client, url_log: UrlLog, total: int,
+    formats: tuple[str, ...], settings: str,
+) -> list[str]:
+    failed: list[str] = []
+    uploaded = 0
+    for png_path, source_sha in pending:
+        idx = png_path.stem  # e.g. "1", "5", "207"
+
+        # -- Convert PNG → WebP variants --
         try:
-            with Image.open(png_path) as img:
-                img.save(webp_path, format="WEBP", quality=WEBP_QUALITY)
+            variants = encode_png_file(str(png_path), formats)
         except Exception as exc:
             print(f"  [SKIP] {idx}: conversion failed — {exc}")
             failed.append(idx)
             continue
 
-        # -- Upload WebP to Firebase Storage --
-        blob_name = f"{STORAGE_PREFIX}/{idx}.webp"
+        # -- Upload variants to storage --
         try:
-            blob = bucket.blob(blob_name)
-            blob.upload_from_filename(str(webp_path), content_type="image/webp")
-            blob.make_public()
-
-            url = public_url(bucket.name, blob_name)
-            urls[idx] = url
-            save_urls(urls)  # checkpoint after each successful upload
+            url_log.add(idx, upload_variants(storage_client, idx, variants, source_sha, settings))
             uploaded += 1
-            print(f"  [{uploaded:>3}/{total}] Uploaded {idx}.webp")
+            print(f"  [{uploaded:>3}/{total}] Uploaded {idx} ({len(variants)} variants)")
         except Exception as exc:
             print(f"  [FAIL] {idx}: upload failed — {exc}")
             failed.append(idx)
+    return failed
+
+
+def run_parallel(
+    pending: list[tuple[Path, str]], storage_client, url_log: UrlLog, total: int,
+    formats: tuple[str, ...], settings: str, workers: int,
+) -> list[str]:
+    """Encode in a process pool and upload from a thread pool, overlapping both.
+
+    At most 2 × workers images are in flight (encoding or uploading) at once, which
+    bounds memory while keeping both pools busy. Only this thread touches url_log.
+    """
+    failed: list[str] = []
+    uploaded = 0
+    queue = deque(pending)
+    max_in_flight = workers * 2
+    encoding: dict = {}
+    uploading: dict = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as encode_pool, \
+            ThreadPoolExecutor(max_workers=max_in_flight) as upload_pool:
+        while queue or encoding or uploading:
+            while queue and len(encoding) + len(uploading) < max_in_flight:
+                png_path, source_sha = queue.popleft()
+                fut = encode_pool.submit(encode_png_file, str(png_path), formats)
+                encoding[fut] = (png_path.stem, source_sha)
+
+            done, _ = wait([*encoding, *uploading], return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in encoding:
+                    idx, source_sha = encoding.pop(fut)
+                    try:
+                        variants = fut.result()
+                    except Exception as exc:
+                        print(f"  [SKIP] {idx}: conversion failed — {exc}")
+                        failed.append(idx)
+                        continue
+                    upload_fut = upload_pool.submit(
+                        upload_variants, storage_client, idx, variants, source_sha, settings
+                    )
+                    uploading[upload_fut] = idx
+                else:
+                    idx = uploading.pop(fut)
+                    try:
+                        url_log.add(idx, fut.result())
+                    except Exception as exc:
+                        print(f"  [FAIL] {idx}: upload failed — {exc}")
+                        failed.append(idx)
+                        continue
+                    uploaded += 1
+                    print(f"  [{uploaded:>3}/{total}] Uploaded {idx} ({len(url_log.urls[idx])} variants)")
+    return failed
+
+
+def verify(storage_client, png_files: list[Path], urls: dict, formats: tuple[str, ...]) -> int:
+    """Compare every PNG against one bucket listing; return a process exit code."""
+    settings = encode_settings(formats)
+    remote = storage_client.list(f"{STORAGE_PREFIX}/")
+    expected: set[str] = set()
+    missing: list[str] = []
+    stale: list[str] = []
+    local_outdated: list[str] = []
+
+    for png_path in png_files:
+        idx = png_path.stem
+        source_sha = file_sha256(png_path)
+        planned = expected_variants(png_path, formats)
+        names = [f"{STORAGE_PREFIX}/{variant_name(idx, v)}" for v in planned]
+        expected.update(names)
+        if any(name not in remote for name in names):
+            missing.append(idx)
+            continue
+        records = remote_records(storage_client, idx, planned, remote, source_sha, settings)
+        if records is None:
+            stale.append(idx)
+        elif urls.get(idx) != records:
+            local_outdated.append(idx)
+
+    orphans = sorted(set(remote) - expected)
+    ok = len(png_files) - len(missing) - len(stale)
+    print(f"Remote objects: {len(remote)}  |  PNGs: {len(png_files)}  |  settings {settings}")
+    print(f"  up to date : {ok}")
+    print(f"  missing    : {len(missing)}  {', '.join(missing)}")
+    print(f"  stale      : {len(stale)}  {', '.join(stale)}  (PNG or encode settings changed)")
+    print(f"  {URLS_FILE} out of sync: {len(local_outdated)}  (fixed by the next upload run)")
+    print(f"  orphan blobs (no matching PNG / variant): {len(orphans)}")
+    for name in orphans[:20]:
+        print(f"    {name}")
+    return 1 if missing or stale else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert PNG → WebP and upload")
+    parser.add_argument(
+        "command", nargs="?", choices=["upload", "verify"], default="upload",
+        help="upload (default) or verify: bulk-compare the bucket with local PNGs",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="parallel mode: N encoding processes and 2N upload threads (default: serial)",
+    )
+    parser.add_argument(
+        "--storage-dir", metavar="DIR",
+        help="write to a local directory instead of Firebase Storage",
+    )
+    parser.add_argument(
+        "--avif", action="store_true",
+        help="also encode AVIF variants (requires Pillow built with libavif)",
+    )
+    args = parser.parse_args()
+
+    formats: tuple[str, ...] = ("webp",)
+    if args.avif:
+        from PIL import features
+
+        if not features.check("avif"):
+            print("Error: this Pillow build has no AVIF support (needs a Pillow build with libavif).", file=sys.stderr)
+            sys.exit(1)
+        formats = ("avif", "webp")
+
+    WEBP_DIR.mkdir(parents=True, exist_ok=True)
+
+    aliases = load_aliases(json.loads(ANALYSIS_FILE.read_text(encoding="utf-8"))) if ANALYSIS_FILE.exists() else {}
+    png_files = sorted(
+        (p for p in IMAGE_DIR.glob("*.png") if p.stem not in aliases),
+        key=lambda p: int(p.stem),
+    )
+    if aliases:
+        print(f"Skipping {len(aliases)} questions that share another question's image")
+    if not png_files:
+        print(f"No PNG files found in {IMAGE_DIR}. Run generate_images_v2.py first.")
+        sys.exit(0)
+
+    storage_client = init_storage(args.storage_dir)
+    urls = load_urls()
 
+    if args.command == "verify":
+        sys.exit(verify(storage_client, png_files, urls, formats))
+
+    # One bulk listing decides what changed: an image is up to date only if every
+    # expected variant exists remotely with this PNG's hash and these settings.
+    settings = encode_settings(formats)
+    remote = storage_client.list(f"{STORAGE_PREFIX}/")
+    url_log = UrlLog(urls)
+    pending: list[tuple[Path, str]] = []
+    hashed = [(png_path, file_sha256(png_path)) for png_path in png_files]
+    new_placeholders = ensure_placeholders(hashed, max(args.workers, 1))
+    restored = 0
+    for png_path, source_sha in hashed:
+        records = remote_records(
+            storage_client, png_path.stem, expected_variants(png_path, formats), remote, source_sha, settings
+        )
+        if records is None:
+            pending.append((png_path, source_sha))
+        elif urls.get(png_path.stem) != records:
+            url_log.add(png_path.stem, records)
+            restored += 1
+    skipped = len(png_files) - len(pending)
+
+    try:
+        if args.workers > 0:
+            failed = run_parallel(pending, storage_client, url_log, len(png_files), formats, settings, args.workers)
+        else:
+            failed = run_serial(pending, storage_client, url_log, len(png_files), formats, settings)
+    finally:
+        url_log.close()
+
+    uploaded = len(pending) - len(failed)
     print(
-        f"\nDone. {uploaded} uploaded, {skipped} skipped (already done), "
-        f"{len(failed)} failed."
+        f"\nDone. {uploaded} uploaded, {skipped} unchanged "
+        f"({restored} URL entries restored from the bucket), {len(failed)} failed."
     )
     if failed:
-        print(f"Failed indices: {', '.join(failed)}")
-    print(f"URLs written to {URLS_FILE}")
+        print(f"Failed indices: {', '.join(sorted(failed, key=int))}")
+    print(f"URLs written to {URLS_FILE} ({new_placeholders} new placeholders in {PLACEHOLDERS_FILE})")
 
 
 if __name__ == "__main__":
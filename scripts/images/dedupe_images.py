@@ -0,0 +1,275 @@
+"""
+dedupe_images.py
+
+Collapses near-identical question images onto one shared asset.
+
+Two layers, both recorded in public/data/professional_image_analysis.json as
+`"shared_with": "<canonical index>"` on the duplicate entries:
+
+  1. Exact-prompt cache (before generation) — generate_images_v2.py calls
+     apply_prompt_cache() so questions whose full prompt is byte-identical are
+     generated once. No review needed: same prompt, same picture. The aliases
+     are written by --apply below, together with the perceptual ones.
+  2. Perceptual hash (after generation) — this script computes a 64-bit dHash
+     per PNG (cached by file SHA-256 in image_hashes.json, computed in parallel),
+     finds pairs within --threshold bits through a banded hash index, and writes
+     a Markdown review report with side-by-side images. Nothing changes until the
+     report has been reviewed and the script is re-run with --apply.
+
+Only --apply writes the analysis file; generate_images_v2.py never does, since
+the file is the input of the images build stage.
+
+Downstream, aliased questions are never generated or uploaded, and
+generate_image_manifest.py points their keys at the canonical image's entry.
+
+Usage:
+    uv run scripts/images/dedupe_images.py                 # report only
+    uv run scripts/images/dedupe_images.py --threshold 4   # stricter
+    uv run scripts/images/dedupe_images.py --apply         # record prompt + phash aliases
+"""
+
+import argparse
+import hashlib
+import json
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+ANALYSIS_FILE = Path("public/data/professional_image_analysis.json")
+IMAGE_DIR = Path("public/data/images/professional")
+HASHES_FILE = Path("image_hashes.json")          # { "<png sha256>": "<dhash hex>" }
+REPORT_FILE = Path("image_dedupe_report.md")
+HASH_SIZE = 8                                    # 8×8 gradient bits = 64-bit hash
+HASH_BITS = HASH_SIZE * HASH_SIZE
+DEFAULT_THRESHOLD = 5                            # max differing bits to count as duplicate
+WORKERS = 4
+ALIAS_FIELD = "shared_with"
+
+
+# ---------------------------------------------------------------------------
+# Aliases (shared by generate_images_v2 / convert_and_upload / manifest)
+# ---------------------------------------------------------------------------
+
+def load_aliases(analysis: dict) -> dict[str, str]:
+    """Duplicate index → canonical index, for every entry recorded as shared."""
+    return {k: str(v[ALIAS_FIELD]) for k, v in analysis.items() if v.get(ALIAS_FIELD) is not None}
+
+
+def record_aliases(aliases: dict[str, tuple[str, dict]]) -> None:
+    """Write `shared_with` (+ provenance) into the analysis file for each duplicate."""
+    if not aliases:
+        return
+    analysis = json.loads(ANALYSIS_FILE.read_text(encoding="utf-8"))
+    for idx, (canonical, provenance) in aliases.items():
+        analysis[idx][ALIAS_FIELD] = canonical
+        analysis[idx]["dedupe"] = provenance
+    ANALYSIS_FILE.write_text(json.dumps(analysis, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def apply_prompt_cache(
+    tasks: list[dict[str, Any]], prompt_fn: Callable[[dict[str, Any]], str]
+) -> tuple[list[dict[str, Any]], dict[str, tuple[str, dict]]]:
+    """Keep one task per distinct prompt (lowest index); return (tasks, new aliases)."""
+    canonical_by_prompt: dict[str, str] = {}
+    unique: list[dict[str, Any]] = []
+    aliases: dict[str, tuple[str, dict]] = {}
+    for task in sorted(tasks, key=lambda t: int(t["index"])):
+        key = hashlib.sha256(prompt_fn(task).encode("utf-8")).hexdigest()
+        if key in canonical_by_prompt:
+            aliases[str(task["index"])] = (canonical_by_prompt[key], {"method": "prompt"})
+        else:
+            canonical_by_prompt[key] = str(task["index"])
+            unique.append(task)
+    return unique, aliases
+
+
+def prompt_aliases(analysis: dict, aliases: dict[str, str]) -> dict[str, tuple[str, dict]]:
+    """Exact-prompt aliases among tier 1/2 questions that are not shared yet."""
+    from generate_images_v2 import build_prompt  # imports this module; only needed here
+
+    tasks = [
+        v for k, v in analysis.items()
+        if str(v.get("tier")) in ("1", "2") and k not in aliases
+    ]
+    return apply_prompt_cache(tasks, build_prompt)[1]
+
+
+# ---------------------------------------------------------------------------
+# Perceptual hash
+# ---------------------------------------------------------------------------
+
+def dhash(png_path: str) -> str:
+    """Difference hash: sign of horizontal gradients on a 9×8 greyscale thumbnail."""
+    from PIL import Image
+
+    with Image.open(png_path) as img:
+        small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+        pixels = small.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:016x}"
+
+
+def hash_images(png_files: list[Path], workers: int = WORKERS) -> dict[str, int]:
+    """Index → dHash for every PNG; only content not seen before is re-hashed."""
+    cache: dict[str, str] = json.loads(HASHES_FILE.read_text(encoding="utf-8")) if HASHES_FILE.exists() else {}
+    shas = {p: hashlib.sha256(p.read_bytes()).hexdigest() for p in png_files}
+    todo = [p for p in png_files if shas[p] not in cache]
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, value in zip(todo, pool.map(dhash, map(str, todo), chunksize=8)):
+                cache[shas[path]] = value
+        HASHES_FILE.write_text(json.dumps(cache, indent=0), encoding="utf-8")
+    return {p.stem: int(cache[shas[p]], 16) for p in png_files}
+
+
+class HashIndex:
+    """Banded index for Hamming-radius queries.
+
+    With `threshold + 1` bands, two hashes within `threshold` bits must agree
+    exactly on at least one band (pigeonhole), so only bucket-mates are compared.
+    """
+
+    def __init__(self, threshold: int) -> None:
+        self.threshold = threshold
+        bands = min(threshold + 1, HASH_BITS)
+        width = HASH_BITS // bands
+        self.bands = [(i * width, HASH_BITS if i == bands - 1 else (i + 1) * width) for i in range(bands)]
+        self.buckets: list[dict[int, list[str]]] = [defaultdict(list) for _ in self.bands]
+        self.hashes: dict[str, int] = {}
+
+    def _keys(self, value: int) -> list[int]:
+        return [(value >> lo) & ((1 << (hi - lo)) - 1) for lo, hi in self.bands]
+
+    def add(self, key: str, value: int) -> None:
+        self.hashes[key] = value
+        for bucket, band_key in zip(self.buckets, self._keys(value)):
+            bucket[band_key].append(key)
+
+    def query(self, value: int) -> dict[str, int]:
+        """Keys within `threshold` bits of value → distance."""
+        found: dict[str, int] = {}
+        for bucket, band_key in zip(self.buckets, self._keys(value)):
+            for key in bucket.get(band_key, ()):
+                if key not in found:
+                    distance = bin(value ^ self.hashes[key]).count("1")
+                    if distance <= self.threshold:
+                        found[key] = distance
+        return found
+
+
+def find_groups(hashes: dict[str, int], threshold: int) -> list[dict[str, int]]:
+    """Near-duplicate clusters (size ≥ 2) as {index: distance to canonical}, canonical first."""
+    index = HashIndex(threshold)
+    parent: dict[str, str] = {}
+
+    def root(k: str) -> str:
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    for key in sorted(hashes, key=int):
+        parent[key] = key
+        for other in index.query(hashes[key]):
+            a, b = root(key), root(other)
+            if a != b:
+                parent[max(a, b, key=int)] = min(a, b, key=int)
+        index.add(key, hashes[key])
+
+    clusters: dict[str, list[str]] = defaultdict(list)
+    for key in hashes:
+        clusters[root(key)].append(key)
+    groups = []
+    for canonical, members in sorted(clusters.items(), key=lambda kv: int(kv[0])):
+        if len(members) < 2:
+            continue
+        groups.append({
+            k: bin(hashes[k] ^ hashes[canonical]).count("1")
+            for k in sorted(members, key=int)
+        })
+    return groups
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def write_report(groups: list[dict[str, int]], analysis: dict, threshold: int) -> None:
+    saved = sum(len(g) - 1 for g in groups)
+    lines = [
+        "# Image dedupe review",
+        "",
+        f"dHash threshold: {threshold} / {HASH_BITS} bits — {len(groups)} groups, "
+        f"{saved} images would be replaced by their canonical image.",
+        "",
+        "Canonical image is listed first. Re-run with `--apply` once the groups look right;",
+        "lower `--threshold` if any group mixes different scenes.",
+        "",
+    ]
+    for n, group in enumerate(groups, 1):
+        lines.append(f"## Group {n}")
+        lines.append("")
+        lines.append("| index | distance | visual concept | image |")
+        lines.append("|---|---|---|---|")
+        for idx, distance in group.items():
+            concept = analysis.get(idx, {}).get("visual_concept", "").replace("|", "\\|")
+            lines.append(f"| {idx} | {distance} | {concept} | ![{idx}]({IMAGE_DIR / f'{idx}.png'}) |")
+        lines.append("")
+    REPORT_FILE.write_text("\n".join(lines), encoding="utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perceptual-hash dedupe of generated question images")
+    parser.add_argument(
+        "--threshold", type=int, default=DEFAULT_THRESHOLD,
+        help=f"dHash 相差位元數上限（0–{HASH_BITS}，預設 {DEFAULT_THRESHOLD}）",
+    )
+    parser.add_argument("--apply", action="store_true", help="將重複圖片寫入 shared_with（請先檢視報告）")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"計算 hash 的程序數（預設 {WORKERS}）")
+    args = parser.parse_args()
+
+    analysis: dict = json.loads(ANALYSIS_FILE.read_text(encoding="utf-8"))
+    aliases = load_aliases(analysis)
+    new_aliases = prompt_aliases(analysis, aliases)
+    print(f"{len(new_aliases)} questions share an identical prompt with a lower index")
+
+    png_files = sorted(
+        (p for p in IMAGE_DIR.glob("*.png")
+         if p.stem.isdigit() and p.stem not in aliases and p.stem not in new_aliases),
+        key=lambda p: int(p.stem),
+    )
+    if png_files:
+        hashes = hash_images(png_files, args.workers)
+        groups = find_groups(hashes, args.threshold)
+        write_report(groups, analysis, args.threshold)
+        duplicates = sum(len(g) - 1 for g in groups)
+        print(f"{len(hashes)} images, {len(groups)} near-duplicate groups, {duplicates} duplicates → {REPORT_FILE}")
+        new_aliases.update(
+            (idx, (canonical, {"method": "phash", "distance": distance, "threshold": args.threshold}))
+            for group in groups
+            for canonical in [next(iter(group))]
+            for idx, distance in group.items()
+            if idx != canonical
+        )
+    else:
+        print(f"No PNG files found in {IMAGE_DIR}.")
+
+    if args.apply:
+        record_aliases(new_aliases)
+        print(f"Recorded {len(new_aliases)} aliases in {ANALYSIS_FILE}")
+
+if __name__ == "__main__":
+    main()
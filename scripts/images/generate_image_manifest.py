@@ -3,57 +3,165 @@ generate_image_manifest.py
 
 Reads:
   - public/data/professional_image_analysis.json  (tier info per question index)
-  - webp_urls.json                                 (index → Firebase URL, produced by convert_and_upload.py)
+  - webp_urls.json + webp_urls.log                 (index → uploaded variants, produced by convert_and_upload.py;
+                                                    read via its load_urls(), so checkpoints of an
+                                                    interrupted upload run are included)
+  - image_placeholders.json                        (PNG sha256 → LQIP data URI, produced by convert_and_upload.py)
 
 Writes:
-  - public/data/professional_images.json           (index string → URL, only tier 1 & 2)
+  - public/data/professional_images.json           (only tier 1 & 2), index string →
+        {
+          "src": "<widest WebP URL>", "width": 1024, "height": 1024,
+          "placeholder": "data:image/webp;base64,...",                     # when available
+          "variants": [{"url", "type", "width", "height", "bytes"}, ...]   # narrowest first
+        }
+    so the frontend can build srcset / <picture>, reserve the box and paint a
+    blurred preview before the real image loads, with no extra requests.
+    Legacy single-URL entries in webp_urls.json are passed through as plain strings.
 
-Only indices that appear in both the tier-1/2 list AND webp_urls.json are included,
+Only indices that appear in both the tier-1/2 list AND the uploaded URLs are included,
 so the manifest is safe to regenerate incrementally (partial uploads are fine).
+Questions marked `shared_with` (see dedupe_images.py) reuse their canonical
+index's entry, so several keys point at the same asset URLs.
+
+With --bank <other bank>, no images are generated: public/data/<bank>_images.json
+is built from professional_images.json for the questions that near-duplicate a
+professional question with an image and the same correct answer (see
+near_duplicates.py), so the other banks show the already-paid images.
 
 Usage:
     uv run generate_image_manifest.py
+    uv run generate_image_manifest.py --bank general
 """
 
+import argparse
 import json
+import sys
 from pathlib import Path
 
+from convert_and_upload import URLS_FILE, URLS_LOG, load_urls
+from near_duplicates import DEFAULT_THRESHOLD, find_matches
+from question_bank import BANKS, DATA_DIR, QuestionBank
+
 ANALYSIS_FILE = Path("public/data/professional_image_analysis.json")
-URLS_FILE = Path("webp_urls.json")
 OUTPUT_FILE = Path("public/data/professional_images.json")
+PLACEHOLDERS_FILE = Path("image_placeholders.json")
+SOURCE_BANK = "professional"  # the only bank images are generated for
+VARIANT_FIELDS = ("url", "type", "width", "height", "bytes")  # hashes stay out of the client manifest
+
+
+def tier12_indices(analysis: dict) -> set[str]:
+    """Collect tier 1 & 2 indices (as strings)."""
+    return {k for k, v in analysis.items() if str(v.get("tier", "3")) in ("1", "2")}
+
+
+def manifest_entry(uploaded: list[dict] | str, placeholders: dict[str, str]) -> dict | str:
+    """Variant records → srcset-ready entry; a legacy URL string is kept as is."""
+    if isinstance(uploaded, str):
+        return uploaded
+    placeholder = placeholders.get(uploaded[0].get("source_sha256", ""))
+    variants = sorted(
+        ({k: v[k] for k in VARIANT_FIELDS} for v in uploaded),
+        key=lambda v: (v["width"], v["type"]),
+    )
+    webp = [v for v in variants if v["type"] == "image/webp"] or variants
+    widest = webp[-1]
+    entry = {
+        "src": widest["url"],
+        "width": widest["width"],
+        "height": widest["height"],
+        "variants": variants,
+    }
+    if placeholder:
+        entry["placeholder"] = placeholder
+    return entry
+
+
+def load_placeholders() -> dict[str, str]:
+    if PLACEHOLDERS_FILE.exists():
+        return json.loads(PLACEHOLDERS_FILE.read_text(encoding="utf-8"))
+    return {}
+
+
+def build_manifest(
+    analysis: dict, urls: dict[str, list[dict] | str], placeholders: dict[str, str] | None = None
+) -> dict[str, dict | str]:
+    """Map tier 1 & 2 indices to their images, skipping indices not yet uploaded."""
+    placeholders = load_placeholders() if placeholders is None else placeholders
+    sources = {idx: str(analysis[idx].get("shared_with", idx)) for idx in tier12_indices(analysis)}
+    return {
+        idx: manifest_entry(urls[sources[idx]], placeholders)
+        for idx in sorted(sources, key=lambda x: int(x))
+        if urls.get(sources[idx])
+    }
+
+
+def write_manifest(manifest: dict[str, dict | str], path: Path = OUTPUT_FILE) -> None:
+    """Atomically replace path so readers never see a half-written manifest."""
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def reuse_manifest(bank: str, threshold: float = DEFAULT_THRESHOLD) -> dict[str, dict | str]:
+    """Manifest for another bank: professional entries of answer-consistent near-duplicates."""
+    source = QuestionBank.load(SOURCE_BANK)
+    keep = {SOURCE_BANK: {int(k) for k in source.images}}
+    matches = find_matches(QuestionBank.load(bank), [source], threshold, keep)
+    return {
+        str(idx): source.images[str(m["index"])]
+        for idx, m in sorted(matches.items())
+        if m["answer_consistent"]
+    }
+
+
+def main_reuse(bank: str, threshold: float) -> None:
+    if not QuestionBank.load(bank).exists() or not QuestionBank.load(SOURCE_BANK).images:
+        print(f"Error: {bank}.json or {OUTPUT_FILE} not found.")
+        return
+    manifest = reuse_manifest(bank, threshold)
+    output = DATA_DIR / f"{bank}_images.json"
+    if not manifest:
+        print(f"No {bank} question near-duplicates a {SOURCE_BANK} question with an image; nothing written")
+        return
+    write_manifest(manifest, output)
+    print(f"Reused {len(manifest)} {SOURCE_BANK} images for {bank} (threshold {threshold})")
+    print(f"Written to {output}")
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Write the image manifest for the frontend")
+    parser.add_argument("--bank", default=SOURCE_BANK, choices=BANKS, help=f"題庫 id（預設 {SOURCE_BANK}）")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help=f"其他題庫沿用圖片的相似度下限（預設 {DEFAULT_THRESHOLD}）",
+    )
+    args = parser.parse_args()
+    if args.bank != SOURCE_BANK:
+        main_reuse(args.bank, args.threshold)
+        return
+
     if not ANALYSIS_FILE.exists():
         print(f"Error: {ANALYSIS_FILE} not found.")
         return
-    if not URLS_FILE.exists():
-        print(f"Error: {URLS_FILE} not found. Run convert_and_upload.py first.")
-        return
+    if not URLS_FILE.exists() and not URLS_LOG.exists():
+        print(f"Error: neither {URLS_FILE} nor {URLS_LOG} found. Run convert_and_upload.py first.")
+        sys.exit(1)
 
     analysis: dict = json.loads(ANALYSIS_FILE.read_text(encoding="utf-8"))
-    urls: dict[str, str] = json.loads(URLS_FILE.read_text(encoding="utf-8"))
+    urls = load_urls()
 
-    # Collect tier 1 & 2 indices (as strings)
-    tier12_indices = {
-        k for k, v in analysis.items() if str(v.get("tier", "3")) in ("1", "2")
-    }
-
-    # Build manifest: only include indices present in both sets
-    manifest: dict[str, str] = {}
-    for idx in sorted(tier12_indices, key=lambda x: int(x)):
-        if idx in urls:
-            manifest[idx] = urls[idx]
-
-    OUTPUT_FILE.write_text(
-        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
-    )
+    manifest = build_manifest(analysis, urls)
+    write_manifest(manifest)
 
-    total_tier12 = len(tier12_indices)
+    total_tier12 = len(tier12_indices(analysis))
     included = len(manifest)
     missing = total_tier12 - included
     print(f"Tier 1+2 questions: {total_tier12}")
     print(f"Included in manifest: {included}")
+    shared = sum(1 for idx in manifest if "shared_with" in analysis[idx])
+    if shared:
+        print(f"  of which sharing another question's image: {shared}")
     if missing:
         print(f"Missing URLs (not yet uploaded): {missing}")
     print(f"Written to {OUTPUT_FILE}")
@@ -3,11 +3,18 @@ import asyncio
 import json
 import os
 import sys
+import time
+from collections import defaultdict, deque
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Awaitable, Callable, Dict, Optional
 from tqdm.asyncio import tqdm
 from dotenv import load_dotenv
 
+from dedupe_images import ALIAS_FIELD, apply_prompt_cache
+from question_bank import QuestionBank
+from image_request import request_image
+from telemetry import Telemetry
+
 try:
     from google import genai
 except ImportError:
@@ -18,15 +25,20 @@ load_dotenv()
 
 # 配置
 ANALYSIS_FILE = Path("public/data/professional_image_analysis.json")
+BANK = "professional"
+LEDGER_FILE = Path("image_cost_ledger.jsonl")  # 每張計費圖片一行，跨次執行累計花費
 IMAGE_DIR = Path("public/data/images/professional")
 MODEL_ID = "gemini-3.1-flash-image-preview"
 CONCURRENCY = 3
+MAX_IN_FLIGHT = CONCURRENCY + 2  # 同時送出中的請求上限：逾時後仍在等回應的請求也佔一格
 
 # 費用追蹤
 COST_PER_IMAGE_USD = 0.067   # 每張估計費用（USD）— gemini-3.1-flash-image-preview 1K (1024px)
 TWD_PER_USD = 32.0           # 匯率：1 USD ≈ 32 TWD
-BUDGET_TWD = 300             # 預算上限（TWD）
+BUDGET_TWD = 300             # 累計預算上限（TWD，含先前執行的花費）
 BUDGET_USD = BUDGET_TWD / TWD_PER_USD  # ≈ 9.375 USD
+DEFAULT_CONFIDENCE = 0.5     # 分析結果沒有 confidence 欄位時的預設值
+BUDGET_EXIT_CODE = 3         # 因預算中止、仍有圖片未生成時的結束碼（build_pipeline 據此不記為已建置）
 
 # 視覺風格配置
 STYLE_CONFIG = {
@@ -36,16 +48,72 @@ STYLE_CONFIG = {
 }
 
 
+class CostLedger:
+    """Append-only JSONL cost ledger; totals survive restarts so the budget is cumulative."""
+
+    def __init__(self, path: Path = LEDGER_FILE, budget_usd: float = BUDGET_USD) -> None:
+        self.path = path
+        self.budget_usd = budget_usd
+        self.total_usd = 0.0
+        self.total_count = 0
+        self.run_usd = 0.0
+        self.run_count = 0
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    self.total_usd += json.loads(line)["usd"]
+                    self.total_count += 1
+
+    @property
+    def exhausted(self) -> bool:
+        return self.total_usd >= self.budget_usd
+
+    def charge(self, idx: int, usd: float = COST_PER_IMAGE_USD) -> None:
+        entry = {"ts": round(time.time(), 3), "index": idx, "model": MODEL_ID, "usd": usd}
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.total_usd += usd
+        self.total_count += 1
+        self.run_usd += usd
+        self.run_count += 1
+
+    def status(self) -> str:
+        spent_twd = self.total_usd * TWD_PER_USD
+        budget_twd = self.budget_usd * TWD_PER_USD
+        return (
+            f"💰 NT${spent_twd:.0f}/{budget_twd:.0f} "
+            f"(本次 ${self.run_usd:.3f} USD) 剩 NT${budget_twd - spent_twd:.0f}"
+        )
+
+
+def make_client(api_key: str) -> genai.Client:
+    """GEMINI_BASE_URL 可指向本機 fake server（scripts/bench/fake_api.py）做離線測試。"""
+    base_url = os.environ.get("GEMINI_BASE_URL")
+    return genai.Client(api_key=api_key, http_options={"base_url": base_url} if base_url else None)
+
+
+def build_prompt(task: Dict[str, Any]) -> str:
+    full_prompt = STYLE_CONFIG["prefix"]
+    if str(task["tier"]) == "1":
+        full_prompt += STYLE_CONFIG["tier_1_extra"]
+    return full_prompt + task["image_prompt"]
+
+
 async def generate_single_image(
     client: genai.Client,
     task: Dict[str, Any],
-    semaphore: asyncio.Semaphore,
+    in_flight: asyncio.Semaphore,
     stop_event: asyncio.Event,
-    cost_state: Dict[str, Any],
+    ledger: CostLedger,
     pbar: tqdm,
+    telemetry: Telemetry,
+    sink: Optional[Callable[[int, bytes], Awaitable[None]]] = None,
 ):
+    """生成單張圖片並存成 PNG；若提供 sink，另將圖片 bytes 交給下游（管線模式）。
+
+    in_flight 限制同時送出中的請求數（含逾時後仍在等回應的），見 image_request.py。
+    """
     idx = task["index"]
-    tier = str(task["tier"])
 
     output_path = IMAGE_DIR / f"{idx}.png"
 
@@ -59,87 +127,147 @@ async def generate_single_image(
         pbar.update(1)
         return False
 
-    full_prompt = STYLE_CONFIG["prefix"]
-    if tier == "1":
-        full_prompt += STYLE_CONFIG["tier_1_extra"]
-    full_prompt += task["image_prompt"]
+    try:
+        image_data = await request_image(
+            client, MODEL_ID, build_prompt(task), in_flight, telemetry,
+            key=str(idx), cost_usd=COST_PER_IMAGE_USD,
+            retryable=lambda e: "429" in str(e) or "503" in str(e),
+            stop=stop_event,
+        )
+    except Exception as e:
+        pbar.write(f"[ERROR] Image {idx} failed: {e}")
+        pbar.update(1)
+        return False
 
-    async with semaphore:
-        # 再次確認（等待 semaphore 期間可能已被其他協程觸發）
-        if stop_event.is_set():
-            pbar.update(1)
-            return False
-
-        for attempt in range(3):
-            try:
-                response = await asyncio.wait_for(
-                    asyncio.to_thread(
-                        client.models.generate_content,
-                        model=MODEL_ID,
-                        contents=full_prompt,
-                        config={
-                            "response_modalities": ["TEXT", "IMAGE"],
-                            "image_config": {"aspect_ratio": "1:1"},
-                        },
-                    ),
-                    timeout=60,
-                )
+    if image_data is None:
+        pbar.update(1)
+        return False
+
+    # 逾時後才回來的圖片一樣存檔、計費（已付費，不丟棄）
+    with open(output_path, "wb") as f:
+        f.write(image_data)
 
-                image_data = None
-                for part in (response.parts or []):
-                    if part.inline_data:
-                        image_data = part.inline_data.data
-                        break
-
-                if image_data is None:
-                    # 回傳空內容，當作可重試的暫時性錯誤
-                    await asyncio.sleep(5 * (attempt + 1))
-                    continue
-
-                if image_data:
-                    with open(output_path, "wb") as f:
-                        f.write(image_data)
-
-                    # --- 費用追蹤 ---
-                    cost_state["count"] += 1
-                    cost_state["usd"] += COST_PER_IMAGE_USD
-                    spent_twd = cost_state["usd"] * TWD_PER_USD
-                    remaining_twd = BUDGET_TWD - spent_twd
-                    pbar.set_postfix_str(
-                        f"💰 NT${spent_twd:.0f}/{BUDGET_TWD} "
-                        f"(${cost_state['usd']:.3f} USD) "
-                        f"剩 NT${remaining_twd:.0f}"
-                    )
-
-                    if cost_state["usd"] >= BUDGET_USD:
-                        pbar.write(
-                            f"\n⚠️  已達預算上限 NT${BUDGET_TWD}！"
-                            f"（已生成 {cost_state['count']} 張，"
-                            f"花費 NT${spent_twd:.0f} / ${cost_state['usd']:.3f} USD）"
-                            f"\n   停止發送新請求，等待進行中的任務完成..."
-                        )
-                        stop_event.set()
-
-                    pbar.update(1)
-                    return True
-                else:
-                    pbar.write(f"[WARN] No image data for index {idx}")
-                    pbar.update(1)
-                    return False
-
-            except asyncio.TimeoutError:
-                await asyncio.sleep(5 * (attempt + 1))
-                continue
-            except Exception as e:
-                if "429" in str(e) or "503" in str(e):
-                    await asyncio.sleep(5 * (attempt + 1))
-                    continue
-                pbar.write(f"[ERROR] Image {idx} failed: {e}")
-                pbar.update(1)
-                return False
+    # --- 費用追蹤（寫入 ledger，重跑時延續累計花費）---
+    ledger.charge(idx)
+    pbar.set_postfix_str(ledger.status())
+
+    if ledger.exhausted:
+        pbar.write(
+            f"\n⚠️  已達預算上限 NT${ledger.budget_usd * TWD_PER_USD:.0f}！"
+            f"（累計生成 {ledger.total_count} 張，"
+            f"花費 NT${ledger.total_usd * TWD_PER_USD:.0f} / ${ledger.total_usd:.3f} USD）"
+            f"\n   停止發送新請求，等待進行中的任務完成..."
+        )
+        stop_event.set()
 
     pbar.update(1)
-    return False
+    if sink is not None:
+        # 佇列已滿時會在此等待，形成對生圖端的背壓
+        await sink(idx, image_data)
+    return True
+
+
+def select_tasks(analysis_data: Dict[str, Any], indices: Optional[list[int]] = None) -> list[Dict[str, Any]]:
+    """取出 tier 1/2 任務；指定 indices 時只保留這些題目。不寫入任何檔案。
+
+    已標記 shared_with 的題目共用其他題的圖片，不再生成；prompt 完全相同的題目
+    只保留 index 最小的一題（exact-prompt cache），共用關係由 dedupe_images.py --apply 寫入。
+    """
+    all_tasks = [
+        v for v in analysis_data.values()
+        if str(v.get("tier")) in ["1", "2"] and v.get(ALIAS_FIELD) is None
+    ]
+    all_tasks, prompt_aliases = apply_prompt_cache(all_tasks, build_prompt)
+    if prompt_aliases:
+        print(
+            f"Prompt 完全相同：{len(prompt_aliases)} 題不另生成"
+            "（執行 dedupe_images.py --apply 記錄為共用圖片，否則不會上傳）"
+        )
+    if not indices:
+        return all_tasks
+
+    target = set(indices)
+    pending_tasks = [t for t in all_tasks if t["index"] in target]
+    shared = {
+        i for i in target - {t["index"] for t in pending_tasks}
+        if analysis_data.get(str(i), {}).get(ALIAS_FIELD) is not None or str(i) in prompt_aliases
+    }
+    if shared:
+        print(f"[INFO] 以下 index 共用其他題目的圖片，略過：{sorted(shared)}")
+    not_found = target - {t["index"] for t in pending_tasks} - shared
+    if not_found:
+        print(f"[WARN] 以下 index 在 tier1/2 中不存在：{sorted(not_found)}")
+    print(f"指定模式：僅處理 {len(pending_tasks)} 張（index: {sorted(t['index'] for t in pending_tasks)}）")
+    return pending_tasks
+
+
+def prioritize(
+    tasks: list[Dict[str, Any]],
+    questions: QuestionBank,
+    analysis_data: Dict[str, Any],
+) -> list[Dict[str, Any]]:
+    """依預期價值排序：tier 1 優先，其次補足圖片覆蓋率最低的章節，最後依分析 confidence。
+
+    覆蓋率 = 該章已有圖片（含共用）的 tier 1/2 題數 ÷ 該章 tier 1/2 題數，每排入一題即更新，
+    因此預算有限時各章節會輪流補上最缺的部分，而非集中在前面的章節。
+    """
+    def chapter(idx: int) -> str:
+        q = questions.get(idx) if questions.exists() else None
+        return q.chapter if q else ""
+
+    wanted: Dict[str, int] = defaultdict(int)
+    covered: Dict[str, int] = defaultdict(int)
+    for v in analysis_data.values():
+        if str(v.get("tier")) not in ("1", "2"):
+            continue
+        ch = chapter(int(v["index"]))
+        wanted[ch] += 1
+        source = str(v.get(ALIAS_FIELD, v["index"]))
+        if (IMAGE_DIR / f"{source}.png").exists():
+            covered[ch] += 1
+
+    ordered: list[Dict[str, Any]] = []
+    for tier in ("1", "2"):
+        queues: Dict[str, deque] = defaultdict(deque)
+        for t in sorted(
+            (t for t in tasks if str(t["tier"]) == tier),
+            key=lambda t: (-float(t.get("confidence", DEFAULT_CONFIDENCE)), int(t["index"])),
+        ):
+            queues[chapter(int(t["index"]))].append(t)
+        while queues:
+            ch = min(queues, key=lambda c: (covered[c] / max(wanted[c], 1), c))
+            ordered.append(queues[ch].popleft())
+            covered[ch] += 1
+            if not queues[ch]:
+                del queues[ch]
+    return ordered
+
+
+async def generate_all(
+    client: genai.Client,
+    tasks: list[Dict[str, Any]],
+    stop_event: asyncio.Event,
+    ledger: CostLedger,
+    pbar: tqdm,
+    telemetry: Telemetry,
+    sink: Optional[Callable[[int, bytes], Awaitable[None]]] = None,
+) -> list[bool]:
+    """以 CONCURRENCY 個 worker 依序領取已排序的任務；預算用盡時剩下的是價值最低的題目。"""
+    in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    pending = deque(tasks)
+    results: list[bool] = []
+
+    async def worker() -> None:
+        while pending:
+            task = pending.popleft()
+            results.append(
+                await generate_single_image(
+                    client, task, in_flight, stop_event, ledger, pbar, telemetry, sink=sink
+                )
+            )
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return results
 
 
 async def main():
@@ -148,6 +276,10 @@ async def main():
         "--indices", nargs="+", type=int, metavar="IDX",
         help="只生成指定 index 的圖片，例如：--indices 240 411 582"
     )
+    parser.add_argument(
+        "--budget-twd", type=float, default=BUDGET_TWD,
+        help=f"累計預算上限（TWD，含 {LEDGER_FILE} 已記錄的花費；預設 {BUDGET_TWD}）",
+    )
     args = parser.parse_args()
 
     api_key = os.environ.get("GEMINI_API_KEY")
@@ -155,7 +287,7 @@ async def main():
         print("Error: GEMINI_API_KEY environment variable not set", file=sys.stderr)
         sys.exit(1)
 
-    client = genai.Client(api_key=api_key)
+    client = make_client(api_key)
 
     if not ANALYSIS_FILE.exists():
         print(f"Error: {ANALYSIS_FILE} not found.", file=sys.stderr)
@@ -166,50 +298,51 @@ async def main():
     with open(ANALYSIS_FILE, "r", encoding="utf-8") as f:
         analysis_data = json.load(f)
 
-    all_tasks = [v for v in analysis_data.values() if str(v.get("tier")) in ["1", "2"]]
-
-    if args.indices:
-        target = set(args.indices)
-        pending_tasks = [t for t in all_tasks if t["index"] in target]
-        not_found = target - {t["index"] for t in pending_tasks}
-        if not_found:
-            print(f"[WARN] 以下 index 在 tier1/2 中不存在：{sorted(not_found)}")
-        print(f"指定模式：僅處理 {len(pending_tasks)} 張（index: {sorted(t['index'] for t in pending_tasks)}）")
-    else:
-        pending_tasks = all_tasks
-    already_done = sum(1 for t in pending_tasks if (IMAGE_DIR / f"{t['index']}.png").exists())
-    to_generate = len(pending_tasks) - already_done
+    pending_tasks = select_tasks(analysis_data, args.indices)
+    done_tasks = [t for t in pending_tasks if (IMAGE_DIR / f"{t['index']}.png").exists()]
+    todo_tasks = prioritize(
+        [t for t in pending_tasks if t not in done_tasks], QuestionBank.load(BANK), analysis_data
+    )
+    already_done = len(done_tasks)
+    to_generate = len(todo_tasks)
 
+    ledger = CostLedger(budget_usd=args.budget_twd / TWD_PER_USD)
+    remaining_usd = max(ledger.budget_usd - ledger.total_usd, 0.0)
     print(f"待生成：{to_generate} 張（已完成 {already_done} / {len(pending_tasks)} 張）")
-    print(f"預算上限：NT${BUDGET_TWD}（≈ ${BUDGET_USD:.2f} USD，約可生成 {int(BUDGET_USD / COST_PER_IMAGE_USD)} 張）")
+    print(
+        f"預算上限：NT${args.budget_twd:.0f}，先前已花費 NT${ledger.total_usd * TWD_PER_USD:.0f}"
+        f"（{ledger.total_count} 張），剩餘約可生成 {int(remaining_usd / COST_PER_IMAGE_USD)} 張"
+    )
     print()
 
-    semaphore = asyncio.Semaphore(CONCURRENCY)
     stop_event = asyncio.Event()
-    cost_state = {"count": 0, "usd": 0.0}
-
-    with tqdm(total=len(pending_tasks), desc="生成圖片", unit="張") as pbar:
-        # 已完成的先更新進度條
-        pbar.update(already_done)
-
-        tasks = [
-            generate_single_image(client, t, semaphore, stop_event, cost_state, pbar)
-            for t in pending_tasks
-        ]
-        results = await asyncio.gather(*tasks)
-
-    success_count = sum(1 for r in results if r)
-    total_usd = cost_state["usd"]
-    total_twd = total_usd * TWD_PER_USD
-
-    print()
-    print("=" * 50)
-    print(f"完成！成功生成 {cost_state['count']} 張新圖片（含已存在共 {success_count} 張）")
-    print(f"本次花費：NT${total_twd:.0f}（${total_usd:.3f} USD，匯率 {TWD_PER_USD:.0f}）")
-    if stop_event.is_set():
+    if ledger.exhausted:
+        stop_event.set()
+
+    telemetry = Telemetry("generate_images", output_unit="images")
+    try:
+        with tqdm(total=len(pending_tasks), desc="生成圖片", unit="張") as pbar:
+            # 已完成的先更新進度條
+            pbar.update(already_done)
+            results = await generate_all(client, todo_tasks, stop_event, ledger, pbar, telemetry)
+
+        success_count = already_done + sum(1 for r in results if r)
+        total_usd = ledger.run_usd
+        total_twd = total_usd * TWD_PER_USD
+
+        print()
+        print("=" * 50)
+        print(f"完成！成功生成 {ledger.run_count} 張新圖片（含已存在共 {success_count} 張）")
+        print(f"本次花費：NT${total_twd:.0f}（${total_usd:.3f} USD，匯率 {TWD_PER_USD:.0f}）")
+        print(f"累計花費：NT${ledger.total_usd * TWD_PER_USD:.0f}（{ledger.total_count} 張，記錄於 {LEDGER_FILE}）")
         remaining = len(pending_tasks) - success_count
-        print(f"因預算中止，剩餘 {remaining} 張未生成 → 補充預算後重跑腳本可斷點續傳")
-    print("=" * 50)
+        if stop_event.is_set():
+            print(f"因預算中止，剩餘 {remaining} 張未生成 → 以 --budget-twd 提高累計預算後重跑，可斷點續傳")
+        print("=" * 50)
+    finally:
+        telemetry.close()
+    if stop_event.is_set() and remaining > 0:
+        sys.exit(BUDGET_EXIT_CODE)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+"""
+image_pipeline.py
+
+Streaming mode for steps ②→④: generate → WebP → upload → manifest in one run.
+
+Stages are connected by bounded asyncio queues so Gemini generation (network),
+WebP encoding (CPU, process pool) and Firebase uploads (network, threads) all
+overlap. Each image is converted to its responsive WebP variants in memory right
+after it is generated, uploaded
+immediately, and its URL is checkpointed as soon as the upload finishes; the
+manifest is rewritten every MANIFEST_EVERY published images and once at the end:
+
+    generate (CONCURRENCY) ─▶ encode_q ─▶ encode (ENCODE_WORKERS)
+        ─▶ upload_q ─▶ upload (UPLOAD_WORKERS) ─▶ publish_q ─▶ webp_urls.log
+                                                               + professional_images.json
+
+Resume-friendly: indices already in webp_urls.json / .log are skipped; PNGs that exist
+on disk but were never uploaded are fed straight into the encode stage (no new
+generation cost). Generated PNGs are still written to disk as the source of truth.
+Generation follows generate_images_v2's priority order and cumulative cost ledger.
+LQIP placeholders are computed in the encode stage (cached by PNG hash in
+image_placeholders.json) so every published manifest entry already carries one.
+The budget cap from generate_images_v2.py applies unchanged (--budget-twd raises it).
+
+Usage:
+    uv run scripts/images/image_pipeline.py
+    uv run scripts/images/image_pipeline.py --indices 240 411 582
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm.asyncio import tqdm
+
+import convert_and_upload as upload
+import generate_image_manifest as manifest
+import generate_images_v2 as gen
+from question_bank import QuestionBank
+from telemetry import Telemetry
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+ENCODE_WORKERS = 2   # WebP encoding processes
+UPLOAD_WORKERS = 4   # concurrent Firebase uploads
+QUEUE_SIZE = 4       # per-stage buffer; a full queue back-pressures the stage before it
+MANIFEST_EVERY = 10  # published images per manifest rewrite (plus a final one)
+
+
+async def encode_worker(
+    pool: ProcessPoolExecutor,
+    encode_q: asyncio.Queue,
+    upload_q: asyncio.Queue,
+    placeholders: dict[str, str],
+    failed: list[str],
+) -> None:
+    loop = asyncio.get_running_loop()
+    while (item := await encode_q.get()) is not None:
+        idx, png_bytes = item
+        source_sha = hashlib.sha256(png_bytes).hexdigest()
+        try:
+            variants = await loop.run_in_executor(pool, upload.encode_variants, png_bytes)
+            if source_sha not in placeholders:
+                placeholders[source_sha] = await loop.run_in_executor(
+                    pool, upload.make_placeholder, png_bytes
+                )
+        except Exception as exc:
+            tqdm.write(f"  [SKIP] {idx}: conversion failed — {exc}")
+            failed.append(idx)
+            continue
+        await upload_q.put((idx, source_sha, variants))
+
+
+async def upload_worker(
+    storage_client,
+    upload_q: asyncio.Queue,
+    publish_q: asyncio.Queue,
+    failed: list[str],
+) -> None:
+    settings = upload.encode_settings(("webp",))
+    while (item := await upload_q.get()) is not None:
+        idx, source_sha, variants = item
+        try:
+            records = await asyncio.to_thread(
+                upload.upload_variants, storage_client, idx, variants, source_sha, settings
+            )
+        except Exception as exc:
+            tqdm.write(f"  [FAIL] {idx}: upload failed — {exc}")
+            failed.append(idx)
+            continue
+        await publish_q.put((idx, records))
+
+
+async def publisher(
+    analysis: dict,
+    url_log: upload.UrlLog,
+    placeholders: dict[str, str],
+    publish_q: asyncio.Queue,
+    pbar: tqdm,
+) -> None:
+    """Single writer for the URL log and the manifest, so writes never interleave."""
+    published = 0
+    while (item := await publish_q.get()) is not None:
+        idx, records = item
+        url_log.add(idx, records)
+        published += 1
+        if published % MANIFEST_EVERY == 0:
+            manifest.write_manifest(manifest.build_manifest(analysis, url_log.urls, placeholders))
+        pbar.update(1)
+    if published % MANIFEST_EVERY:
+        manifest.write_manifest(manifest.build_manifest(analysis, url_log.urls, placeholders))
+
+
+async def run(indices: list[int] | None, storage_dir: str | None, budget_twd: float) -> None:
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("Error: GEMINI_API_KEY environment variable not set", file=sys.stderr)
+        sys.exit(1)
+    if not gen.ANALYSIS_FILE.exists():
+        print(f"Error: {gen.ANALYSIS_FILE} not found.", file=sys.stderr)
+        sys.exit(1)
+
+    client = gen.make_client(api_key)
+    storage_client = upload.init_storage(storage_dir)
+    gen.IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+
+    analysis = json.loads(gen.ANALYSIS_FILE.read_text(encoding="utf-8"))
+    urls = upload.load_urls()
+    tasks = [
+        t for t in gen.select_tasks(analysis, indices)
+        if not upload.is_published(urls.get(str(t["index"])))
+    ]
+    on_disk = [t for t in tasks if (gen.IMAGE_DIR / f"{t['index']}.png").exists()]
+    to_generate = gen.prioritize([t for t in tasks if t not in on_disk], QuestionBank.load(gen.BANK), analysis)
+    ledger = gen.CostLedger(budget_usd=budget_twd / gen.TWD_PER_USD)
+
+    print(f"待處理：{len(tasks)} 張（需生成 {len(to_generate)}，已有 PNG 待上傳 {len(on_disk)}）")
+    print(f"預算上限：NT${budget_twd:.0f}，先前已花費 NT${ledger.total_usd * gen.TWD_PER_USD:.0f}")
+    if not tasks:
+        return
+
+    encode_q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    upload_q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    publish_q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    failed: list[str] = []
+    url_log = upload.UrlLog(urls, flush_every=1)  # every published entry is checkpointed
+    placeholders = upload.load_placeholders()
+
+    telemetry = Telemetry("image_pipeline", output_unit="images")
+    stop_event = asyncio.Event()
+    if ledger.exhausted:
+        stop_event.set()
+
+    async def sink(idx: int, png_bytes: bytes) -> None:
+        await encode_q.put((str(idx), png_bytes))
+
+    async def feed_existing() -> None:
+        for t in on_disk:
+            png_bytes = await asyncio.to_thread((gen.IMAGE_DIR / f"{t['index']}.png").read_bytes)
+            await encode_q.put((str(t["index"]), png_bytes))
+
+    try:
+        with ProcessPoolExecutor(max_workers=ENCODE_WORKERS) as pool, \
+                tqdm(total=len(to_generate), desc="生成", unit="張", position=0) as gen_bar, \
+                tqdm(total=len(tasks), desc="發佈", unit="張", position=1) as pub_bar:
+            encoders = [
+                asyncio.create_task(encode_worker(pool, encode_q, upload_q, placeholders, failed))
+                for _ in range(ENCODE_WORKERS)
+            ]
+            uploaders = [
+                asyncio.create_task(upload_worker(storage_client, upload_q, publish_q, failed))
+                for _ in range(UPLOAD_WORKERS)
+            ]
+            publish_task = asyncio.create_task(publisher(analysis, url_log, placeholders, publish_q, pub_bar))
+
+            _, results = await asyncio.gather(
+                feed_existing(),
+                gen.generate_all(client, to_generate, stop_event, ledger, gen_bar, telemetry, sink=sink),
+            )
+
+            # Drain stage by stage: one sentinel per worker, then wait for that stage
+            for _ in encoders:
+                await encode_q.put(None)
+            await asyncio.gather(*encoders)
+            for _ in uploaders:
+                await upload_q.put(None)
+            await asyncio.gather(*uploaders)
+            await publish_q.put(None)
+            await publish_task
+            url_log.close()
+            upload.save_placeholders(placeholders)
+
+        total_twd = ledger.run_usd * gen.TWD_PER_USD
+        print()
+        print("=" * 50)
+        print(f"完成！新生成 {ledger.run_count} 張，本次花費 NT${total_twd:.0f}（${ledger.run_usd:.3f} USD）")
+        print(f"累計花費：NT${ledger.total_usd * gen.TWD_PER_USD:.0f}（{ledger.total_count} 張）")
+        print(f"Manifest：{len(manifest.build_manifest(analysis, urls, placeholders))} 筆 → {manifest.OUTPUT_FILE}")
+        if failed:
+            print(f"轉檔/上傳失敗：{', '.join(sorted(failed, key=int))}（重跑腳本會再次嘗試）")
+        remaining = len(to_generate) - sum(1 for r in results if r)
+        if stop_event.is_set() and remaining > 0:
+            print(f"因預算中止，剩餘 {remaining} 張未生成 → 以 --budget-twd 提高累計預算後重跑，可斷點續傳")
+        print("=" * 50)
+    finally:
+        telemetry.close()
+    if stop_event.is_set() and remaining > 0:
+        sys.exit(gen.BUDGET_EXIT_CODE)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate → WebP → upload → manifest in one streaming run")
+    parser.add_argument(
+        "--indices", nargs="+", type=int, metavar="IDX",
+        help="只處理指定 index，例如：--indices 240 411 582",
+    )
+    parser.add_argument(
+        "--storage-dir", metavar="DIR",
+        help="上傳到本機目錄而非 Firebase Storage（測試用）",
+    )
+    parser.add_argument(
+        "--budget-twd", type=float, default=gen.BUDGET_TWD,
+        help=f"累計預算上限（TWD，含 {gen.LEDGER_FILE} 已記錄的花費；預設 {gen.BUDGET_TWD}）",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.indices, args.storage_dir, args.budget_twd))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+image_request.py
+
+Gemini image requests with per-attempt deadlines, shared by
+generate_images_v2.py (and through it image_pipeline.py) and preview_images.py.
+
+Requests go through the SDK's async client (`client.aio`, an httpx transport),
+so cancelling one closes its connection. The blocking call in asyncio.to_thread
+used before could not be stopped: after asyncio.wait_for gave up, the thread
+kept running and could still return a paid image that nobody saved, and every
+retry added another thread.
+
+    slots = asyncio.Semaphore(4)                 # open requests, across all images
+    data = await request_image(client, MODEL_ID, prompt, slots, telemetry, key="42",
+                               cost_usd=0.067, retryable=lambda e: "503" in str(e))
+
+  - An attempt that passes its deadline (ATTEMPT_TIMEOUT) is not dropped: it
+    keeps running while the next attempt starts, and the first image to arrive
+    from any of them wins. A late image is saved like any other. Only after
+    LATE_TIMEOUT in total is an attempt cancelled.
+  - When an image arrives, or an attempt fails with a non-retryable error, every
+    other attempt of the same image is cancelled at once.
+  - Each attempt holds one of `slots` from before it is sent until it finishes or
+    is cancelled, late time included, so at most the semaphore's size of
+    requests are ever open; a retry waits for a slot instead of piling up.
+
+GEMINI_ATTEMPT_TIMEOUT / GEMINI_LATE_TIMEOUT (seconds) override the deadlines,
+e.g. to exercise them against the "late" responses of scripts/bench/fake_api.py.
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, Optional
+
+from telemetry import Telemetry, error_cause
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+ATTEMPT_TIMEOUT = float(os.environ.get("GEMINI_ATTEMPT_TIMEOUT", 60))  # then the next attempt starts
+LATE_TIMEOUT = float(os.environ.get("GEMINI_LATE_TIMEOUT", 180))       # then the attempt is cancelled
+MAX_ATTEMPTS = 3
+IMAGE_CONFIG = {
+    "response_modalities": ["TEXT", "IMAGE"],
+    "image_config": {"aspect_ratio": "1:1"},
+}
+
+
+def image_bytes(response: Any) -> Optional[bytes]:
+    return next((p.inline_data.data for p in (response.parts or []) if p.inline_data), None)
+
+
+async def _attempt(
+    client: Any,
+    model: str,
+    prompt: str,
+    slots: asyncio.Semaphore,
+    telemetry: Telemetry,
+    key: str,
+    cost_usd: float,
+    sent: asyncio.Future,
+    stop: Optional[asyncio.Event],
+) -> Optional[bytes]:
+    """One request; resolves `sent` with the send time once it holds a slot."""
+    async with slots:
+        if stop is not None and stop.is_set():
+            return None
+        sent.set_result(asyncio.get_running_loop().time())
+        with telemetry.request("image", model, key=key) as span:
+            try:
+                response = await asyncio.wait_for(
+                    client.aio.models.generate_content(model=model, contents=prompt, config=IMAGE_CONFIG),
+                    timeout=LATE_TIMEOUT,
+                )
+            except asyncio.CancelledError:
+                span.fail("cancelled")  # another attempt won, or the caller gave up
+                raise
+            meta = getattr(response, "usage_metadata", None)
+            if meta is not None:
+                span.usage(meta.prompt_token_count, meta.candidates_token_count)
+            data = image_bytes(response)
+            if data is None:
+                span.fail("empty")
+            else:
+                span.spend(cost_usd)
+                span.output(1)
+            return data
+
+
+async def request_image(
+    client: Any,
+    model: str,
+    prompt: str,
+    slots: asyncio.Semaphore,
+    telemetry: Telemetry,
+    *,
+    key: str,
+    cost_usd: float,
+    retryable: Callable[[BaseException], bool],
+    backoff: Callable[[int], float] = lambda n: 5 * n,
+    attempts: int = MAX_ATTEMPTS,
+    stop: Optional[asyncio.Event] = None,
+) -> Optional[bytes]:
+    """
+    The image bytes, or None when every attempt came back empty, timed out or
+    hit a retryable error (or `stop` was set before one was sent). The first
+    non-retryable error is raised. `backoff(n)` is the wait before attempt n + 1.
+    """
+    loop = asyncio.get_running_loop()
+    running: dict[asyncio.Task, int] = {}  # attempt task → attempt number
+    sent: dict[int, asyncio.Future] = {}
+    overdue: set[int] = set()
+    launched = 0
+    launch_at: Optional[float] = loop.time()
+
+    def retry_later(cause: str) -> None:
+        nonlocal launch_at
+        if launched < attempts and launch_at is None and not (stop is not None and stop.is_set()):
+            delay = backoff(launched)
+            telemetry.retry(cause, key, delay)
+            launch_at = loop.time() + delay
+
+    try:
+        while True:
+            if launch_at is not None and loop.time() >= launch_at:
+                launched += 1
+                sent[launched] = loop.create_future()
+                coro = _attempt(client, model, prompt, slots, telemetry, key, cost_usd, sent[launched], stop)
+                running[asyncio.ensure_future(coro)] = launched
+                launch_at = None
+            if not running and launch_at is None:
+                return None
+
+            # Sleep until an attempt finishes, gets its slot, or reaches its deadline, or the next launch
+            waiting = {sent[n] for n in running.values() if not sent[n].done()}
+            wakeups = [launch_at] if launch_at is not None else []
+            wakeups += [sent[n].result() + ATTEMPT_TIMEOUT for n in running.values()
+                        if sent[n].done() and n not in overdue]
+            timeout = max(min(wakeups) - loop.time(), 0) if wakeups else None
+            if running:
+                done, _ = await asyncio.wait({*running, *waiting}, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+            else:
+                done = set()
+                await asyncio.sleep(timeout or 0)
+
+            for task in done & running.keys():
+                n = running.pop(task)
+                exc = task.exception()
+                if exc is None and task.result() is not None:
+                    return task.result()
+                if exc is not None and error_cause(exc) != "timeout" and not retryable(exc):
+                    raise exc
+                if n == launched:  # a failed overdue attempt was already replaced
+                    retry_later("empty" if exc is None else error_cause(exc))
+
+            now = loop.time()
+            for n in running.values():
+                if n not in overdue and sent[n].done() and now >= sent[n].result() + ATTEMPT_TIMEOUT:
+                    overdue.add(n)  # keeps running: a late image still counts
+                    if n == launched:
+                        retry_later("timeout")
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
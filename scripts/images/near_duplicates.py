@@ -0,0 +1,193 @@
+"""
+near_duplicates.py
+
+Cross-bank near-duplicate index: finds, for each question of one bank, the most
+similar question of the banks that already have paid-for results (study aids,
+images), so those results can be reused instead of calling the API again.
+
+Each question becomes the set of character 3-grams of its NFKC-normalised text
+with punctuation and whitespace removed (question + its options, options in
+sorted order so re-lettering does not matter). Sets are summarised by a 128-value
+MinHash signature and bucketed by LSH (32 bands × 4 rows, ≈ 0.42 Jaccard at the
+50 % detection point); candidates from shared buckets are then scored by their
+exact Jaccard similarity, so the score is never an estimate.
+
+A match also carries an option map (target letter → source letter, by normalised
+option text) and `answer_consistent`: the target's correct option maps onto the
+source's correct option. Only consistent matches are reused: a high-similarity
+pair can still differ in one decisive word (視距外 / 視距內), and the answer check
+is what catches it — for study aids and images alike.
+
+Used by generate_study_aids.py (--bank) and generate_image_manifest.py (--bank).
+
+Usage:
+    uv run scripts/images/near_duplicates.py                    # reuse coverage for every bank
+    uv run scripts/images/near_duplicates.py --threshold 0.9 --show 5
+"""
+
+import argparse
+import random
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from question_bank import BANKS, Question, QuestionBank
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+SHINGLE = 3
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.8    # exact Jaccard of 3-gram sets
+SEED = 20240601
+_PUNCT = re.compile(r"[\s\W_]+", re.UNICODE)
+
+_rng = random.Random(SEED)
+_MASKS = [_rng.getrandbits(32) for _ in range(NUM_PERM)]  # one XOR mask per hash function
+
+
+# ---------------------------------------------------------------------------
+# Shingles / MinHash
+# ---------------------------------------------------------------------------
+
+def normalize(text: str) -> str:
+    """NFKC (full-width → half-width), lower-case, punctuation and whitespace removed."""
+    return _PUNCT.sub("", unicodedata.normalize("NFKC", text)).lower()
+
+
+def shingles(q: Question) -> frozenset[str]:
+    text = normalize(q.question) + "|" + "|".join(sorted(normalize(t) for t in q.options.values()))
+    if len(text) < SHINGLE:
+        return frozenset([text])
+    return frozenset(text[i : i + SHINGLE] for i in range(len(text) - SHINGLE + 1))
+
+
+def signature(grams: Iterable[str]) -> tuple[int, ...]:
+    """MinHash: per mask, the minimum of CRC32(gram) XOR mask (≈4× cheaper than (a·h+b) mod p)."""
+    hashes = [zlib.crc32(g.encode("utf-8")) for g in grams]
+    return tuple(min([h ^ mask for h in hashes]) for mask in _MASKS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def option_map(target: Question, source: Question) -> dict[str, Optional[str]]:
+    """Target letter → source letter with the same normalised option text (None if absent)."""
+    by_text = {normalize(text): letter for letter, text in source.options.items()}
+    return {letter: by_text.get(normalize(text)) for letter, text in target.options.items()}
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class NearDuplicateIndex:
+    """LSH over MinHash signatures of the questions added to it."""
+
+    def __init__(self) -> None:
+        self.buckets: list[dict[tuple[int, ...], list[Question]]] = [defaultdict(list) for _ in range(BANDS)]
+        self.grams: dict[tuple[str, int], frozenset[str]] = {}
+
+    def add(self, q: Question) -> None:
+        grams = shingles(q)
+        self.grams[(q.bank, q.index)] = grams
+        sig = signature(grams)
+        for band, bucket in enumerate(self.buckets):
+            bucket[sig[band * ROWS : (band + 1) * ROWS]].append(q)
+
+    def add_bank(self, bank: QuestionBank, keep: Optional[set[int]] = None) -> None:
+        for q in bank:
+            if keep is None or q.index in keep:
+                self.add(q)
+
+    def candidates(self, q: Question) -> tuple[frozenset[str], list[Question]]:
+        grams = shingles(q)
+        sig = signature(grams)
+        seen: dict[tuple[str, int], Question] = {}
+        for band, bucket in enumerate(self.buckets):
+            for other in bucket.get(sig[band * ROWS : (band + 1) * ROWS], ()):
+                seen.setdefault((other.bank, other.index), other)
+        return grams, list(seen.values())
+
+    def best_match(self, q: Question, threshold: float = DEFAULT_THRESHOLD) -> Optional[dict]:
+        """Closest indexed question at or above threshold; answer-consistent matches win ties."""
+        grams, found = self.candidates(q)
+        best = None
+        for other in found:
+            if (other.bank, other.index) == (q.bank, q.index):
+                continue
+            score = jaccard(grams, self.grams[(other.bank, other.index)])
+            if score < threshold:
+                continue
+            letters = option_map(q, other)
+            match = {
+                "bank": other.bank,
+                "index": other.index,
+                "similarity": round(score, 4),
+                "answer_consistent": letters.get(q.answer) == other.answer,
+                "option_map": letters,
+            }
+            rank = (match["answer_consistent"], score)
+            if best is None or rank > (best["answer_consistent"], best["similarity"]):
+                best = match
+        return best
+
+
+def find_matches(
+    target: QuestionBank, sources: list[QuestionBank], threshold: float = DEFAULT_THRESHOLD,
+    keep: Optional[dict[str, set[int]]] = None,
+) -> dict[int, dict]:
+    """Target index → best match among the source banks (only indices in keep[bank], if given)."""
+    index = NearDuplicateIndex()
+    for source in sources:
+        if source.exists():
+            index.add_bank(source, None if keep is None else keep.get(source.bank, set()))
+    matches = {}
+    for q in target:
+        match = index.best_match(q, threshold)
+        if match is not None:
+            matches[q.index] = match
+    return matches
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cross-bank near-duplicate coverage report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Jaccard 相似度下限（預設 {DEFAULT_THRESHOLD}）")
+    parser.add_argument("--show", type=int, default=0, help="每個題庫列出幾個最接近門檻的配對，供檢查")
+    args = parser.parse_args()
+
+    banks = [b for b in map(QuestionBank.load, BANKS) if b.exists()]
+    aided = {b.bank: {int(k) for k, v in b.study_aids.items() if v} for b in banks}
+    imaged = {b.bank: {int(k) for k in b.images} for b in banks}
+    print(f"{'bank':<14} {'questions':>9} {'matched':>8} {'consistent':>10} {'aids':>6} {'images':>7} {'new':>5}")
+    for bank in banks:
+        matches = find_matches(bank, [b for b in banks if b is not bank], args.threshold)
+        consistent = [m for m in matches.values() if m["answer_consistent"]]
+        aids = sum(1 for m in consistent if m["index"] in aided[m["bank"]])
+        images = sum(1 for m in consistent if m["index"] in imaged[m["bank"]])
+        new = len(bank) - len(consistent)
+        print(
+            f"{bank.bank:<14} {len(bank):>9} {len(matches):>8} {len(consistent):>10} "
+            f"{aids:>6} {images:>7} {new:>5}"
+        )
+        for idx, m in sorted(matches.items(), key=lambda kv: kv[1]["similarity"])[: args.show]:
+            other = QuestionBank.load(m["bank"])[m["index"]]
+            print(
+                f"    {m['similarity']:.3f} {'✓' if m['answer_consistent'] else '✗'} {m['bank']}[{m['index']}]  "
+                f"{bank[idx].question[:36]}  ⇄  {other.question[:36]}"
+            )
+    print("\naids / images：可直接沿用其他題庫既有結果的題數；new：與任何題庫都不一致、需另外呼叫 API 的題數")
+
+
+if __name__ == "__main__":
+    main()
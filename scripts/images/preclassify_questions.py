@@ -0,0 +1,270 @@
+"""
+preclassify_questions.py
+
+Offline Tier-3 pre-classifier for the image-analysis step.
+
+Trains a small logistic-regression model (chapter + character bigrams of
+question and options) on the Gemini labels already stored in
+public/data/professional_image_analysis.json. Questions it is confident are
+Tier 3 (no image needed) can be labelled locally, so analyze_questions_gemini.py
+only spends API calls on the uncertain ones.
+
+The k models of a k-fold cross-validation are kept and shipped as an ensemble
+(mean probability). The decision threshold is the lowest one at which their
+held-out Tier-3 precision reaches TARGET_PRECISION. The reported precision and
+recall come from repeating that whole procedure inside an outer
+cross-validation, so they describe the classifier that is actually used, not
+the folds its threshold was tuned on. When that estimate misses the target,
+analyze_questions_gemini.py --preclassify sends every question to Gemini, and
+this report exits 1.
+
+Usage:
+    uv run scripts/images/preclassify_questions.py                 # CV report
+    uv run scripts/images/preclassify_questions.py --bank general  # + coverage on another bank
+
+Used by:
+    uv run scripts/images/analyze_questions_gemini.py --preclassify [--bank general]
+"""
+
+import argparse
+import math
+import random
+import re
+import sys
+
+from question_bank import Question, QuestionBank
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+TRAIN_BANK = "professional"   # questions + Gemini labels (professional_image_analysis.json)
+NUM_FOLDS = 5
+TARGET_PRECISION = 0.85   # held-out Tier-3 precision required before skipping the API
+EPOCHS = 30
+LEARNING_RATE = 0.1
+L2 = 1e-3
+SEED = 0
+HEURISTIC_SOURCE = "heuristic"
+
+_PUNCT = re.compile(r"[\s，。、；：？！「」『』（）()\[\]{}.,;:?!\"'%％/－\-]+")
+
+
+# ---------------------------------------------------------------------------
+# Features
+# ---------------------------------------------------------------------------
+
+def tokenize(q: Question) -> set[str]:
+    """Chapter token plus character bigrams of the question and all options."""
+    tokens = {f"章:{q.chapter}"}
+    texts = [q.question, *q.options.values()]
+    for text in texts:
+        clean = _PUNCT.sub("", text)
+        tokens.update(clean[i : i + 2] for i in range(len(clean) - 1))
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+
+class Tier3Classifier:
+    """Logistic regression over binary token features, trained with seeded SGD."""
+
+    def __init__(self) -> None:
+        self.weights: dict[str, float] = {}
+        self.bias = 0.0
+
+    def _score(self, tokens: set[str]) -> float:
+        z = self.bias + sum(self.weights.get(t, 0.0) for t in tokens)
+        return max(min(z, 30.0), -30.0)
+
+    def fit(self, docs: list[set[str]], labels: list[bool]) -> "Tier3Classifier":
+        order = list(range(len(docs)))
+        rng = random.Random(SEED)
+        for _ in range(EPOCHS):
+            rng.shuffle(order)
+            for i in order:
+                grad = self.prob_tier3(docs[i]) - float(labels[i])
+                self.bias -= LEARNING_RATE * grad
+                for tok in docs[i]:
+                    w = self.weights.get(tok, 0.0) * (1 - LEARNING_RATE * L2)
+                    self.weights[tok] = w - LEARNING_RATE * grad
+        return self
+
+    def prob_tier3(self, tokens: set[str]) -> float:
+        return 1.0 / (1.0 + math.exp(-self._score(tokens)))
+
+
+class Tier3Ensemble:
+    """The fold models of one cross-validation; P(tier 3) is their mean."""
+
+    def __init__(self, models: list[Tier3Classifier]) -> None:
+        self.models = models
+
+    def prob_tier3(self, tokens: set[str]) -> float:
+        return sum(m.prob_tier3(tokens) for m in self.models) / len(self.models)
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def cross_val_probs(
+    docs: list[set[str]], labels: list[bool], folds: int = NUM_FOLDS
+) -> tuple[list[float], Tier3Ensemble]:
+    """Out-of-fold P(tier 3) for every document (deterministic round-robin folds) and the fold models."""
+    probs = [0.0] * len(docs)
+    models = []
+    for fold in range(folds):
+        train = [i for i in range(len(docs)) if i % folds != fold]
+        clf = Tier3Classifier().fit([docs[i] for i in train], [labels[i] for i in train])
+        for i in range(fold, len(docs), folds):
+            probs[i] = clf.prob_tier3(docs[i])
+        models.append(clf)
+    return probs, Tier3Ensemble(models)
+
+
+def precision_recall(probs: list[float], labels: list[bool], threshold: float) -> tuple[float, float, int]:
+    return _precision_recall([p >= threshold for p in probs], labels)
+
+
+def _precision_recall(predicted: list[bool], labels: list[bool]) -> tuple[float, float, int]:
+    tp = sum(1 for pr, y in zip(predicted, labels) if pr and y)
+    n_pred = sum(predicted)
+    n_pos = sum(labels)
+    precision = tp / n_pred if n_pred else 1.0
+    recall = tp / n_pos if n_pos else 0.0
+    return precision, recall, n_pred
+
+
+def choose_threshold(probs: list[float], labels: list[bool], target: float = TARGET_PRECISION) -> float:
+    """Lowest threshold whose held-out precision is >= target (maximises recall)."""
+    for t in sorted(set(probs)):
+        precision, _, n_pred = precision_recall(probs, labels, t)
+        if n_pred and precision >= target:
+            return t
+    return 1.01  # never confident enough: classify nothing locally
+
+
+def train(
+    docs: list[set[str]], labels: list[bool], target: float = TARGET_PRECISION
+) -> tuple[Tier3Ensemble, float]:
+    """The shipped classifier: fold-model ensemble plus the threshold chosen on its out-of-fold probabilities."""
+    probs, ensemble = cross_val_probs(docs, labels)
+    return ensemble, choose_threshold(probs, labels, target)
+
+
+def nested_precision_recall(
+    docs: list[set[str]], labels: list[bool], target: float = TARGET_PRECISION, folds: int = NUM_FOLDS
+) -> tuple[float, float, int]:
+    """Held-out precision / recall / skipped of train(): each outer fold is scored by a train() that never saw it."""
+    predicted = [False] * len(docs)
+    for fold in range(folds):
+        rest = [i for i in range(len(docs)) if i % folds != fold]
+        ensemble, threshold = train([docs[i] for i in rest], [labels[i] for i in rest], target)
+        for i in range(fold, len(docs), folds):
+            predicted[i] = ensemble.prob_tier3(docs[i]) >= threshold
+    return _precision_recall(predicted, labels)
+
+
+# ---------------------------------------------------------------------------
+# Public helpers (used by analyze_questions_gemini.py)
+# ---------------------------------------------------------------------------
+
+def load_training_set() -> tuple[list[set[str]], list[bool]]:
+    bank = QuestionBank.load(TRAIN_BANK)
+    docs: list[set[str]] = []
+    labels: list[bool] = []
+    for key, res in sorted(bank.image_analysis.items(), key=lambda kv: int(kv[0])):
+        # Only learn from Gemini labels, never from our own earlier guesses
+        q = bank.get(key)
+        if res.get("classifier") == HEURISTIC_SOURCE or q is None:
+            continue
+        docs.append(tokenize(q))
+        labels.append(str(res.get("tier")) == "3")
+    return docs, labels
+
+
+def build_classifier(target: float = TARGET_PRECISION) -> tuple[Tier3Ensemble, float, dict]:
+    """train() on all labels; the report is its nested cross-validation estimate."""
+    docs, labels = load_training_set()
+    ensemble, threshold = train(docs, labels, target)
+    precision, recall, n_pred = nested_precision_recall(docs, labels, target)
+    report = {
+        "samples": len(docs),
+        "tier3": sum(labels),
+        "threshold": threshold,
+        "precision": precision,
+        "recall": recall,
+        "skipped": n_pred,
+    }
+    return ensemble, threshold, report
+
+
+def heuristic_result(index: int, prob: float) -> dict:
+    """Analysis entry for a locally classified Tier-3 question."""
+    return {
+        "index": index,
+        "tier": "3",
+        "reason": f"本地預分類判定為 Tier 3（信心 {prob:.3f}），未呼叫 Gemini。",
+        "visual_concept": "",
+        "image_prompt": "",
+        "classifier": HEURISTIC_SOURCE,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tier-3 pre-classifier report")
+    parser.add_argument("--bank", help="另外統計指定題庫可省下的 API 題數，例如 general")
+    parser.add_argument(
+        "--target-precision", type=float, default=TARGET_PRECISION,
+        help=f"Tier 3 交叉驗證 precision 下限（預設 {TARGET_PRECISION}）",
+    )
+    args = parser.parse_args()
+
+    docs, labels = load_training_set()
+    probs, ensemble = cross_val_probs(docs, labels)
+
+    print(f"訓練資料：{len(docs)} 題（Tier 3：{sum(labels)} 題），{NUM_FOLDS}-fold 交叉驗證（各 fold 模型的 held-out 結果）")
+    print(f"{'threshold':>10} {'precision':>10} {'recall':>8} {'skipped':>8}")
+    for t in (0.5, 0.7, 0.8, 0.9, 0.95):
+        precision, recall, n_pred = precision_recall(probs, labels, t)
+        print(f"{t:>10} {precision:>10.3f} {recall:>8.3f} {n_pred:>8}")
+
+    threshold = choose_threshold(probs, labels, args.target_precision)
+    precision, recall, n_pred = precision_recall(probs, labels, threshold)
+    print(
+        f"\n選用 threshold {threshold:.4f}（目標 precision ≥ {args.target_precision}）："
+        f"precision {precision:.3f}, recall {recall:.3f}, 可略過 {n_pred}/{len(docs)} 題"
+    )
+    precision, recall, n_pred = nested_precision_recall(docs, labels, args.target_precision)
+    print(
+        f"實際使用的分類器（{NUM_FOLDS} 個 fold 模型平均 + 上述選門檻程序，巢狀交叉驗證）："
+        f"precision {precision:.3f}, recall {recall:.3f}, 可略過 {n_pred}/{len(docs)} 題"
+    )
+    below_target = precision < args.target_precision
+    if below_target:
+        print(
+            f"[WARN] 巢狀交叉驗證 precision {precision:.3f} 未達目標 {args.target_precision}："
+            "analyze_questions_gemini.py --preclassify 會停用本地預分類",
+            file=sys.stderr,
+        )
+
+    if args.bank:
+        bank = QuestionBank.load(args.bank)
+        confident = sum(1 for q in bank if ensemble.prob_tier3(tokenize(q)) >= threshold)
+        print(
+            f"[{args.bank}] {len(bank)} 題中 {confident} 題可本地判定為 Tier 3，"
+            f"只需送 {len(bank) - confident} 題給 Gemini"
+        )
+    if below_target:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
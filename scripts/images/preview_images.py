@@ -5,13 +5,16 @@ import sys
 import time
 from pathlib import Path
 from google import genai
-from google.genai import types
 from dotenv import load_dotenv
 
+from image_request import MAX_ATTEMPTS, request_image
+from telemetry import Telemetry
+
 load_dotenv()
 
 # 使用你指定的穩定版本
 MODEL_ID = "gemini-3.1-flash-image-preview"
+COST_PER_IMAGE_USD = 0.067  # 與 generate_images_v2.py 相同的每張估計費用
 
 # 視覺風格配置
 STYLE_CONFIG = {
@@ -21,7 +24,7 @@ STYLE_CONFIG = {
 PREVIEW_DIR = Path("preview")
 PREVIEW_DIR.mkdir(exist_ok=True)
 
-async def run_single(idx, client, analysis):
+async def run_single(idx, client, analysis, telemetry: Telemetry, slots: asyncio.Semaphore):
     task = analysis.get(str(idx))
     if not task:
         print(f"❌ Error: Index {idx} not found in analysis data.")
@@ -33,71 +36,48 @@ async def run_single(idx, client, analysis):
     print(f"📝 Prompt: {task['image_prompt'][:100]}...")
     
     start_time = time.time()
-    max_retries = 3
-    
-    for attempt in range(max_retries):
-        try:
-            # Gemini-based Image Generation 呼叫方式
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    client.models.generate_content,
-                    model=MODEL_ID,
-                    contents=prompt,
-                    config={
-                        "response_modalities": ["TEXT", "IMAGE"],
-                        "image_config": {
-                            "aspect_ratio": "1:1"
-                        },
-                    }
-                ),
-                timeout=60
-            )
+    try:
+        image_data = await request_image(
+            client, MODEL_ID, prompt, slots, telemetry,
+            key=str(idx), cost_usd=COST_PER_IMAGE_USD,
+            retryable=lambda e: "500" in str(e) or "INTERNAL" in str(e),
+            backoff=lambda n: 3 * n,
+        )
+    except Exception as e:
+        print(f"❌ [API ERROR] Index {idx}: {e}")
+        return False
+
+    if image_data is None:
+        print(f"💀 [FINAL FAIL] Index {idx} after {MAX_ATTEMPTS} attempts.")
+        return False
 
-            if response.parts:
-                for part in response.parts:
-                    if part.inline_data:
-                        save_path = PREVIEW_DIR / f"{idx}.png"
-                        with open(save_path, "wb") as f:
-                            f.write(part.inline_data.data)
-                        
-                        duration = time.time() - start_time
-                        print(f"✅ [SUCCESS] Index {idx} saved! (Time: {duration:.1f}s)")
-                        return True
-            
-            print(f"⚠️ [RETRY] Index {idx}: No image in response, attempt {attempt + 1}/{max_retries}")
-            
-        except asyncio.TimeoutError:
-            wait = (attempt + 1) * 3
-            print(f"⏱️ [TIMEOUT] Index {idx}: No response within 60s. Waiting {wait}s...")
-            await asyncio.sleep(wait)
-            continue
-        except Exception as e:
-            error_msg = str(e)
-            if "500" in error_msg or "INTERNAL" in error_msg:
-                wait = (attempt + 1) * 3
-                print(f"🔥 [SERVER ERROR] {error_msg[:60]}... Waiting {wait}s...")
-                await asyncio.sleep(wait)
-                continue
-            else:
-                print(f"❌ [API ERROR] Index {idx}: {e}")
-                break
-                
-    print(f"💀 [FINAL FAIL] Index {idx} after {max_retries} attempts.")
-    return False
+    save_path = PREVIEW_DIR / f"{idx}.png"
+    with open(save_path, "wb") as f:
+        f.write(image_data)
+    duration = time.time() - start_time
+    print(f"✅ [SUCCESS] Index {idx} saved! (Time: {duration:.1f}s)")
+    return True
 
 async def main():
     api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
+    base_url = os.environ.get("GEMINI_BASE_URL")  # 可指向 scripts/bench/fake_api.py 做離線測試
+    client = genai.Client(api_key=api_key, http_options={"base_url": base_url} if base_url else None)
     
     with open("public/data/professional_image_analysis.json", "r", encoding="utf-8") as f:
         analysis = json.load(f)
 
     target_indices = sys.argv[1:] if len(sys.argv) > 1 else ["50", "125", "137"]
     
-    for idx in target_indices:
-        await run_single(idx, client, analysis)
-        # 一張一張慢慢來，中間喘息一下
-        await asyncio.sleep(2)
+    telemetry = Telemetry("preview_images", output_unit="images")
+    try:
+        # 一次預覽一張；逾時的請求仍可與重試並存，最多同時 2 個
+        slots = asyncio.Semaphore(2)
+        for idx in target_indices:
+            await run_single(idx, client, analysis, telemetry, slots)
+            # 一張一張慢慢來，中間喘息一下
+            await asyncio.sleep(2)
+    finally:
+        telemetry.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,186 @@
+"""
+question_bank.py
+
+Shared, read-only access to the question banks (public/data/<bank>.json) and
+the files keyed by question index next to them. Standard library only.
+
+    bank = QuestionBank.load("professional")     # cached per bank id; nothing is read yet
+    q = bank[42]                                 # first access parses the JSON
+    q.question, q.options, q.answer, q.chapter, q.correct_text, q.key
+    bank.by_chapter["第一章 民用航空法及相關法規"]
+    bank.by_option_text["以上皆是。"]             # [(question, letter), ...]
+    bank.study_aid(q), bank.analysis(q), bank.image(q)
+
+Questions are `__slots__` records (no per-question __dict__; chapter strings
+are interned), and each index / join file is built or read once on first use,
+so tools that touch several banks pay only for what they look at.
+
+Keys:
+  - `index`  array position — the key used by <bank>_study_aids.json,
+             <bank>_image_analysis.json and <bank>_images.json. The PDF `id`
+             restarts per chapter, so it is NOT unique.
+  - `key`    content hash of question + options, stable across re-ordering
+             or re-numbering when the CAA republishes a bank.
+"""
+
+import hashlib
+import json
+import sys
+from collections import defaultdict
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+DATA_DIR = Path("public/data")
+BANKS = ("general", "professional", "renewal", "renewal_basic")
+KEY_LENGTH = 12  # hex chars of the content hash
+
+
+class Question:
+    __slots__ = ("index", "id", "question", "options", "answer", "chapter", "can_memorize_directly", "bank")
+
+    def __init__(self, index: int, raw: dict, bank: str) -> None:
+        self.index = index
+        self.id = raw.get("id")
+        self.question: str = raw.get("question", "")
+        self.options: dict[str, str] = raw.get("options", {})
+        self.answer: str = raw.get("answer", "")
+        self.chapter: str = sys.intern(raw.get("chapter", ""))
+        self.can_memorize_directly: bool = raw.get("can_memorize_directly", False)
+        self.bank = bank
+
+    @property
+    def correct_text(self) -> str:
+        return self.options.get(self.answer, "").strip()
+
+    @property
+    def key(self) -> str:
+        payload = json.dumps([self.question, self.options], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:KEY_LENGTH]
+
+    def to_dict(self) -> dict[str, Any]:
+        """The record as it appears in <bank>.json."""
+        return {
+            "id": self.id, "question": self.question, "options": self.options,
+            "answer": self.answer, "chapter": self.chapter,
+            "can_memorize_directly": self.can_memorize_directly,
+        }
+
+    def __repr__(self) -> str:
+        return f"<Question {self.bank}[{self.index}] {self.question[:20]!r}>"
+
+
+class QuestionBank:
+    _cache: dict[tuple[str, Path], "QuestionBank"] = {}
+
+    def __init__(self, bank: str = "professional", data_dir: Path = DATA_DIR) -> None:
+        self.bank = bank
+        self.data_dir = Path(data_dir)
+        self.path = self.data_dir / f"{bank}.json"
+
+    @classmethod
+    def load(cls, bank: str = "professional", data_dir: Path = DATA_DIR) -> "QuestionBank":
+        """Shared instance per (bank, data_dir); still lazy until first use."""
+        key = (bank, Path(data_dir))
+        if key not in cls._cache:
+            cls._cache[key] = cls(bank, data_dir)
+        return cls._cache[key]
+
+    # -- records -----------------------------------------------------------
+
+    @cached_property
+    def questions(self) -> list[Question]:
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if isinstance(data, list):  # legacy question_bank.json layout: a bare list
+            data = {"questions": data}
+        self._whitelist = data.get("answer_option_whitelist", [])
+        # The raw dicts are dropped here; only the slotted records (sharing the option dicts) stay
+        return [Question(i, raw, self.bank) for i, raw in enumerate(data["questions"])]
+
+    @property
+    def whitelist(self) -> list[str]:
+        self.questions  # parsed together with the questions on first use
+        return self._whitelist
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def __iter__(self) -> Iterator[Question]:
+        return iter(self.questions)
+
+    def __getitem__(self, index: int) -> Question:
+        return self.questions[index]
+
+    def get(self, index: int | str) -> Optional[Question]:
+        """Question at an index given as int or as the string key used by the join files."""
+        i = int(index)
+        return self.questions[i] if 0 <= i < len(self.questions) else None
+
+    # -- indexes -----------------------------------------------------------
+
+    @cached_property
+    def by_chapter(self) -> dict[str, list[Question]]:
+        index: dict[str, list[Question]] = defaultdict(list)
+        for q in self.questions:
+            index[q.chapter].append(q)
+        return dict(index)
+
+    @cached_property
+    def by_key(self) -> dict[str, Question]:
+        return {q.key: q for q in self.questions}
+
+    @cached_property
+    def by_option_text(self) -> dict[str, list[tuple[Question, str]]]:
+        """Stripped option text → every (question, letter) it appears as."""
+        index: dict[str, list[tuple[Question, str]]] = defaultdict(list)
+        for q in self.questions:
+            for letter, text in q.options.items():
+                index[text.strip()].append((q, letter))
+        return dict(index)
+
+    @cached_property
+    def by_answer(self) -> dict[str, list[Question]]:
+        """Answer letter → questions."""
+        index: dict[str, list[Question]] = defaultdict(list)
+        for q in self.questions:
+            index[q.answer].append(q)
+        return dict(index)
+
+    @property
+    def chapters(self) -> list[str]:
+        return list(self.by_chapter)
+
+    # -- joins ---------------------------------------------------------------
+
+    def _join_file(self, suffix: str) -> dict[str, Any]:
+        path = self.data_dir / f"{self.bank}_{suffix}.json"
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+    @cached_property
+    def study_aids(self) -> dict[str, Any]:
+        return self._join_file("study_aids")
+
+    @cached_property
+    def image_analysis(self) -> dict[str, Any]:
+        return self._join_file("image_analysis")
+
+    @cached_property
+    def images(self) -> dict[str, Any]:
+        return self._join_file("images")
+
+    def study_aid(self, q: Question) -> Optional[dict]:
+        return self.study_aids.get(str(q.index))
+
+    def analysis(self, q: Question) -> Optional[dict]:
+        return self.image_analysis.get(str(q.index))
+
+    def image(self, q: Question) -> Optional[Any]:
+        """Manifest entry (dict, or a plain URL string for legacy entries)."""
+        return self.images.get(str(q.index))
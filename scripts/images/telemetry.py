@@ -0,0 +1,280 @@
+"""
+telemetry.py
+
+Shared instrumentation for the AI generation scripts (generate_study_aids.py,
+analyze_questions_gemini.py, generate_images_v2.py, image_pipeline.py,
+preview_images.py). Standard library only.
+
+Per request it records latency, time-to-first-byte (where the transport
+exposes response headers separately — the Anthropic streaming-response API;
+Gemini calls are buffered, so only total latency is known), outcome, failure
+cause, tokens in/out and estimated spend. Each run emits:
+
+    telemetry/events.jsonl    — one JSON line per request / retry (all scripts, appended)
+    telemetry/<script>.prom   — Prometheus textfile-collector snapshot of the last run
+    stdout                    — end-of-run summary table
+
+Usage:
+    tel = Telemetry("study_aids")
+    with tel.request("messages", MODEL) as span:
+        ...                       # the API call
+        span.first_byte()         # optional: headers received
+        span.usage(tokens_in, tokens_out)
+        span.output(1)            # images / answers produced
+    tel.retry("rate_limit")       # before sleeping and trying again
+    tel.close()                   # writes the .prom file and prints the summary
+"""
+
+import json
+import math
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+TELEMETRY_DIR = Path("telemetry")
+EVENTS_FILE = TELEMETRY_DIR / "events.jsonl"
+METRIC_PREFIX = "uavquiz"
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)  # seconds
+PRICING_USD_PER_MTOK = {     # (input, output) list prices per million tokens — estimates
+    "claude-haiku-4-5-20251001": (1.0, 5.0),
+    "gemini-3-flash-preview": (0.5, 3.0),
+}
+
+
+def error_cause(exc: BaseException) -> str:
+    """Bucket an SDK exception without importing the SDKs."""
+    if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    if isinstance(exc, json.JSONDecodeError):
+        return "bad_json"
+    text = f"{type(exc).__name__} {exc}"
+    if "429" in text or "RateLimit" in text or "RESOURCE_EXHAUSTED" in text:
+        return "rate_limit"
+    if any(code in text for code in ("500", "502", "503", "529", "INTERNAL", "Overloaded", "UNAVAILABLE")):
+        return "server"
+    if "Connection" in text:
+        return "connection"
+    return "other"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.values: list[float] = []
+
+    def observe(self, value: float) -> None:
+        self.values.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.values:
+            return math.nan
+        ordered = sorted(self.values)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Span:
+    """One API request; filled in by the caller inside `Telemetry.request()`."""
+
+    def __init__(self, op: str, model: str, attempt: int) -> None:
+        self.op = op
+        self.model = model
+        self.attempt = attempt
+        self.start = time.perf_counter()
+        self.ttfb: Optional[float] = None
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.outputs = 0
+        self.usd = 0.0
+        self.cause: Optional[str] = None
+
+    def first_byte(self) -> None:
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.start
+
+    def usage(self, tokens_in: Optional[int], tokens_out: Optional[int]) -> None:
+        self.tokens_in += tokens_in or 0
+        self.tokens_out += tokens_out or 0
+        price_in, price_out = PRICING_USD_PER_MTOK.get(self.model, (0.0, 0.0))
+        self.usd += ((tokens_in or 0) * price_in + (tokens_out or 0) * price_out) / 1e6
+
+    def output(self, n: int = 1) -> None:
+        self.outputs += n
+
+    def spend(self, usd: float) -> None:
+        """Flat per-call price (image generation), on top of any token cost."""
+        self.usd += usd
+
+    def fail(self, cause: str) -> None:
+        """Mark a response as unusable without raising (e.g. empty image)."""
+        self.cause = cause
+
+
+class Telemetry:
+    def __init__(self, script: str, output_unit: str = "items") -> None:
+        self.script = script
+        self.output_unit = output_unit
+        self.run_id = f"{script}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.ttfb: dict[str, Histogram] = defaultdict(Histogram)
+        self.requests: Counter = Counter()    # (op, outcome)
+        self.failures: Counter = Counter()    # cause
+        self.retries: Counter = Counter()     # cause
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.outputs = 0
+        self.usd = 0.0
+        self._attempts: Counter = Counter()
+        TELEMETRY_DIR.mkdir(exist_ok=True)
+        self._events = EVENTS_FILE.open("a", encoding="utf-8")
+
+    # -- recording ---------------------------------------------------------
+
+    def _emit(self, event: dict) -> None:
+        event = {"ts": round(time.time(), 3), "run": self.run_id, "script": self.script, **event}
+        self._events.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._events.flush()
+
+    @contextmanager
+    def request(self, op: str, model: str = "", key: str = "") -> Iterator[Span]:
+        """Time one API call; an exception escaping the block is recorded with its cause."""
+        self._attempts[(op, key)] += 1
+        span = Span(op, model, self._attempts[(op, key)] if key else 1)
+        try:
+            yield span
+        except BaseException as exc:
+            span.cause = span.cause or error_cause(exc)
+            raise
+        finally:
+            self._finish(span, key)
+
+    def _finish(self, span: Span, key: str) -> None:
+        latency = time.perf_counter() - span.start
+        outcome = "ok" if span.cause is None else "error"
+        self.latency[span.op].observe(latency)
+        if span.ttfb is not None:
+            self.ttfb[span.op].observe(span.ttfb)
+        self.requests[(span.op, outcome)] += 1
+        if span.cause:
+            self.failures[span.cause] += 1
+        self.tokens_in += span.tokens_in
+        self.tokens_out += span.tokens_out
+        self.outputs += span.outputs
+        self.usd += span.usd
+        self._emit({
+            "event": "request", "op": span.op, "model": span.model, "key": key,
+            "attempt": span.attempt, "outcome": outcome, "cause": span.cause,
+            "latency_s": round(latency, 4),
+            "ttfb_s": None if span.ttfb is None else round(span.ttfb, 4),
+            "tokens_in": span.tokens_in, "tokens_out": span.tokens_out,
+            "outputs": span.outputs, "usd": round(span.usd, 6),
+        })
+
+    def retry(self, cause: str, key: str = "", delay: float = 0.0) -> None:
+        self.retries[cause] += 1
+        self._emit({"event": "retry", "cause": cause, "key": key, "delay_s": delay})
+
+    # -- reporting ---------------------------------------------------------
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def outputs_per_minute(self) -> float:
+        return self.outputs / (self.elapsed / 60) if self.elapsed > 0 else 0.0
+
+    def prometheus(self) -> str:
+        p = METRIC_PREFIX
+        s = f'script="{self.script}"'
+        lines = []
+
+        def histogram(name: str, help_text: str, hists: dict[str, Histogram]) -> None:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} histogram")
+            for op, h in sorted(hists.items()):
+                labels = f'{s},op="{op}"'
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f'{p}_{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{p}_{name}_bucket{{{labels},le="+Inf"}} {len(h.values)}')
+                lines.append(f"{p}_{name}_sum{{{labels}}} {sum(h.values):.6f}")
+                lines.append(f"{p}_{name}_count{{{labels}}} {len(h.values)}")
+
+        def counter(name: str, help_text: str, samples: list[tuple[str, float]], kind: str = "counter") -> None:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{p}_{name}{{{s}{labels}}} {value:g}")
+
+        histogram("request_duration_seconds", "API request latency.", self.latency)
+        histogram("ttfb_seconds", "Time to first response byte.", self.ttfb)
+        counter("requests_total", "API requests by outcome.", [
+            (f',op="{op}",outcome="{outcome}"', n) for (op, outcome), n in sorted(self.requests.items())
+        ])
+        counter("failures_total", "Failed requests by cause.", [
+            (f',cause="{cause}"', n) for cause, n in sorted(self.failures.items())
+        ])
+        counter("retries_total", "Retries by cause.", [
+            (f',cause="{cause}"', n) for cause, n in sorted(self.retries.items())
+        ])
+        counter("tokens_total", "Tokens by direction.", [
+            (',direction="in"', self.tokens_in), (',direction="out"', self.tokens_out),
+        ])
+        counter("outputs_total", "Results produced.", [(f',unit="{self.output_unit}"', self.outputs)])
+        counter("outputs_per_minute", "Results per minute over the run.", [
+            (f',unit="{self.output_unit}"', round(self.outputs_per_minute(), 3)),
+        ], kind="gauge")
+        counter("spend_usd_total", "Estimated spend in USD.", [("", round(self.usd, 6))])
+        counter("run_duration_seconds", "Wall time of the run.", [("", round(self.elapsed, 3))], kind="gauge")
+        counter("last_run_timestamp_seconds", "Start time of the run.", [("", int(self.started_wall))], kind="gauge")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        total = sum(self.requests.values())
+        ok = sum(n for (_, outcome), n in self.requests.items() if outcome == "ok")
+        lines = [f"── telemetry: {self.script} ({self.run_id}) ──"]
+        lines.append(
+            f"requests {total} (ok {ok}, failed {total - ok})  wall {self.elapsed:.1f}s  "
+            f"{self.outputs} {self.output_unit} ({self.outputs_per_minute():.1f}/min)"
+        )
+        for op, h in sorted(self.latency.items()):
+            line = (
+                f"  {op:<12} latency p50 {h.quantile(0.5):.2f}s  p90 {h.quantile(0.9):.2f}s  "
+                f"p99 {h.quantile(0.99):.2f}s  max {max(h.values):.2f}s"
+            )
+            if self.ttfb.get(op):
+                line += f"  | ttfb p50 {self.ttfb[op].quantile(0.5):.2f}s"
+            lines.append(line)
+        if self.failures:
+            lines.append("  failures: " + ", ".join(f"{c} {n}" for c, n in self.failures.most_common()))
+        if self.retries:
+            lines.append("  retries:  " + ", ".join(f"{c} {n}" for c, n in self.retries.most_common()))
+        if self.tokens_in or self.tokens_out:
+            lines.append(f"  tokens in {self.tokens_in:,} / out {self.tokens_out:,}")
+        lines.append(f"  est. spend ${self.usd:.4f} USD")
+        return "\n".join(lines)
+
+    def close(self, print_summary: bool = True) -> None:
+        self._emit({
+            "event": "run", "elapsed_s": round(self.elapsed, 3), "outputs": self.outputs,
+            "tokens_in": self.tokens_in, "tokens_out": self.tokens_out, "usd": round(self.usd, 6),
+            "retries": dict(self.retries), "failures": dict(self.failures),
+        })
+        self._events.close()
+        prom = TELEMETRY_DIR / f"{self.script}.prom"
+        tmp = prom.with_suffix(".prom.tmp")  # textfile collectors must never see a partial file
+        tmp.write_text(self.prometheus(), encoding="utf-8")
+        tmp.replace(prom)
+        if print_summary:
+            print(self.summary())
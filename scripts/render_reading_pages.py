@@ -0,0 +1,288 @@
+"""
+render_reading_pages.py
+
+Renders the reading mode as static HTML under public/read/, so a review page
+paints straight from the server response without downloading React or the
+bank JSON (the interactive app stays at the site root):
+
+    public/read/index.html                    every bank
+    public/read/<bank>/index.html             the bank's chapters
+    public/read/<bank>/chapter-<n>.html       every question of chapter n (1-based,
+                                              in order of first appearance) with the
+                                              answer marked, ⚡ 可無腦背 and the image
+
+Pages carry inline CSS only and no scripts. Images use the same srcset /
+LQIP-placeholder markup as QuestionImage.tsx; legacy single-URL images get a
+fixed-ratio grey box until they load.
+
+Every page embeds a content hash of what it shows (<meta name="content-hash">).
+A page is rendered again only when that hash changes, in parallel across
+--workers processes; pages of chapters that no longer exist are deleted.
+public/sitemap.xml lists the app and every page, with <lastmod> moved to
+today only for pages that were re-rendered.
+
+Usage:
+    uv run scripts/render_reading_pages.py
+    uv run scripts/render_reading_pages.py --force         # re-render every page
+    uv run scripts/render_reading_pages.py --workers 1
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "images"))
+from question_bank import BANKS, QuestionBank  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+TEMPLATE_VERSION = 1  # part of every content hash: bump after changing the markup below
+OUTPUT_DIR = Path("public/read")
+SITEMAP_FILE = Path("public/sitemap.xml")
+SITE_URL = "https://z111048.github.io/uav-license-quiz/"
+WORKERS = os.cpu_count() or 2
+BANK_LABELS = {
+    "general": "普通操作證",
+    "professional": "專業操作證",
+    "renewal": "屆期換證",
+    "renewal_basic": "屆期換證（簡易）",
+}
+IMAGE_SIZES = "(min-width: 768px) 720px, 100vw"
+HASH_RE = re.compile(r'<meta name="content-hash" content="([0-9a-f]+)">')
+SITEMAP_URL_RE = re.compile(r"<loc>([^<]+)</loc>\s*<lastmod>([^<]+)</lastmod>")
+
+STYLE = """\
+body{margin:0;font-family:system-ui,-apple-system,"Noto Sans TC",sans-serif;line-height:1.6;color:#1f2937;background:#f3f4f6}
+main{max-width:760px;margin:0 auto;padding:1rem;background:#fff}
+nav{font-size:.875rem;margin-bottom:1rem}nav a{color:#2563eb}
+h1{font-size:1.5rem;margin:.5rem 0}h2{font-size:1.125rem;color:#1e40af;background:#eff6ff;border-left:4px solid #2563eb;padding:.5rem .75rem}
+ol.chapters a{color:#1d4ed8}
+.q{border-bottom:1px solid #e5e7eb;padding:1rem 0}.q:last-child{border:0}
+.q p{font-weight:700;margin:0 0 .5rem}.no{color:#6b7280;margin-right:.5rem}
+.memo{display:inline-block;background:#e0e7ff;color:#4338ca;font-size:.75rem;padding:0 .5rem;border-radius:9999px;margin-left:.5rem}
+ul.opts{list-style:none;margin:0;padding:0}ul.opts li{padding:.25rem .5rem;color:#4b5563}
+ul.opts li.ans{color:#15803d;font-weight:700;background:#f0fdf4}
+figure{margin:.5rem 0}figure img{display:block;width:100%;height:auto;border-radius:.5rem;background:#f3f4f6 center/cover}
+img.legacy{aspect-ratio:4/3;object-fit:contain}figcaption{font-size:.75rem;color:#9ca3af}
+.cta{display:inline-block;margin:1rem 0;padding:.5rem 1rem;background:#2563eb;color:#fff;border-radius:.5rem;text-decoration:none}"""
+
+
+def esc(text: object) -> str:
+    return html.escape(str(text), quote=True)
+
+
+def digest(payload: object) -> str:
+    data = json.dumps([TEMPLATE_VERSION, payload], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Markup
+# ---------------------------------------------------------------------------
+
+def page_html(title: str, description: str, canonical: str, content_hash: str, body: str) -> str:
+    return f"""<!doctype html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{esc(title)}</title>
+<meta name="description" content="{esc(description)}">
+<link rel="canonical" href="{esc(canonical)}">
+<meta name="content-hash" content="{content_hash}">
+<style>{STYLE}</style>
+</head>
+<body>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+
+
+def image_html(image: object) -> str:
+    if isinstance(image, str):
+        return f'<img class="legacy" src="{esc(image)}" alt="題目示意圖" loading="lazy" decoding="async">'
+    sources = []
+    for mime in ("image/avif", "image/webp"):
+        srcset = ", ".join(f"{v['url']} {v['width']}w" for v in image.get("variants", []) if v.get("type") == mime)
+        sources.append(srcset)
+    avif, webp = sources
+    style = f' style="background-image:url({esc(image["placeholder"])})"' if image.get("placeholder") else ""
+    source = f'<source type="image/avif" srcset="{esc(avif)}" sizes="{IMAGE_SIZES}">' if avif else ""
+    srcset = f' srcset="{esc(webp)}" sizes="{IMAGE_SIZES}"' if webp else ""
+    return (
+        f'<picture>{source}<img src="{esc(image["src"])}"{srcset} width="{image["width"]}" height="{image["height"]}"'
+        f' alt="題目示意圖" loading="lazy" decoding="async"{style}></picture>'
+    )
+
+
+def question_html(q: dict) -> str:
+    memo = '<span class="memo">⚡ 可無腦背</span>' if q["can_memorize_directly"] else ""
+    figure = ""
+    if q["image"] is not None:
+        figure = f'<figure>{image_html(q["image"])}<figcaption>圖片由 AI 產製，僅供參考，可能與實際情況有所差異</figcaption></figure>'
+    options = "".join(
+        f'<li class="ans">✓ {esc(key)}. {esc(text)}</li>' if key == q["answer"] else f"<li>{esc(key)}. {esc(text)}</li>"
+        for key, text in q["options"].items()
+    )
+    return (
+        f'<section class="q"><p><span class="no">#{esc(q["id"])}</span>{esc(q["question"])}{memo}</p>'
+        f'{figure}<ul class="opts">{options}</ul></section>'
+    )
+
+
+def render(page: dict) -> str:
+    """Full HTML of one page (runs in a worker process)."""
+    kind = page["kind"]
+    if kind == "root":
+        items = "".join(f'<li><a href="{bank}/">{esc(label)}</a>（{n} 題）</li>' for bank, label, n in page["banks"])
+        body = (
+            f'<nav><a href="../">← 互動練習</a></nav><h1>無人機學科題庫閱讀</h1>'
+            f'<p>民航局公告題庫全文與正確答案，依操作證類別與章節分頁。</p><ul>{items}</ul>'
+            f'<a class="cta" href="../">開始模擬測驗</a>'
+        )
+        return page_html("無人機學科題庫閱讀｜全部題目與答案", "無人機操作證學科題庫全文與正確答案，依類別與章節瀏覽。",
+                         page["url"], page["hash"], body)
+
+    label = page["label"]
+    if kind == "bank":
+        items = "".join(f'<li><a href="{slug}.html">{esc(name)}</a>（{n} 題）</li>' for slug, name, n in page["chapters"])
+        body = (
+            f'<nav><a href="../">題庫閱讀</a> · <a href="../../">互動練習</a></nav>'
+            f'<h1>{esc(label)}題庫</h1><p>共 {page["questions"]} 題，依章節瀏覽題目與正確答案。</p>'
+            f'<ol class="chapters">{items}</ol><a class="cta" href="../../">開始模擬測驗</a>'
+        )
+        return page_html(f"{label}題庫｜無人機學科題庫閱讀", f"{label}學科題庫全部 {page['questions']} 題與正確答案，依章節瀏覽。",
+                         page["url"], page["hash"], body)
+
+    prev_next = "".join(
+        f' · <a href="{slug}.html">{text}</a>' for slug, text in (page["prev"], page["next"]) if slug
+    )
+    body = (
+        f'<nav><a href="../">題庫閱讀</a> · <a href="./">{esc(label)}</a> · <a href="../../">互動練習</a>{prev_next}</nav>'
+        f'<h1>{esc(page["chapter"])}</h1><h2>{esc(label)}（共 {len(page["items"])} 題）</h2>'
+        + "".join(question_html(q) for q in page["items"])
+        + '<a class="cta" href="../../">用這些題目開始模擬測驗</a>'
+    )
+    return page_html(f"{page['chapter']}｜{label}題庫", f"{label}「{page['chapter']}」共 {len(page['items'])} 題，含正確答案。",
+                     page["url"], page["hash"], body)
+
+
+# ---------------------------------------------------------------------------
+# Planning and writing
+# ---------------------------------------------------------------------------
+
+def plan_pages() -> list[dict]:
+    """Every page with its output path, canonical URL and content hash."""
+    pages = []
+    banks = []
+    for bank in map(QuestionBank.load, BANKS):
+        if not bank.exists():
+            continue
+        label = BANK_LABELS.get(bank.bank, bank.bank)
+        chapters = [(f"chapter-{n}", name, len(bank.by_chapter[name])) for n, name in enumerate(bank.chapters, 1)]
+        banks.append((bank.bank, label, len(bank)))
+        pages.append({"kind": "bank", "path": f"{bank.bank}/index.html", "label": label,
+                      "questions": len(bank), "chapters": chapters})
+        for i, (slug, name, _) in enumerate(chapters):
+            items = [{**q.to_dict(), "image": bank.image(q)} for q in bank.by_chapter[name]]
+            prev = (chapters[i - 1][0], "← 上一章") if i > 0 else (None, "")
+            nxt = (chapters[i + 1][0], "下一章 →") if i + 1 < len(chapters) else (None, "")
+            pages.append({"kind": "chapter", "path": f"{bank.bank}/{slug}.html", "label": label,
+                          "chapter": name, "items": items, "prev": prev, "next": nxt})
+    pages.append({"kind": "root", "path": "index.html", "banks": banks})
+
+    for page in pages:
+        url_path = page["path"].removesuffix("index.html")
+        page["url"] = f"{SITE_URL}read/{url_path}"
+        page["hash"] = digest({k: v for k, v in page.items() if k != "url"})
+    return pages
+
+
+def existing_hash(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as f:
+        match = HASH_RE.search(f.read(2048))  # the meta tag sits near the top of <head>
+    return match.group(1) if match else None
+
+
+def write_page(page: dict) -> str:
+    path = OUTPUT_DIR / page["path"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".html.tmp")
+    tmp.write_text(render(page), encoding="utf-8")
+    tmp.replace(path)
+    return page["path"]
+
+
+def remove_stale(pages: list[dict]) -> list[Path]:
+    keep = {OUTPUT_DIR / p["path"] for p in pages}
+    stale = [p for p in OUTPUT_DIR.rglob("*.html") if p not in keep]
+    for path in stale:
+        path.unlink()
+    for folder in sorted((d for d in OUTPUT_DIR.iterdir() if d.is_dir()), reverse=True):
+        if not any(folder.iterdir()):
+            folder.rmdir()
+    return stale
+
+
+def write_sitemap(pages: list[dict], changed: set[str]) -> bool:
+    """Rewrite the sitemap; unchanged pages keep their previous <lastmod>. Returns whether it changed."""
+    previous = dict(SITEMAP_URL_RE.findall(SITEMAP_FILE.read_text(encoding="utf-8"))) if SITEMAP_FILE.exists() else {}
+    today = date.today().isoformat()
+    rows = [(SITE_URL, previous.get(SITE_URL, today), "monthly", "1.0")]
+    for page in sorted(pages, key=lambda p: p["path"]):
+        lastmod = today if page["path"] in changed or page["url"] not in previous else previous[page["url"]]
+        rows.append((page["url"], lastmod, "monthly", "0.8" if page["kind"] == "chapter" else "0.6"))
+    urls = "".join(
+        f"  <url>\n    <loc>{esc(loc)}</loc>\n    <lastmod>{lastmod}</lastmod>\n"
+        f"    <changefreq>{freq}</changefreq>\n    <priority>{priority}</priority>\n  </url>\n"
+        for loc, lastmod, freq, priority in rows
+    )
+    text = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n{urls}</urlset>\n'
+    if SITEMAP_FILE.exists() and SITEMAP_FILE.read_text(encoding="utf-8") == text:
+        return False
+    SITEMAP_FILE.write_text(text, encoding="utf-8")
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render static reading pages per bank and chapter, update the sitemap")
+    parser.add_argument("--force", action="store_true", help="忽略內容雜湊，全部重新產生")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"並行產生頁面的程序數（預設 {WORKERS}）")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    pages = plan_pages()
+    todo = [p for p in pages if args.force or existing_hash(OUTPUT_DIR / p["path"]) != p["hash"]]
+    if len(todo) > 1 and args.workers > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(todo))) as pool:
+            changed = set(pool.map(write_page, todo))
+    else:
+        changed = set(map(write_page, todo))
+    stale = remove_stale(pages)
+    sitemap_changed = write_sitemap(pages, changed)
+
+    elapsed = time.perf_counter() - started
+    print(f"{len(pages)} 頁：重新產生 {len(changed)}，未變 {len(pages) - len(changed)}，刪除 {len(stale)}（{elapsed * 1000:.0f} ms）")
+    for path in sorted(changed):
+        print(f"  → {OUTPUT_DIR / path}")
+    if sitemap_changed:
+        print(f"  → {SITEMAP_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
-import { useState, useEffect, useCallback } from 'react'
-import { BankData, BankConfig, Question, QuizSettings, UserRecord, ViewType, StudyAids, ImageMap, BANK_CONFIGS } from './types'
-import { shuffleArray, normalizeBankData } from './utils'
+import { useState, useEffect, useCallback, useRef } from 'react'
+import { BankData, BankConfig, Question, QuizSettings, UserRecord, ViewType, StudyAids, ImageMap, SearchIndexData, RelatedData, BankStats, AnswerPatterns, MockExamsData, BANK_CONFIGS } from './types'
+import { shuffleArray, normalizeBankData, fetchOptionalJson, decodeExam } from './utils'
+import { loadSearchIndex, SearchIndex } from './search'
 import BankSelector from './components/BankSelector'
 import SetupView from './components/SetupView'
+import OfflinePanel from './components/OfflinePanel'
 import QuizView from './components/QuizView'
 import ReadingView from './components/ReadingView'
 import WhitelistView from './components/WhitelistView'
@@ -21,7 +23,15 @@ export default function App() {
   const [studyAidsLoading, setStudyAidsLoading] = useState(false)
   const [studyAidsError, setStudyAidsError] = useState<string | null>(null)
   const [imageMap, setImageMap] = useState<ImageMap | null>(null)
-  const [imageMapLoading, setImageMapLoading] = useState(false)
+  const [searchIndex, setSearchIndex] = useState<SearchIndex | null>(null)
+  const searchIndexCache = useRef(new Map<string, SearchIndex | null>())
+  const [related, setRelated] = useState<RelatedData | null>(null)
+  const relatedCache = useRef(new Map<string, RelatedData | null>())
+  const [stats, setStats] = useState<BankStats | null>(null)
+  const statsCache = useRef(new Map<string, BankStats | null>())
+  const [answerPatterns, setAnswerPatterns] = useState<AnswerPatterns | null>(null)
+  const mockExamsCache = useRef(new Map<string, MockExamsData | null>())
+  const [mockExamError, setMockExamError] = useState<string | null>(null)
 
   // Quiz state
   const [quizQueue, setQuizQueue] = useState<Question[]>([])
@@ -58,44 +68,135 @@ export default function App() {
       })
   }, [currentBank.file])
 
-  // Fetch image map when professional bank is selected
+  // Fetch the bank's image map (other banks reuse professional images of near-duplicate questions)
   useEffect(() => {
-    if (currentBankId !== 'professional') {
-      setImageMap(null)
-      return
-    }
-    if (imageMap !== null || imageMapLoading) return
+    let cancelled = false
+    setImageMap(null)
 
-    setImageMapLoading(true)
     const BASE_URL = import.meta.env.BASE_URL as string
-    fetch(BASE_URL + 'data/professional_images.json')
+    fetch(BASE_URL + `data/${currentBankId}_images.json`)
       .then((res) => {
         if (res.status === 404) return null
         if (!res.ok) throw new Error(`HTTP ${res.status}`)
         return res.json()
       })
       .then((data: ImageMap | null) => {
-        if (data !== null) setImageMap(data)
-        setImageMapLoading(false)
+        if (!cancelled && data !== null) setImageMap(data)
+      })
+      .catch(() => {})
+    return () => {
+      cancelled = true
+    }
+  }, [currentBankId])
+
+  // Fetch the bank's search index the first time study / reading mode needs it
+  const needsSearch = view === 'study' || view === 'reading'
+  useEffect(() => {
+    if (!needsSearch) return
+    const cached = searchIndexCache.current.get(currentBankId)
+    if (cached !== undefined) {
+      setSearchIndex(cached)
+      return
+    }
+    let cancelled = false
+    setSearchIndex(null)
+
+    const BASE_URL = import.meta.env.BASE_URL as string
+    fetchOptionalJson<SearchIndexData>(BASE_URL + `data/${currentBankId}_search.json`)
+      .then((data) => {
+        const index = data && loadSearchIndex(data)
+        searchIndexCache.current.set(currentBankId, index)
+        if (!cancelled) setSearchIndex(index)
       })
-      .catch(() => {
-        setImageMapLoading(false)
+      .catch(() => {})
+    return () => {
+      cancelled = true
+    }
+  }, [currentBankId, needsSearch])
+
+  // Fetch the bank's related-question graph for the wrong-answer review and study mode
+  const needsRelated = view === 'result' || view === 'study'
+  useEffect(() => {
+    if (!needsRelated) return
+    const cached = relatedCache.current.get(currentBankId)
+    if (cached !== undefined) {
+      setRelated(cached)
+      return
+    }
+    let cancelled = false
+    setRelated(null)
+
+    const BASE_URL = import.meta.env.BASE_URL as string
+    fetchOptionalJson<RelatedData>(BASE_URL + `data/${currentBankId}_related.json`)
+      .then((data) => {
+        relatedCache.current.set(currentBankId, data)
+        if (!cancelled) setRelated(data)
       })
-  }, [currentBankId, imageMap, imageMapLoading])
+      .catch(() => {})
+    return () => {
+      cancelled = true
+    }
+  }, [currentBankId, needsRelated])
+
+  // Only trust a graph built for this exact bank size
+  const relatedGraph = related && bankData && related.questions === bankData.questions.length ? related.related : null
+
+  // Fetch the bank's precomputed stats for the views that would otherwise scan every question
+  const needsStats = view === 'study' || view === 'allabove'
+  useEffect(() => {
+    if (!needsStats) return
+    const cached = statsCache.current.get(currentBankId)
+    if (cached !== undefined) {
+      setStats(cached)
+      return
+    }
+    let cancelled = false
+    setStats(null)
+
+    const BASE_URL = import.meta.env.BASE_URL as string
+    fetchOptionalJson<BankStats>(BASE_URL + `data/${currentBankId}_stats.json`)
+      .then((data) => {
+        statsCache.current.set(currentBankId, data)
+        if (!cancelled) setStats(data)
+      })
+      .catch(() => {})
+    return () => {
+      cancelled = true
+    }
+  }, [currentBankId, needsStats])
+
+  // Fetch the heuristic scores shown with the advisor's recommended bank (one file for every bank)
+  useEffect(() => {
+    if (view !== 'advisor' || answerPatterns !== null) return
+    let cancelled = false
+
+    const BASE_URL = import.meta.env.BASE_URL as string
+    fetchOptionalJson<AnswerPatterns>(BASE_URL + 'data/answer_patterns.json')
+      .then((data) => {
+        if (!cancelled && data?.version === 1) setAnswerPatterns(data)
+      })
+      .catch(() => {})
+    return () => {
+      cancelled = true
+    }
+  }, [view, answerPatterns])
+
+  // Views compute the stats themselves when these are missing or were built for another bank size
+  const bankStats = stats && bankData && stats.questions === bankData.questions.length ? stats : null
 
   const handleBankChange = useCallback((id: string) => {
     setCurrentBankId(id)
     setView('setup')
-    if (id !== 'professional') {
-      setStudyAids(null)
-      setStudyAidsError(null)
-      setImageMap(null)
-    }
+    setStudyAids(null)
+    setStudyAidsError(null)
+    setSearchIndex(null)
+    setRelated(null)
+    setStats(null)
+    setMockExamError(null)
   }, [])
 
   function handleAdvisorSelectBank(bankId: string) {
-    setCurrentBankId(bankId)
-    setView('setup')
+    handleBankChange(bankId)
   }
 
   function handleStart(settings: QuizSettings) {
@@ -114,6 +215,42 @@ export default function App() {
     setView('quiz')
   }
 
+  // Start pre-built paper examNo (1-based, as shown to the user), or a random one when null
+  async function handleMockExam(examNo: number | null) {
+    if (!bankData) return
+    setMockExamError(null)
+    const bankId = currentBankId
+    let data = mockExamsCache.current.get(bankId)
+    if (data === undefined) {
+      const BASE_URL = import.meta.env.BASE_URL as string
+      try {
+        data = await fetchOptionalJson<MockExamsData>(BASE_URL + `data/${bankId}_exams.json`)
+      } catch (err) {
+        setMockExamError(`載入失敗：${(err as Error).message}`)
+        return
+      }
+      mockExamsCache.current.set(bankId, data)
+    }
+    if (!data || data.questions !== bankData.questions.length) {
+      setMockExamError('此題庫尚無模擬試卷')
+      return
+    }
+    const no = examNo ?? Math.floor(Math.random() * data.count) + 1
+    const indices = decodeExam(data, no - 1)
+    if (!indices) {
+      setMockExamError(`試卷編號需介於 1 到 ${data.count}`)
+      return
+    }
+    setQuizQueue(indices.map((i) => bankData.questions[i]))
+    setQuizSettings({
+      chapters: data.chapters.map((c) => c.chapter),
+      count: data.size,
+      instantFeedback: false,
+      examNo: no,
+    })
+    setView('quiz')
+  }
+
   function handleReadingMode(chapters: string[]) {
     setReadingChapters(chapters)
     setView('reading')
@@ -136,18 +273,18 @@ export default function App() {
       .filter((q): q is Question => q !== undefined)
     if (wrongQuestions.length === 0) return
     setQuizQueue(wrongQuestions)
+    setQuizSettings((prev) => ({ ...prev, examNo: undefined }))
     setView('quiz')
   }
 
   function handleStudyMode() {
     setView('study')
-    if (currentBankId !== 'professional') return
     if (studyAids !== null || studyAidsLoading) return
 
     setStudyAidsLoading(true)
     setStudyAidsError(null)
     const BASE_URL = import.meta.env.BASE_URL as string
-    fetch(BASE_URL + 'data/professional_study_aids.json')
+    fetch(BASE_URL + `data/${currentBankId}_study_aids.json`)
       .then((res) => {
         if (res.status === 404) {
           setStudyAids(null)
@@ -187,6 +324,7 @@ export default function App() {
         {/* Advisor view — shown before bank data loads */}
         {view === 'advisor' && (
           <LicenseAdvisorView
+            answerPatterns={answerPatterns}
             onSelectBank={handleAdvisorSelectBank}
             onSkip={() => setView('setup')}
           />
@@ -217,15 +355,17 @@ export default function App() {
                 questions={bankData.questions}
                 whitelist={bankData.answer_option_whitelist}
                 chapterNote={bankData.chapter_note}
-                currentBankId={currentBankId}
                 onStart={handleStart}
                 onReadingMode={handleReadingMode}
+                onMockExam={handleMockExam}
+                mockExamError={mockExamError}
                 onWhitelist={() => setView('whitelist')}
                 onAllAbove={() => setView('allabove')}
                 onStudyMode={handleStudyMode}
                 onAdvisor={() => setView('advisor')}
               />
             )}
+            {view === 'setup' && <OfflinePanel bankId={currentBankId} />}
 
             {view === 'quiz' && (
               <QuizView
@@ -242,6 +382,7 @@ export default function App() {
                 questions={bankData.questions}
                 selectedChapters={readingChapters}
                 imageMap={imageMap}
+                searchIndex={searchIndex}
                 onClose={() => setView('setup')}
               />
             )}
@@ -256,6 +397,7 @@ export default function App() {
             {view === 'allabove' && (
               <AllAboveView
                 questions={bankData.questions}
+                stats={bankStats}
                 onClose={() => setView('setup')}
               />
             )}
@@ -263,6 +405,8 @@ export default function App() {
             {view === 'result' && (
               <ResultView
                 records={quizRecords}
+                questions={bankData.questions}
+                related={relatedGraph}
                 onRestart={handleRestart}
                 onRetryWrong={handleRetryWrong}
               />
@@ -274,7 +418,11 @@ export default function App() {
                 studyAids={studyAids}
                 studyAidsLoading={studyAidsLoading}
                 studyAidsError={studyAidsError}
+                bankId={currentBankId}
                 imageMap={imageMap}
+                searchIndex={searchIndex}
+                related={relatedGraph}
+                stats={bankStats}
                 onClose={() => setView('setup')}
               />
             )}
@@ -1,26 +1,21 @@
 import { useMemo } from 'react'
-import { Question } from '../types'
+import { BankStats, Question } from '../types'
+import { ALL_ABOVE_TEXT, computeBankStats } from '../utils'
 
 interface Props {
   questions: Question[]
+  stats?: BankStats | null
   onClose: () => void
 }
 
-const isAllAboveText = (text: string) => text.includes('以上皆是')
+const isAllAboveText = (text: string) => text.includes(ALL_ABOVE_TEXT)
 
-export default function AllAboveView({ questions, onClose }: Props) {
-  const allAboveQuestions = useMemo(() =>
-    questions.filter((q) => Object.values(q.options).some(isAllAboveText)),
-    [questions]
-  )
-  const canMemorize = useMemo(() =>
-    allAboveQuestions.filter((q) => isAllAboveText(q.options[q.answer])),
-    [allAboveQuestions]
-  )
-  const isTrap = useMemo(() =>
-    allAboveQuestions.filter((q) => !isAllAboveText(q.options[q.answer])),
-    [allAboveQuestions]
-  )
+export default function AllAboveView({ questions, stats, onClose }: Props) {
+  // Classification precomputed in <bank>_stats.json; one pass over the bank without it
+  const allAbove = useMemo(() => (stats ?? computeBankStats(questions)).all_above, [stats, questions])
+  const canMemorize = useMemo(() => allAbove.correct.map((i) => questions[i]), [allAbove, questions])
+  const isTrap = useMemo(() => allAbove.trap.map((i) => questions[i]), [allAbove, questions])
+  const allAboveCount = canMemorize.length + isTrap.length
 
   return (
     <div className="bg-white rounded-xl shadow-lg p-6 md:p-8">
@@ -40,7 +35,7 @@ export default function AllAboveView({ questions, onClose }: Props) {
       {/* Stats cards */}
       <div className="grid grid-cols-3 gap-4 mb-8">
         <div className="bg-gray-100 rounded-lg p-4 text-center">
-          <div className="text-3xl font-bold text-gray-700">{allAboveQuestions.length}</div>
+          <div className="text-3xl font-bold text-gray-700">{allAboveCount}</div>
           <div className="text-sm text-gray-500 mt-1">含「以上皆是」題目</div>
         </div>
         <div className="bg-green-50 rounded-lg p-4 text-center">
@@ -1,4 +1,5 @@
 import { useState } from 'react'
+import { AnswerPatterns } from '../types'
 
 type Purpose = 'personal' | 'professional'
 type AgeGroup = 'under16' | '16to17' | '18plus'
@@ -19,6 +20,7 @@ interface AdvisorResult {
 }
 
 interface Props {
+  answerPatterns?: AnswerPatterns | null
   onSelectBank: (bankId: string) => void
   onSkip: () => void
 }
@@ -185,7 +187,33 @@ function computeResult(
   }
 }
 
-export default function LicenseAdvisorView({ onSelectBank, onSkip }: Props) {
+function PatternSummary({ patterns }: { patterns: AnswerPatterns['banks'][string] }) {
+  return (
+    <details className="mb-4 rounded-lg border border-gray-200 bg-gray-50 px-4 py-3 text-sm">
+      <summary className="cursor-pointer font-medium text-gray-700">
+        🎯 答題技巧實測（本題庫 {patterns.questions} 題）
+      </summary>
+      <ul className="mt-3 space-y-1.5">
+        {patterns.heuristics.map((h) => (
+          <li key={h.id} className="flex items-baseline gap-2">
+            <span className="flex-1 text-gray-700">{h.label}</span>
+            <span className="text-xs text-gray-400 shrink-0">
+              適用 {Math.round((h.covered / patterns.questions) * 100)}%
+            </span>
+            <span className="w-12 text-right font-bold text-gray-800 shrink-0">
+              {h.covered > 0 ? `${Math.round((h.correct / h.covered) * 100)}%` : '—'}
+            </span>
+          </li>
+        ))}
+      </ul>
+      <p className="mt-3 text-xs text-gray-400">
+        右欄為該技巧適用題目中的正確率（純猜約 25%）；統計自現行題庫，僅供參考，仍建議理解題意。
+      </p>
+    </details>
+  )
+}
+
+export default function LicenseAdvisorView({ answerPatterns, onSelectBank, onSkip }: Props) {
   const [step, setStep] = useState(1)
   const [purpose, setPurpose] = useState<Purpose | null>(null)
   const [ageGroup, setAgeGroup] = useState<AgeGroup | null>(null)
@@ -397,6 +425,9 @@ export default function LicenseAdvisorView({ onSelectBank, onSkip }: Props) {
               <p className="text-sm text-gray-600 mb-3 font-medium">
                 📚 建議練習題庫：<span className="text-blue-600">{result.recommendedBankLabel}</span>
               </p>
+              {answerPatterns?.banks[result.recommendedBankId] && (
+                <PatternSummary patterns={answerPatterns.banks[result.recommendedBankId]} />
+              )}
               <button
                 onClick={() => onSelectBank(result.recommendedBankId!)}
                 className="w-full bg-blue-600 hover:bg-blue-700 text-white font-bold py-3 rounded-lg shadow transition duration-200 mb-3"
@@ -0,0 +1,102 @@
+import { useEffect, useState } from 'react'
+import { PrecacheBucket, PrecacheManifest } from '../types'
+import { fetchOptionalJson } from '../utils'
+import { PRECACHE_MANIFEST_URL, askServiceWorker, bucketSize, isSelected } from '../offline'
+
+interface Props {
+  bankId: string
+}
+
+const BUCKET_LABELS: Record<PrecacheBucket, string> = {
+  core: '題庫與模擬試卷',
+  study: '學習輔助與搜尋',
+  images: '題目插圖',
+}
+
+function formatMB(bytes: number) {
+  return `${(bytes / 1e6).toFixed(1)} MB`
+}
+
+export default function OfflinePanel({ bankId }: Props) {
+  const [manifest, setManifest] = useState<PrecacheManifest | null>(null)
+  const [selected, setSelected] = useState<string[] | null>(null)
+  const [progress, setProgress] = useState<{ bucket: PrecacheBucket; done: number; total: number } | null>(null)
+  const [error, setError] = useState<string | null>(null)
+
+  // Only shown when a service worker is active (production builds) and the manifest exists
+  useEffect(() => {
+    let cancelled = false
+    askServiceWorker({ type: 'status' })
+      .then(async (reply) => {
+        if (reply?.type !== 'status') return
+        const data = await fetchOptionalJson<PrecacheManifest>(PRECACHE_MANIFEST_URL)
+        if (cancelled || !data || data.version !== 1) return
+        setManifest(data)
+        setSelected(reply.selected)
+      })
+      .catch(() => {})
+    return () => {
+      cancelled = true
+    }
+  }, [])
+
+  if (!manifest || !selected) return null
+
+  async function download(bucket: PrecacheBucket) {
+    setError(null)
+    setProgress({ bucket, done: 0, total: 0 })
+    const reply = await askServiceWorker({ type: 'precache', bucket, bank: bankId }, (done, total) =>
+      setProgress({ bucket, done, total })
+    )
+    setProgress(null)
+    if (reply?.type === 'done') {
+      setSelected(reply.selected)
+      if (reply.failed > 0) setError(`${reply.failed} 個檔案下載失敗，下次開啟時會再試`)
+    } else {
+      setError(reply?.type === 'error' ? reply.message : '離線功能目前無法使用')
+    }
+  }
+
+  const buckets = Object.keys(BUCKET_LABELS) as PrecacheBucket[]
+
+  return (
+    <details className="mt-4 p-4 bg-gray-50 border border-gray-200 rounded-lg">
+      <summary className="cursor-pointer text-gray-700 font-bold">
+        離線使用 <span className="text-xs font-normal text-gray-500">下載後無網路也能練習</span>
+      </summary>
+      <ul className="mt-3 space-y-2">
+        {buckets.map((bucket) => {
+          const size = bucketSize(manifest, bucket, bankId)
+          if (size.entries === 0) return null
+          const saved = isSelected(selected, bucket, bankId)
+          const busy = progress?.bucket === bucket
+          return (
+            <li key={bucket} className="flex items-center justify-between gap-2 text-sm">
+              <span className="text-gray-700">
+                {BUCKET_LABELS[bucket]}
+                <span className="ml-2 text-xs text-gray-500">
+                  {formatMB(size.bytes)}
+                  {size.unknown > 0 && ` 以上（${size.unknown} 個檔案大小未知）`}
+                </span>
+              </span>
+              {saved ? (
+                <span className="text-green-700">已下載</span>
+              ) : (
+                <button
+                  onClick={() => download(bucket)}
+                  disabled={progress !== null}
+                  className="px-3 py-1 bg-gray-700 hover:bg-gray-800 disabled:opacity-50 text-white rounded shadow transition duration-200"
+                >
+                  {!busy || !progress ? '下載' : progress.total > 0 ? `${progress.done}/${progress.total}` : '下載中…'}
+                </button>
+              )}
+            </li>
+          )
+        })}
+      </ul>
+      {error && (
+        <p role="alert" className="mt-2 text-sm text-red-600">{error}</p>
+      )}
+    </details>
+  )
+}
@@ -0,0 +1,42 @@
+import { ImageEntry } from '../types'
+import { buildSrcSet } from '../utils'
+
+interface Props {
+  image: ImageEntry
+  className?: string
+  sizes?: string
+}
+
+// 版面最寬 max-w-5xl（含 padding 約 960px），手機則約等於螢幕寬
+const DEFAULT_SIZES = '(min-width: 1024px) 960px, 100vw'
+
+// LQIP 畫在 <img> 背景：圖片解碼完成後自然覆蓋，不需額外狀態或請求
+function placeholderStyle(placeholder?: string) {
+  if (!placeholder) return undefined
+  return { backgroundImage: `url(${placeholder})`, backgroundSize: 'cover', backgroundPosition: 'center' }
+}
+
+export default function QuestionImage({ image, className, sizes = DEFAULT_SIZES }: Props) {
+  if (typeof image === 'string') {
+    return <img src={image} alt="題目示意圖" className={className} loading="lazy" />
+  }
+
+  const avifSrcSet = buildSrcSet(image, 'image/avif')
+  return (
+    <picture>
+      {avifSrcSet && <source type="image/avif" srcSet={avifSrcSet} sizes={sizes} />}
+      <img
+        src={image.src}
+        srcSet={buildSrcSet(image, 'image/webp') || undefined}
+        sizes={sizes}
+        width={image.width}
+        height={image.height}
+        alt="題目示意圖"
+        className={className}
+        style={placeholderStyle(image.placeholder)}
+        loading="lazy"
+        decoding="async"
+      />
+    </picture>
+  )
+}
@@ -1,5 +1,6 @@
 import { useEffect, useRef, useState, useCallback } from 'react'
 import { Question, QuizSettings, UserRecord, ImageMap, OptionKey } from '../types'
+import QuestionImage from './QuestionImage'
 
 const TIME_LIMIT = 10
 
@@ -158,6 +159,9 @@ export default function QuizView({ queue, allQuestions, settings, imageMap, onFi
           題號：
           <span className="text-blue-600 text-xl">{index + 1}</span>
           {' '}/ {queue.length}
+          {settings.examNo !== undefined && (
+            <span className="ml-2 text-xs font-normal text-gray-400">試卷 #{settings.examNo}</span>
+          )}
         </div>
         <div className="flex items-center gap-4">
           <div className="text-gray-500 bg-gray-100 px-3 py-1 rounded-full text-xs whitespace-nowrap shrink-0">
@@ -196,16 +200,11 @@ export default function QuizView({ queue, allQuestions, settings, imageMap, onFi
         </h3>
         {(() => {
           const globalIdx = allQuestions ? allQuestions.indexOf(currentQ) : -1
-          const imgUrl = globalIdx >= 0 ? imageMap?.[String(globalIdx)] : undefined
-          return imgUrl ? (
+          const image = globalIdx >= 0 ? imageMap?.[String(globalIdx)] : undefined
+          return image ? (
             <div className="mt-4">
               <div className="aspect-square w-full rounded-lg overflow-hidden bg-gray-100">
-                <img
-                  src={imgUrl}
-                  alt="題目示意圖"
-                  className="w-full h-full object-contain"
-                  loading="lazy"
-                />
+                <QuestionImage image={image} className="w-full h-full object-contain" />
               </div>
               <p className="text-xs text-gray-400 text-center mt-1">圖片由 AI 產製，僅供參考，可能與實際情況有所差異</p>
             </div>
@@ -1,16 +1,32 @@
-import { useState } from 'react'
+import { useState, useMemo } from 'react'
 import { Question, ImageMap } from '../types'
+import { imageSrc } from '../utils'
+import { SearchIndex, searchQuestions } from '../search'
+import QuestionImage from './QuestionImage'
 
 interface Props {
   questions: Question[]
   selectedChapters: string[]
   imageMap?: ImageMap | null
+  searchIndex?: SearchIndex | null
   onClose: () => void
 }
 
-export default function ReadingView({ questions, selectedChapters, imageMap, onClose }: Props) {
+export default function ReadingView({ questions, selectedChapters, imageMap, searchIndex, onClose }: Props) {
   const [lightboxSrc, setLightboxSrc] = useState<string | null>(null)
-  const filtered = questions.filter((q) => selectedChapters.includes(q.chapter))
+  const [search, setSearch] = useState('')
+
+  // Questions matching the search (index lookup incl. study aids, else substring); null = no search
+  const matching = useMemo(() => {
+    if (!search) return null
+    const hits = searchIndex && searchIndex.questions === questions.length ? searchQuestions(searchIndex, search) : null
+    if (hits) return new Set(hits.map((h) => questions[h.index]))
+    return new Set(
+      questions.filter((q) => q.question.includes(search) || Object.values(q.options).some((o) => o.includes(search)))
+    )
+  }, [search, searchIndex, questions])
+
+  const filtered = questions.filter((q) => selectedChapters.includes(q.chapter) && (!matching || matching.has(q)))
 
   const grouped = selectedChapters.reduce<Record<string, Question[]>>((acc, ch) => {
     acc[ch] = filtered.filter((q) => q.chapter === ch)
@@ -50,6 +66,17 @@ export default function ReadingView({ questions, selectedChapters, imageMap, onC
         </button>
       </div>
 
+      <input
+        type="text"
+        placeholder={searchIndex ? '搜尋題目、選項或學習輔助...' : '搜尋題目或選項...'}
+        value={search}
+        onChange={(e) => setSearch(e.target.value)}
+        className="w-full border border-gray-300 rounded-lg px-4 py-2 mb-6 text-sm focus:outline-none focus:ring-2 focus:ring-blue-400"
+      />
+      {matching && (
+        <p className="text-xs text-gray-500 -mt-4 mb-6">符合 {filtered.length} 題</p>
+      )}
+
       <div className="space-y-8">
         {selectedChapters.map((chapter) => {
           const chapterQuestions = grouped[chapter]
@@ -64,7 +91,7 @@ export default function ReadingView({ questions, selectedChapters, imageMap, onC
               <div className="space-y-6">
                 {chapterQuestions.map((q) => {
                   const globalIdx = questions.indexOf(q)
-                  const imgUrl = globalIdx >= 0 ? imageMap?.[String(globalIdx)] : undefined
+                  const image = globalIdx >= 0 ? imageMap?.[String(globalIdx)] : undefined
                   return (
                   <div key={q.id} className="border-b border-gray-200 pb-4 last:border-0">
                     <div className="flex gap-2">
@@ -81,17 +108,15 @@ export default function ReadingView({ questions, selectedChapters, imageMap, onC
                           )}
                         </div>
 
-                        {imgUrl && (
+                        {image && (
                           <div className="mb-3">
                             <div
                               className="cursor-zoom-in"
-                              onClick={() => setLightboxSrc(imgUrl)}
+                              onClick={() => setLightboxSrc(imageSrc(image))}
                             >
-                              <img
-                                src={imgUrl}
-                                alt="題目示意圖"
+                              <QuestionImage
+                                image={image}
                                 className="w-full rounded-lg border border-gray-200 object-contain bg-gray-50"
-                                loading="lazy"
                               />
                             </div>
                             <p className="text-xs text-gray-400 mt-1">圖片由 AI 產製，僅供參考，可能與實際情況有所差異</p>
@@ -0,0 +1,30 @@
+import { Question } from '../types'
+
+interface Props {
+  questions: Question[]
+  indices: number[]
+}
+
+// Related questions (from <bank>_related.json) with their correct answers, collapsed by default
+export default function RelatedQuestions({ questions, indices }: Props) {
+  const items = indices.map((i) => questions[i]).filter((q): q is Question => q !== undefined)
+  if (items.length === 0) return null
+
+  return (
+    <details className="mt-3 text-sm">
+      <summary className="cursor-pointer text-blue-600 hover:text-blue-800 text-xs font-medium">
+        相關題目（{items.length}）
+      </summary>
+      <ul className="mt-2 space-y-2">
+        {items.map((q) => (
+          <li key={`${q.chapter}-${q.id}`} className="bg-gray-50 border border-gray-200 rounded p-2">
+            <p className="text-gray-700">{q.question}</p>
+            <p className="text-xs text-green-700 mt-1">
+              ✓ {q.answer}. {q.options[q.answer]}
+            </p>
+          </li>
+        ))}
+      </ul>
+    </details>
+  )
+}
@@ -1,12 +1,16 @@
-import { UserRecord, OptionKey } from '../types'
+import { useMemo } from 'react'
+import { UserRecord, OptionKey, Question } from '../types'
+import RelatedQuestions from './RelatedQuestions'
 
 interface Props {
   records: UserRecord[]
+  questions?: Question[]
+  related?: number[][] | null
   onRestart: () => void
   onRetryWrong: () => void
 }
 
-export default function ResultView({ records, onRestart, onRetryWrong }: Props) {
+export default function ResultView({ records, questions, related, onRestart, onRetryWrong }: Props) {
   const total = records.length
   const correctCount = records.filter((r) => r.isCorrect).length
   const wrongCount = total - correctCount
@@ -18,6 +22,17 @@ export default function ResultView({ records, onRestart, onRetryWrong }: Props)
 
   const wrongRecords = records.filter((r) => !r.isCorrect)
 
+  // id restarts per chapter, so (chapter, id) identifies a question
+  const indexByKey = useMemo(
+    () => new Map((questions ?? []).map((q, i) => [`${q.chapter}#${q.id}`, i])),
+    [questions]
+  )
+
+  function relatedOf(record: UserRecord): number[] {
+    const idx = indexByKey.get(`${record.chapter}#${record.questionId}`)
+    return idx !== undefined && related ? related[idx] ?? [] : []
+  }
+
   function getOptionText(record: UserRecord, key: OptionKey | null): string {
     if (!key) return '未作答 (逾時)'
     const text = record.options[key] ?? ''
@@ -92,6 +107,7 @@ export default function ResultView({ records, onRestart, onRetryWrong }: Props)
                     </span>
                   </div>
                 </div>
+                {questions && <RelatedQuestions questions={questions} indices={relatedOf(record)} />}
               </div>
             ))}
           </div>
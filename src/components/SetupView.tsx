@@ -4,22 +4,24 @@ import { Question, QuizSettings } from '../types'
 interface Props {
   questions: Question[]
   whitelist: string[]
-  currentBankId: string
   chapterNote?: string
   onStart: (settings: QuizSettings) => void
   onReadingMode: (chapters: string[]) => void
+  onMockExam?: (examNo: number | null) => void
+  mockExamError?: string | null
   onWhitelist: () => void
   onAllAbove: () => void
   onStudyMode: () => void
   onAdvisor: () => void
 }
 
-export default function SetupView({ questions, onStart, onReadingMode, onWhitelist, onAllAbove, onStudyMode, onAdvisor, currentBankId, chapterNote }: Props) {
+export default function SetupView({ questions, onStart, onReadingMode, onMockExam, mockExamError, onWhitelist, onAllAbove, onStudyMode, onAdvisor, chapterNote }: Props) {
   const chapters = [...new Set(questions.map((q) => q.chapter))]
   const [selectedChapters, setSelectedChapters] = useState<string[]>([])
   const [count, setCount] = useState<number | 'all'>(50)
   const [instantFeedback, setInstantFeedback] = useState(true)
   const [startError, setStartError] = useState<string | null>(null)
+  const [examNo, setExamNo] = useState('')
 
   function toggleChapter(chapter: string) {
     setStartError(null)
@@ -135,6 +137,35 @@ export default function SetupView({ questions, onStart, onReadingMode, onWhiteli
         </button>
       </div>
 
+      {onMockExam && (
+        <div className="mt-4 p-4 bg-gray-50 border border-gray-200 rounded-lg">
+          <label htmlFor="exam-no" className="block text-gray-700 font-bold mb-2">
+            模擬試卷 <span className="text-xs font-normal text-gray-500">依章節比例出題，輸入編號可與他人作答同一份</span>
+          </label>
+          <div className="flex gap-2">
+            <input
+              id="exam-no"
+              type="number"
+              min={1}
+              inputMode="numeric"
+              placeholder="試卷編號（空白＝隨機）"
+              value={examNo}
+              onChange={(e) => setExamNo(e.target.value)}
+              className="flex-1 min-w-0 p-2 border rounded bg-white focus:outline-none focus:ring-2 focus:ring-blue-400"
+            />
+            <button
+              onClick={() => onMockExam(examNo.trim() === '' ? null : Number(examNo))}
+              className="px-4 bg-gray-700 hover:bg-gray-800 text-white font-bold rounded-lg shadow transition duration-200"
+            >
+              開始模擬考
+            </button>
+          </div>
+          {mockExamError && (
+            <p role="alert" className="mt-2 text-sm text-red-600">{mockExamError}</p>
+          )}
+        </div>
+      )}
+
       <div className="mt-4 text-center space-y-2">
         <div>
           <button
@@ -152,16 +183,14 @@ export default function SetupView({ questions, onStart, onReadingMode, onWhiteli
             查看「以上皆是」答題策略分析
           </button>
         </div>
-        {currentBankId === 'professional' && (
-          <div>
-            <button
-              onClick={onStudyMode}
-              className="text-purple-600 hover:text-purple-800 underline text-sm"
-            >
-              AI 學習模式（諧音 + 解析）
-            </button>
-          </div>
-        )}
+        <div>
+          <button
+            onClick={onStudyMode}
+            className="text-purple-600 hover:text-purple-800 underline text-sm"
+          >
+            AI 學習模式（諧音 + 解析）
+          </button>
+        </div>
         <div>
           <button
             onClick={onAdvisor}
@@ -1,23 +1,35 @@
 import { useState, useMemo, memo } from 'react'
-import { Question, StudyAid, StudyAids, ImageMap } from '../types'
+import { Question, StudyAid, StudyAids, ImageMap, ImageEntry, BankStats } from '../types'
+import { computeBankStats } from '../utils'
+import { SearchIndex, searchQuestions } from '../search'
+import QuestionImage from './QuestionImage'
+import RelatedQuestions from './RelatedQuestions'
 
 interface Props {
   questions: Question[]
   studyAids: StudyAids | null
   studyAidsLoading: boolean
   studyAidsError: string | null
+  bankId: string
   imageMap?: ImageMap | null
+  searchIndex?: SearchIndex | null
+  related?: number[][] | null
+  stats?: BankStats | null
   onClose: () => void
 }
 
 const QuestionCard = memo(function QuestionCard({
   question,
   aid,
-  imageUrl,
+  image,
+  questions,
+  related,
 }: {
   question: Question
   aid: StudyAid | null | undefined
-  imageUrl?: string | null
+  image?: ImageEntry | null
+  questions: Question[]
+  related?: number[]
 }) {
   const [expanded, setExpanded] = useState(true)
   const hasAid = useMemo(() => aid != null && Object.keys(aid).length > 0, [aid])
@@ -41,13 +53,11 @@ const QuestionCard = memo(function QuestionCard({
       <p className="text-sm text-gray-800 mb-3 leading-relaxed">{question.question}</p>
 
       {/* Image */}
-      {imageUrl && (
+      {image && (
         <div className="mb-3">
-          <img
-            src={imageUrl}
-            alt="題目示意圖"
+          <QuestionImage
+            image={image}
             className="w-full rounded-lg border border-gray-200 object-contain bg-gray-50"
-            loading="lazy"
           />
           <p className="text-xs text-gray-400 mt-1">圖片由 AI 產製，僅供參考，可能與實際情況有所差異</p>
         </div>
@@ -122,35 +132,36 @@ const QuestionCard = memo(function QuestionCard({
           )
         )}
       </div>
+
+      {related && <RelatedQuestions questions={questions} indices={related} />}
     </div>
   )
 })
 
-export default function StudyView({ questions, studyAids, studyAidsLoading, studyAidsError, imageMap, onClose }: Props) {
+export default function StudyView({ questions, studyAids, studyAidsLoading, studyAidsError, bankId, imageMap, searchIndex, related, stats, onClose }: Props) {
   const [selectedChapter, setSelectedChapter] = useState<string>('全部')
   const [search, setSearch] = useState('')
 
-  const chapters = useMemo(() => [...new Set(questions.map((q) => q.chapter))], [questions])
+  // Chapter stats, precomputed in <bank>_stats.json (one pass over the bank without it)
+  const chapterStats = useMemo(() => (stats ?? computeBankStats(questions)).chapters, [stats, questions])
+  const chapters = useMemo(() => chapterStats.map((s) => s.chapter), [chapterStats])
 
-  // Chapter stats
-  const chapterStats = useMemo(() =>
-    chapters.map((ch) => {
-      const qs = questions.filter((q) => q.chapter === ch)
-      const memorizable = qs.filter((q) => q.can_memorize_directly).length
-      return { chapter: ch, total: qs.length, memorizable }
-    }),
-    [chapters, questions]
-  )
+  // Ranked search over questions, options and study aids; null → plain substring filter
+  const hits = useMemo(() => {
+    if (!search || !searchIndex || searchIndex.questions !== questions.length) return null
+    return searchQuestions(searchIndex, search)
+  }, [search, searchIndex, questions.length])
 
-  // Filter questions
-  const filtered = useMemo(() =>
-    questions.filter((q) => {
-      if (selectedChapter !== '全部' && q.chapter !== selectedChapter) return false
-      if (search && !q.question.includes(search) && !Object.values(q.options).some((o) => o.includes(search))) return false
-      return true
-    }),
-    [questions, selectedChapter, search]
-  )
+  // Filter questions (indices into questions)
+  const filtered = useMemo(() => {
+    const inChapter = (q: Question) => selectedChapter === '全部' || q.chapter === selectedChapter
+    if (hits) return hits.map((h) => h.index).filter((i) => inChapter(questions[i]))
+    return questions.flatMap((q, i) => {
+      if (!inChapter(q)) return []
+      if (search && !q.question.includes(search) && !Object.values(q.options).some((o) => o.includes(search))) return []
+      return [i]
+    })
+  }, [questions, selectedChapter, search, hits])
 
   return (
     <div className="space-y-4">
@@ -196,9 +207,9 @@ export default function StudyView({ questions, studyAids, studyAidsLoading, stud
       {!studyAidsLoading && !studyAidsError && studyAids === null && (
         <div className="bg-amber-50 border border-amber-200 rounded-lg p-3 text-sm text-amber-800">
           <p className="font-medium mb-1">尚未產生 AI 學習輔助資料</p>
-          <p>請先執行以下指令（約需 3-5 分鐘，費用約 $0.22）：</p>
+          <p>請先執行以下指令（約需 3-5 分鐘，費用約 $0.22；與其他題庫相同的題目會直接沿用、不另收費）：</p>
           <code className="mt-1 block bg-amber-100 rounded px-2 py-1 text-xs font-mono">
-            uv run generate_study_aids.py
+            uv run generate_study_aids.py --bank {bankId}
           </code>
         </div>
       )}
@@ -223,7 +234,7 @@ export default function StudyView({ questions, studyAids, studyAidsLoading, stud
       {/* Search */}
       <input
         type="text"
-        placeholder="搜尋題目或選項..."
+        placeholder={searchIndex ? '搜尋題目、選項或學習輔助...' : '搜尋題目或選項...'}
         value={search}
         onChange={(e) => setSearch(e.target.value)}
         className="w-full border border-gray-300 rounded-lg px-4 py-2 text-sm focus:outline-none focus:ring-2 focus:ring-purple-400 bg-white"
@@ -234,17 +245,16 @@ export default function StudyView({ questions, studyAids, studyAidsLoading, stud
 
       {/* Question cards */}
       <div className="space-y-3">
-        {filtered.map((q) => {
-          const globalIdx = questions.indexOf(q)
-          return (
-            <QuestionCard
-              key={globalIdx}
-              question={q}
-              aid={studyAids ? studyAids[String(globalIdx)] : undefined}
-              imageUrl={imageMap ? imageMap[String(globalIdx)] : null}
-            />
-          )
-        })}
+        {filtered.map((globalIdx) => (
+          <QuestionCard
+            key={globalIdx}
+            question={questions[globalIdx]}
+            aid={studyAids ? studyAids[String(globalIdx)] : undefined}
+            image={imageMap ? imageMap[String(globalIdx)] : null}
+            questions={questions}
+            related={related?.[globalIdx]}
+          />
+        ))}
       </div>
 
       {/* Bottom close button */}
@@ -0,0 +1,68 @@
+import type { PrecacheBucket, PrecacheManifest } from './types'
+
+// Talks to public/sw.js, which keeps the buckets of public/precache-manifest.json offline.
+
+export const PRECACHE_MANIFEST_URL = `${import.meta.env.BASE_URL}precache-manifest.json`
+
+/** Entries of `bucket` the given bank needs (entries without banks are shared). */
+export function bucketEntries(manifest: PrecacheManifest, bucket: PrecacheBucket, bank: string) {
+  return (manifest.buckets[bucket]?.entries ?? []).filter((e) => e.banks.length === 0 || e.banks.includes(bank))
+}
+
+/** Download size of one bucket for one bank; `unknown` counts entries without a recorded size. */
+export function bucketSize(manifest: PrecacheManifest, bucket: PrecacheBucket, bank: string) {
+  const entries = bucketEntries(manifest, bucket, bank)
+  return {
+    entries: entries.length,
+    bytes: entries.reduce((sum, e) => sum + (e.bytes ?? 0), 0),
+    unknown: entries.filter((e) => e.bytes === null).length,
+  }
+}
+
+/** Whether `bucket` of `bank` is among the service worker's "bucket:bank" selections. */
+export function isSelected(selected: string[], bucket: PrecacheBucket, bank: string) {
+  return selected.includes(`${bucket}:${bank}`) || selected.includes(`${bucket}:*`)
+}
+
+export type WorkerReply =
+  | { type: 'status'; selected: string[] }
+  | { type: 'progress'; done: number; total: number }
+  | { type: 'done'; updated: number; failed: number; selected: string[] }
+  | { type: 'error'; message: string }
+
+/**
+ * Sends a message to the active service worker and resolves with its final
+ * reply; progress replies go to `onProgress`. Null when no worker is active.
+ */
+export async function askServiceWorker(
+  message: { type: 'status' | 'sync' } | { type: 'precache'; bucket: PrecacheBucket; bank: string },
+  onProgress?: (done: number, total: number) => void,
+): Promise<WorkerReply | null> {
+  if (!('serviceWorker' in navigator)) return null
+  const worker = (await navigator.serviceWorker.getRegistration())?.active
+  if (!worker) return null
+  return new Promise((resolve) => {
+    const channel = new MessageChannel()
+    channel.port1.onmessage = (event: MessageEvent<WorkerReply>) => {
+      if (event.data.type === 'progress') {
+        onProgress?.(event.data.done, event.data.total)
+        return
+      }
+      channel.port1.close()
+      resolve(event.data)
+    }
+    worker.postMessage(message, [channel.port2])
+  })
+}
+
+/** Production builds only: a dev-server worker would serve stale modules. */
+export function registerServiceWorker() {
+  if (!import.meta.env.PROD || !('serviceWorker' in navigator)) return
+  window.addEventListener('load', () => {
+    navigator.serviceWorker
+      .register(`${import.meta.env.BASE_URL}sw.js`)
+      .then(() => navigator.serviceWorker.ready)
+      .then(() => askServiceWorker({ type: 'sync' }))
+      .catch(() => {})  // without a worker the app simply stays online-only
+  })
+}
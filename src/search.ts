@@ -0,0 +1,134 @@
+import { SearchIndexData } from './types'
+
+// Must match scripts/generate_search_index.py
+const SUPPORTED_VERSION = 1
+const MASK_BITS = 6
+const VARINT_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+const VARINT_VALUE = new Int8Array(128) // char code → 6-bit value
+for (let i = 0; i < VARINT_ALPHABET.length; i++) VARINT_VALUE[VARINT_ALPHABET.charCodeAt(i)] = i
+
+// Relative weight of a hit per field; a hit counts with its best field
+const FIELD_WEIGHTS: Record<string, number> = {
+  question: 4,
+  options: 3,
+  keywords: 2,
+  mnemonic: 1,
+  explanation: 1,
+  wrong_options: 1,
+}
+
+export interface SearchIndex {
+  questions: number
+  fields: string[]
+  grams: Map<string, number> // gram → offset of its posting list in `postings`
+  postings: string
+}
+
+export interface SearchHit {
+  index: number // position in BankData.questions
+  score: number
+  fields: string[] // fields every query term was found in (empty if spread over several)
+}
+
+function readVarint(s: string, pos: number): [number, number] {
+  let value = 0
+  let shift = 0
+  for (;;) {
+    const digit = VARINT_VALUE[s.charCodeAt(pos++)]
+    value += (digit & 31) * 2 ** shift
+    if (digit < 32) return [value, pos]
+    shift += 5
+  }
+}
+
+/** Index the posting-list offsets once; lists themselves are decoded per query. */
+export function loadSearchIndex(data: SearchIndexData): SearchIndex | null {
+  if (data.version !== SUPPORTED_VERSION) return null
+  const chars = Array.from(data.grams)
+  const grams = new Map<string, number>()
+  let pos = 0
+  for (let i = 0; i + 1 < chars.length; i += 2) {
+    grams.set(chars[i] + chars[i + 1], pos)
+    let count
+    ;[count, pos] = readVarint(data.postings, pos)
+    // Skip the list: every varint ends with the first character below 32
+    while (count > 0) if (VARINT_VALUE[data.postings.charCodeAt(pos++)] < 32) count--
+  }
+  return { questions: data.questions, fields: data.fields, grams, postings: data.postings }
+}
+
+/** Question index → field mask for one gram. */
+export function decodePostings(index: SearchIndex, gram: string): Map<number, number> {
+  const docs = new Map<number, number>()
+  const offset = index.grams.get(gram)
+  if (offset === undefined) return docs
+  let [count, pos] = readVarint(index.postings, offset)
+  let doc = 0
+  for (let n = 0; n < count; n++) {
+    let value
+    ;[value, pos] = readVarint(index.postings, pos)
+    doc += Math.floor(value / 2 ** MASK_BITS)
+    docs.set(doc, value % 2 ** MASK_BITS)
+  }
+  return docs
+}
+
+/** Runs of letters / digits of the NFKC-normalised, lower-cased text (as the index builder splits). */
+export function textRuns(text: string): string[][] {
+  return (text.normalize('NFKC').toLowerCase().match(/[\p{L}\p{N}]+/gu) ?? []).map((run) => Array.from(run))
+}
+
+// One query term: the bigrams of the query, or every gram containing a single-character run
+function termPostings(index: SearchIndex, run: string[]): Map<number, number>[] {
+  if (run.length > 1) {
+    const terms = new Set<string>()
+    for (let i = 0; i + 1 < run.length; i++) terms.add(run[i] + run[i + 1])
+    return [...terms].map((gram) => decodePostings(index, gram))
+  }
+  const merged = new Map<number, number>()
+  for (const gram of index.grams.keys()) {
+    if (!gram.includes(run[0])) continue
+    for (const [doc, mask] of decodePostings(index, gram)) merged.set(doc, (merged.get(doc) ?? 0) | mask)
+  }
+  return [merged]
+}
+
+function maskWeight(index: SearchIndex, mask: number): number {
+  let best = 0
+  index.fields.forEach((field, bit) => {
+    if (mask & (1 << bit)) best = Math.max(best, FIELD_WEIGHTS[field] ?? 1)
+  })
+  return best
+}
+
+/**
+ * Questions containing every bigram of the query, best first. Each term adds its
+ * idf times the weight of the best field it was found in; questions where all
+ * terms share a field (most likely a contiguous phrase) score double.
+ * Returns null when the query has no letters or digits.
+ */
+export function searchQuestions(index: SearchIndex, query: string): SearchHit[] | null {
+  const runs = textRuns(query)
+  if (runs.length === 0) return null
+  const terms = runs.flatMap((run) => termPostings(index, run)).sort((a, b) => a.size - b.size)
+
+  const hits: SearchHit[] = []
+  for (const doc of terms[0].keys()) {
+    let score = 0
+    let shared = ~0
+    let matched = true
+    for (const term of terms) {
+      const mask = term.get(doc)
+      if (mask === undefined) {
+        matched = false
+        break
+      }
+      score += Math.log(1 + index.questions / term.size) * maskWeight(index, mask)
+      shared &= mask
+    }
+    if (!matched) continue
+    const fields = index.fields.filter((_, bit) => shared & (1 << bit))
+    hits.push({ index: doc, score: fields.length > 0 ? score * 2 : score, fields })
+  }
+  return hits.sort((a, b) => b.score - a.score || a.index - b.index)
+}
@@ -0,0 +1,58 @@
+import { describe, it, expect } from 'vitest'
+import { bucketEntries, bucketSize, isSelected } from '../offline'
+import type { PrecacheManifest } from '../types'
+
+const manifest: PrecacheManifest = {
+  version: 1,
+  revision: 'r',
+  buckets: {
+    core: {
+      budget: 2_500_000,
+      bytes: 600,
+      entries: [
+        { url: 'data/general.json', revision: 'a', bytes: 200, banks: ['general'] },
+        { url: 'data/professional.json', revision: 'b', bytes: 300, banks: ['professional'] },
+        { url: 'data/answer_patterns.json', revision: 'c', bytes: 100, banks: [] },
+      ],
+    },
+    study: { budget: 4_000_000, bytes: 0, entries: [] },
+    images: {
+      budget: 60_000_000,
+      bytes: 50,
+      entries: [
+        { url: 'https://img.example/1-480.webp', revision: 'd', bytes: 50, banks: ['general', 'professional'], group: '1' },
+        { url: 'https://img.example/2.webp', revision: 'e', bytes: null, banks: ['professional'] },
+      ],
+    },
+  },
+}
+
+describe('bucketEntries', () => {
+  it('keeps the bank\'s own and shared entries', () => {
+    expect(bucketEntries(manifest, 'core', 'general').map((e) => e.url)).toEqual([
+      'data/general.json',
+      'data/answer_patterns.json',
+    ])
+  })
+
+  it('includes images shared between banks', () => {
+    expect(bucketEntries(manifest, 'images', 'general')).toHaveLength(1)
+    expect(bucketEntries(manifest, 'images', 'professional')).toHaveLength(2)
+  })
+})
+
+describe('bucketSize', () => {
+  it('sums known sizes and counts unknown ones', () => {
+    expect(bucketSize(manifest, 'core', 'professional')).toEqual({ entries: 2, bytes: 400, unknown: 0 })
+    expect(bucketSize(manifest, 'images', 'professional')).toEqual({ entries: 2, bytes: 50, unknown: 1 })
+    expect(bucketSize(manifest, 'study', 'general')).toEqual({ entries: 0, bytes: 0, unknown: 0 })
+  })
+})
+
+describe('isSelected', () => {
+  it('matches a bank or the wildcard', () => {
+    expect(isSelected(['core:*'], 'core', 'renewal')).toBe(true)
+    expect(isSelected(['core:*', 'images:general'], 'images', 'general')).toBe(true)
+    expect(isSelected(['core:*', 'images:general'], 'images', 'professional')).toBe(false)
+  })
+})
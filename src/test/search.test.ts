@@ -0,0 +1,72 @@
+import { describe, it, expect } from 'vitest'
+import { loadSearchIndex, decodePostings, searchQuestions, textRuns } from '../search'
+import type { SearchIndexData } from '../types'
+
+// Output of scripts/generate_search_index.py build_index() for three questions:
+//   0: 視距外飛航 / 核准, 禁止
+//   1: 夜間飛航 / 可以, 不可   (study aid: keywords 視距, explanation 目視範圍)
+//   2: GPS 訊號 / 視距內, 無
+const sampleData: SearchIndexData = {
+  version: 1,
+  questions: 3,
+  fields: ['question', 'options', 'keywords', 'mnemonic', 'explanation', 'wrong_options'],
+  grams: 'gpps不可可以外飛夜間核准目視禁止範圍視範視距訊號距內距外間飛飛航',
+  postings: 'BhEBhEBiCBiCBBBhCBCBwCBCBwCBwCDBkCiCBhEBiEBBBhCCBhC',
+}
+
+describe('loadSearchIndex', () => {
+  it('indexes every gram', () => {
+    const index = loadSearchIndex(sampleData)!
+    expect(index.grams.size).toBe(17)
+    expect(index.grams.has('視距')).toBe(true)
+  })
+
+  it('rejects an unknown version', () => {
+    expect(loadSearchIndex({ ...sampleData, version: 2 })).toBeNull()
+  })
+})
+
+describe('decodePostings', () => {
+  const index = loadSearchIndex(sampleData)!
+
+  it('decodes delta-encoded questions with their field masks', () => {
+    // question of 0, keywords of 1, options of 2
+    expect([...decodePostings(index, '視距')]).toEqual([[0, 1], [1, 4], [2, 2]])
+  })
+
+  it('returns an empty map for an unknown gram', () => {
+    expect(decodePostings(index, '颱風').size).toBe(0)
+  })
+})
+
+describe('textRuns', () => {
+  it('normalises width and case and splits on punctuation', () => {
+    expect(textRuns('ＧＰＳ，訊號')).toEqual([['g', 'p', 's'], ['訊', '號']])
+  })
+})
+
+describe('searchQuestions', () => {
+  const index = loadSearchIndex(sampleData)!
+
+  it('returns null for a query without letters or digits', () => {
+    expect(searchQuestions(index, ' ，')).toBeNull()
+  })
+
+  it('requires every bigram of the query', () => {
+    expect(searchQuestions(index, '視距外')!.map((h) => h.index)).toEqual([0])
+  })
+
+  it('ranks question hits above study-aid hits', () => {
+    const hits = searchQuestions(index, '視距')!
+    expect(hits.map((h) => h.index)).toEqual([0, 2, 1])
+    expect(hits[2].fields).toEqual(['keywords'])
+  })
+
+  it('searches study-aid text', () => {
+    expect(searchQuestions(index, '目視範圍')!.map((h) => h.index)).toEqual([1])
+  })
+
+  it('matches a single character through the grams containing it', () => {
+    expect(searchQuestions(index, '航')!.map((h) => h.index).sort()).toEqual([0, 1])
+  })
+})
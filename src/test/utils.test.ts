@@ -1,6 +1,6 @@
-import { describe, it, expect } from 'vitest'
-import { shuffleArray, normalizeBankData } from '../utils'
-import type { Question, BankData } from '../types'
+import { describe, it, expect, vi, afterEach } from 'vitest'
+import { shuffleArray, normalizeBankData, imageSrc, buildSrcSet, fetchOptionalJson, computeBankStats, decodeExam } from '../utils'
+import type { Question, BankData, ImageAsset, MockExamsData } from '../types'
 
 const sampleQuestions: Question[] = [
   { id: 1, question: 'Q1', options: { A: 'a', B: 'b', C: 'c', D: 'd' }, answer: 'A', chapter: 'Ch1' },
@@ -55,3 +55,104 @@ describe('normalizeBankData', () => {
     expect(result.questions).toStrictEqual(sampleQuestions)
   })
 })
+
+const sampleAsset: ImageAsset = {
+  src: 'https://cdn/1_1024w.webp',
+  width: 1024,
+  height: 1024,
+  variants: [
+    { url: 'https://cdn/1_320w.avif', type: 'image/avif', width: 320, height: 320, bytes: 9000 },
+    { url: 'https://cdn/1_320w.webp', type: 'image/webp', width: 320, height: 320, bytes: 12000 },
+    { url: 'https://cdn/1_1024w.webp', type: 'image/webp', width: 1024, height: 1024, bytes: 90000 },
+  ],
+}
+
+describe('imageSrc', () => {
+  it('returns legacy string entries unchanged', () => {
+    expect(imageSrc('https://cdn/1.webp')).toBe('https://cdn/1.webp')
+  })
+
+  it('returns the widest source of a variant entry', () => {
+    expect(imageSrc(sampleAsset)).toBe('https://cdn/1_1024w.webp')
+  })
+})
+
+describe('buildSrcSet', () => {
+  it('lists variants of the requested type with width descriptors', () => {
+    expect(buildSrcSet(sampleAsset)).toBe('https://cdn/1_320w.webp 320w, https://cdn/1_1024w.webp 1024w')
+    expect(buildSrcSet(sampleAsset, 'image/avif')).toBe('https://cdn/1_320w.avif 320w')
+  })
+
+  it('returns an empty string for legacy entries', () => {
+    expect(buildSrcSet('https://cdn/1.webp')).toBe('')
+  })
+})
+
+describe('fetchOptionalJson', () => {
+  afterEach(() => {
+    vi.unstubAllGlobals()
+  })
+
+  it('parses the body of a successful response', async () => {
+    vi.stubGlobal('fetch', vi.fn().mockResolvedValue(new Response('{"related":[[1]]}', { status: 200 })))
+    expect(await fetchOptionalJson('data/x.json')).toEqual({ related: [[1]] })
+  })
+
+  it('returns null when the file has not been generated', async () => {
+    vi.stubGlobal('fetch', vi.fn().mockResolvedValue(new Response('', { status: 404 })))
+    expect(await fetchOptionalJson('data/x.json')).toBeNull()
+  })
+
+  it('throws on other errors', async () => {
+    vi.stubGlobal('fetch', vi.fn().mockResolvedValue(new Response('', { status: 500 })))
+    await expect(fetchOptionalJson('data/x.json')).rejects.toThrow('HTTP 500')
+  })
+})
+
+describe('computeBankStats', () => {
+  const questions: Question[] = [
+    ...sampleQuestions,
+    { id: 1, question: 'Q4', options: { A: 'a', B: 'b', C: 'c', D: '以上皆是' }, answer: 'D', chapter: 'Ch2', can_memorize_directly: true },
+    { id: 2, question: 'Q5', options: { A: 'a', B: 'b', C: 'c', D: '以上皆是' }, answer: 'A', chapter: 'Ch1' },
+  ]
+
+  it('counts chapters in order of first appearance', () => {
+    expect(computeBankStats(questions).chapters).toEqual([
+      { chapter: 'Ch1', total: 3, memorizable: 0 },
+      { chapter: 'Ch2', total: 2, memorizable: 1 },
+    ])
+  })
+
+  it('counts correct answer letters', () => {
+    expect(computeBankStats(questions).answers).toEqual({ A: 2, B: 1, C: 1, D: 1 })
+  })
+
+  it('splits all-above questions by whether it is the answer', () => {
+    expect(computeBankStats(questions).all_above).toEqual({ correct: [3], trap: [4] })
+  })
+})
+
+describe('decodeExam', () => {
+  // scripts/generate_mock_exams.py output for papers [0, 1, 2], [300, 4, 5], [7, 8, 65535]
+  const data: MockExamsData = {
+    version: 1,
+    questions: 65536,
+    seed: 0,
+    size: 3,
+    count: 3,
+    skip_memorizable: false,
+    chapters: [{ chapter: 'Ch1', count: 3 }],
+    exams: 'AAABAAIALAEEAAUABwAIAP//',
+  }
+
+  it('decodes each paper from its own base64 span', () => {
+    expect(decodeExam(data, 0)).toEqual([0, 1, 2])
+    expect(decodeExam(data, 1)).toEqual([300, 4, 5])
+    expect(decodeExam(data, 2)).toEqual([7, 8, 65535])
+  })
+
+  it('returns null for a paper number out of range', () => {
+    expect(decodeExam(data, 3)).toBeNull()
+    expect(decodeExam(data, -1)).toBeNull()
+  })
+})
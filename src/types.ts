@@ -25,6 +25,7 @@ export interface QuizSettings {
   chapters: string[]
   count: number | 'all'
   instantFeedback: boolean
+  examNo?: number // set when the queue is a pre-built mock exam paper
 }
 
 export interface UserRecord {
@@ -45,11 +46,118 @@ export interface StudyAid {
   mnemonic: string
   explanation: string
   wrong_options: Partial<Record<OptionKey, string>>
+  reused_from?: string  // "<bank>:<index>" when copied from a near-duplicate question of another bank
+  similarity?: number
 }
 
 export type StudyAids = Record<string, StudyAid>
 
-export type ImageMap = Record<string, string>
+// public/data/<bank>_search.json, written by scripts/generate_search_index.py; decoded in src/search.ts
+export interface SearchIndexData {
+  version: number
+  questions: number
+  fields: string[]
+  grams: string
+  postings: string
+}
+
+// public/data/<bank>_related.json, written by scripts/generate_related.py
+export interface RelatedData {
+  version: number
+  questions: number
+  related: number[][] // per question index: related question indices, best first
+}
+
+// public/data/<bank>_stats.json, written by update_question_bank.py (uav-quiz-tools whitelist)
+export interface ChapterStats {
+  chapter: string
+  total: number
+  memorizable: number
+}
+
+export interface BankStats {
+  version: number
+  questions: number
+  memorizable: number
+  chapters: ChapterStats[] // in order of first appearance
+  answers: Record<OptionKey, number> // correct-answer letter distribution
+  all_above: {
+    correct: number[] // question indices whose answer is 以上皆是
+    trap: number[] // question indices offering 以上皆是 as a wrong option
+  }
+}
+
+// public/data/<bank>_exams.json, written by scripts/generate_mock_exams.py; decoded by decodeExam() in src/utils.ts
+export interface MockExamsData {
+  version: number
+  questions: number
+  seed: number
+  size: number // questions per paper
+  count: number // papers
+  skip_memorizable: boolean
+  chapters: { chapter: string; count: number }[]
+  exams: string // base64 of count × size uint16 LE question indices
+}
+
+// public/precache-manifest.json, written by scripts/generate_precache_manifest.py; read by public/sw.js
+export type PrecacheBucket = 'core' | 'study' | 'images'
+
+export interface PrecacheEntry {
+  url: string // relative to the site root for data files, absolute for images
+  revision: string
+  bytes: number | null // null: legacy image without a recorded size
+  banks: string[] // [] = every bank
+  group?: string // variants of one image
+}
+
+export interface PrecacheManifest {
+  version: number
+  revision: string
+  buckets: Record<PrecacheBucket, { budget: number; bytes: number; entries: PrecacheEntry[] }>
+}
+
+// public/data/answer_patterns.json, written by scripts/answer_patterns.py
+export interface HeuristicScore {
+  id: string
+  label: string
+  covered: number // questions the heuristic picks an answer for
+  correct: number
+}
+
+export interface AnswerPatterns {
+  version: number
+  banks: Record<
+    string,
+    {
+      questions: number
+      answers: Record<OptionKey, number>
+      answer_skew_p: number // chi-square p-value of the answer letters vs uniform
+      heuristics: HeuristicScore[]
+    }
+  >
+}
+
+export interface ImageVariant {
+  url: string
+  type: string
+  width: number
+  height: number
+  bytes: number
+}
+
+export interface ImageAsset {
+  src: string
+  width: number
+  height: number
+  variants: ImageVariant[]
+  /** 約 16px 寬的 WebP data URI，實際圖片載入前先模糊顯示 */
+  placeholder?: string
+}
+
+/** 舊版 manifest 為單一 URL 字串；新版含多解析度 variants */
+export type ImageEntry = string | ImageAsset
+
+export type ImageMap = Record<string, ImageEntry>
 
 export const BANK_CONFIGS: BankConfig[] = [
   { id: 'general', label: '普通操作證', file: `${import.meta.env.BASE_URL}data/general.json` },
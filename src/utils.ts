@@ -1,4 +1,4 @@
-import { BankData, Question } from './types'
+import { BankData, BankStats, ImageEntry, MockExamsData, Question } from './types'
 
 export function shuffleArray<T>(array: T[]): T[] {
   const arr = [...array]
@@ -12,3 +12,81 @@ export function shuffleArray<T>(array: T[]): T[] {
 export function normalizeBankData(raw: BankData | Question[]): BankData {
   return Array.isArray(raw) ? { questions: raw, answer_option_whitelist: [] } : raw
 }
+
+export function imageSrc(entry: ImageEntry): string {
+  return typeof entry === 'string' ? entry : entry.src
+}
+
+export function buildSrcSet(entry: ImageEntry, type = 'image/webp'): string {
+  if (typeof entry === 'string') return ''
+  return entry.variants
+    .filter((v) => v.type === type)
+    .map((v) => `${v.url} ${v.width}w`)
+    .join(', ')
+}
+
+/** GET a JSON file that may not have been generated yet: 404 → null, other errors throw. */
+export async function fetchOptionalJson<T>(url: string): Promise<T | null> {
+  const res = await fetch(url)
+  if (res.status === 404) return null
+  if (!res.ok) throw new Error(`HTTP ${res.status}`)
+  return res.json() as Promise<T>
+}
+
+/**
+ * Question indices of mock exam paper `n` (0-based). Only the base64 span
+ * covering that paper is decoded (every 4 characters hold 3 bytes).
+ */
+export function decodeExam(data: MockExamsData, n: number): number[] | null {
+  if (data.version !== 1 || !Number.isInteger(n) || n < 0 || n >= data.count) return null
+  const start = n * data.size * 2
+  const from = Math.floor(start / 3)
+  const binary = atob(data.exams.slice(from * 4, Math.ceil((start + data.size * 2) / 3) * 4))
+  const skip = start - from * 3
+  const indices: number[] = []
+  for (let i = 0; i < data.size; i++) {
+    const pos = skip + i * 2
+    indices.push(binary.charCodeAt(pos) | (binary.charCodeAt(pos + 1) << 8))
+  }
+  return indices
+}
+
+export const ALL_ABOVE_TEXT = '以上皆是'
+
+/**
+ * Same single pass as compute_stats() in update_question_bank.py; used when
+ * <bank>_stats.json is missing or was built for a different bank size.
+ */
+export function computeBankStats(questions: Question[]): BankStats {
+  const chapters = new Map<string, BankStats['chapters'][number]>()
+  const answers: BankStats['answers'] = { A: 0, B: 0, C: 0, D: 0 }
+  const correct: number[] = []
+  const trap: number[] = []
+  let memorizable = 0
+
+  questions.forEach((q, index) => {
+    let chapter = chapters.get(q.chapter)
+    if (!chapter) {
+      chapter = { chapter: q.chapter, total: 0, memorizable: 0 }
+      chapters.set(q.chapter, chapter)
+    }
+    chapter.total++
+    if (q.can_memorize_directly) {
+      chapter.memorizable++
+      memorizable++
+    }
+    if (q.answer in answers) answers[q.answer]++
+    if (Object.values(q.options).some((text) => text.includes(ALL_ABOVE_TEXT))) {
+      ;(q.options[q.answer]?.includes(ALL_ABOVE_TEXT) ? correct : trap).push(index)
+    }
+  })
+
+  return {
+    version: 1,
+    questions: questions.length,
+    memorizable,
+    chapters: [...chapters.values()],
+    answers,
+    all_above: { correct, trap },
+  }
+}
@@ -0,0 +1,251 @@
+"""
+uav_quiz_tools.py
+
+Single entry point for the data tools (`uav-quiz-tools`, declared in pyproject.toml).
+
+Each subcommand imports only what it needs. The AI / PDF / upload subcommands
+run the existing script in-process (its own argparse handles the options), so
+pdfplumber, anthropic, google.genai, firebase_admin and PIL are loaded only by
+the command that uses them. `--help` (also per subcommand, read statically from
+the script's source), `status`, `stats`, `whitelist` and `manifest` never touch
+those SDKs. Startup time is tracked by scripts/bench/bench_startup.py.
+
+Usage:
+    uv run uav-quiz-tools --help
+    uv run uav-quiz-tools status              # pipeline plan + image spend, offline
+    uv run uav-quiz-tools stats               # question / study-aid / image coverage
+    uv run uav-quiz-tools whitelist --bank general
+    uv run uav-quiz-tools analyze --bank general --preclassify
+    uv run uav-quiz-tools images --budget-twd 800
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parent
+DATA_DIR = Path("public/data")
+BANKS = ("general", "professional", "renewal", "renewal_basic")
+
+SCRIPTS = {
+    # subcommand: (script, one-line help)
+    "update": ("update_question_bank.py", "download the CAA PDFs and rebuild public/data/<bank>.json"),
+    "study-aids": ("generate_study_aids.py", "generate study aids with Claude (ANTHROPIC_API_KEY)"),
+    "analyze": ("scripts/images/analyze_questions_gemini.py", "classify questions for image generation (Gemini)"),
+    "images": ("scripts/images/generate_images_v2.py", "generate question images (Gemini, budgeted)"),
+    "dedupe": ("scripts/images/dedupe_images.py", "find near-duplicate images and share them"),
+    "upload": ("scripts/images/convert_and_upload.py", "convert PNG → WebP and upload to Firebase Storage"),
+    "manifest": ("scripts/images/generate_image_manifest.py", "write public/data/<bank>_images.json"),
+    "near-duplicates": ("scripts/images/near_duplicates.py", "cross-bank near-duplicates: reusable aids and images"),
+    "search-index": ("scripts/generate_search_index.py", "write public/data/<bank>_search.json (bigram index)"),
+    "related": ("scripts/generate_related.py", "write public/data/<bank>_related.json (TF-IDF neighbours)"),
+    "exams": ("scripts/generate_mock_exams.py", "write public/data/<bank>_exams.json (seeded mock exam papers)"),
+    "patterns": ("scripts/answer_patterns.py", "score answer-pattern heuristics, write answer_patterns.json"),
+    "reading": ("scripts/render_reading_pages.py", "render static reading pages to public/read/ and update the sitemap"),
+    "precache": ("scripts/generate_precache_manifest.py", "write public/precache-manifest.json for the service worker (size budgets)"),
+    "db": ("scripts/data_store.py", "SQLite/FTS5 store of all artifacts: search, questions, report, sql, export"),
+    "pipeline": ("scripts/images/image_pipeline.py", "streaming generate → convert → upload → manifest"),
+    "build": ("scripts/build_pipeline.py", "incremental build of the whole data pipeline"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Script subcommands
+# ---------------------------------------------------------------------------
+
+def static_help(command: str, script: Path) -> str:
+    """Help text for a script without importing it: module docstring + its add_argument() calls."""
+    import ast
+
+    tree = ast.parse(script.read_text(encoding="utf-8"))
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            value = node.value
+            if isinstance(value, ast.Call) and len(value.args) == 1:  # e.g. Path("ledger.jsonl")
+                value = value.args[0]
+            if isinstance(value, ast.Constant):
+                constants[node.targets[0].id] = value.value
+
+    def text(node: ast.AST) -> str:
+        if isinstance(node, ast.Constant):
+            return str(node.value)
+        if isinstance(node, ast.JoinedStr):
+            return "".join(
+                str(v.value) if isinstance(v, ast.Constant)
+                else str(constants.get(v.value.id, "…")) if isinstance(v.value, ast.Name)
+                else "…"
+                for v in node.values
+            )
+        return ast.unparse(node)
+
+    lines = [f"usage: uav-quiz-tools {command} [options]", ""]
+    doc = ast.get_docstring(tree)
+    if doc:
+        lines += [doc, ""]
+    options = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, "attr", None) == "add_argument":
+            flags = ", ".join(text(a) for a in node.args)
+            help_kw = next((k.value for k in node.keywords if k.arg == "help"), None)
+            options.append((node.lineno, flags, text(help_kw) if help_kw is not None else ""))
+    if options:
+        lines.append("options:")
+        for _, flags, help_text in sorted(options):
+            lines.append(f"  {flags:<24} {help_text}")
+    return "\n".join(lines)
+
+
+def run_script(command: str, argv: list[str]) -> None:
+    """Run a pipeline script as __main__, exactly as `uv run <script> argv...` would."""
+    import runpy
+
+    script = ROOT / SCRIPTS[command][0]
+    if not script.exists():
+        sys.exit(f"{script} not found — uav-quiz-tools runs from a checkout of the repository (uv sync).")
+    if any(a in ("-h", "--help") for a in argv):
+        print(static_help(command, script))
+        return
+    os.chdir(ROOT)
+    sys.path.insert(0, str(script.parent))
+    sys.argv = [str(script), *argv]
+    runpy.run_path(str(script), run_name="__main__")
+
+
+# ---------------------------------------------------------------------------
+# Pure-JSON subcommands
+# ---------------------------------------------------------------------------
+
+def read_json(path: Path):
+    import json
+
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+
+
+def cmd_whitelist(args: argparse.Namespace) -> None:
+    """Recompute answer_option_whitelist / can_memorize_directly and <bank>_stats.json from the bank JSON (no PDF parsing)."""
+    import copy
+    import json
+
+    sys.path.insert(0, str(ROOT))
+    from update_question_bank import compute_stats, process_whitelist, write_stats
+
+    stale = []
+    for bank in args.bank or BANKS:
+        path = DATA_DIR / f"{bank}.json"
+        data = read_json(path)
+        if data is None:
+            print(f"[{bank}] 跳過：找不到 {path}")
+            continue
+        output = process_whitelist(copy.deepcopy(data["questions"]))
+        stats_path = DATA_DIR / f"{bank}_stats.json"
+        stats = compute_stats(output["questions"])
+        # Only the recomputed fields count; other keys (e.g. chapter_note) stay as they are, in place
+        changed = any(data.get(key) != value for key, value in output.items())
+        stats_changed = stats != read_json(stats_path)
+        if not args.check:
+            if changed:
+                merged = {**data, **output}
+                path.write_text(json.dumps(merged, ensure_ascii=False, indent=2), encoding="utf-8")
+            if stats_changed:
+                write_stats(stats, str(stats_path))
+        changed = changed or stats_changed
+        state = "不一致" if changed and args.check else "已更新" if changed else "無變更"
+        print(f"[{bank}] {len(output['questions'])} 題，白名單 {len(output['answer_option_whitelist'])} 項（{state}）")
+        if changed:
+            stale.append(bank)
+    if stale and args.check:
+        sys.exit(1)
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    from collections import Counter
+
+    sys.path.insert(0, str(ROOT / "scripts" / "images"))
+    from question_bank import QuestionBank
+
+    print(f"{'bank':<14} {'questions':>9} {'whitelist':>9} {'memorize':>9}")
+    for bank in map(QuestionBank.load, BANKS):
+        if not bank.exists():
+            continue
+        memorize = sum(1 for q in bank if q.can_memorize_directly)
+        print(f"{bank.bank:<14} {len(bank):>9} {len(bank.whitelist):>9} {memorize:>9}")
+
+    bank = QuestionBank.load("professional")
+    total = len(bank) if bank.exists() else 0
+    analysis = bank.image_analysis
+    tiers = Counter(str(v.get("tier")) for v in analysis.values())
+    shared = sum(1 for v in analysis.values() if v.get("shared_with") is not None)
+    wanted = tiers["1"] + tiers["2"]
+    print()
+    print(f"study aids     {sum(1 for v in bank.study_aids.values() if v)}/{total}")
+    print(f"analysis       {len(analysis)}/{total}  (tier 1: {tiers['1']}, tier 2: {tiers['2']}, tier 3: {tiers['3']})")
+    print(f"images         {len(bank.images)}/{wanted} tier 1/2 questions ({shared} shared)")
+
+
+def cmd_status(args: argparse.Namespace) -> None:
+    import json
+
+    sys.path.insert(0, str(ROOT / "scripts"))
+    import build_pipeline as bp
+
+    os.chdir(ROOT)
+    state = bp.load_state()
+    stages = bp.link_stages(bp.STAGES)
+    fp = bp.Fingerprinter(state.setdefault("hashes", {}), state.setdefault("stages", {}), offline=True)
+    print(f"{'stage':<11} {'action':<6} {'last built':<20} reason")
+    for name, action, reason in bp.plan(stages, list(stages), state, fp, set(), set()):
+        finished = state["stages"].get(name, {}).get("finished", "-")
+        print(f"{name:<11} {action:<6} {finished:<20} {reason}")
+
+    ledger = Path("image_cost_ledger.jsonl")
+    if ledger.exists():
+        entries = [json.loads(line) for line in ledger.read_text(encoding="utf-8").splitlines() if line.strip()]
+        usd = sum(e.get("usd", 0.0) for e in entries)
+        print(f"\nimage spend so far: {len(entries)} images, ${usd:.2f} USD ({ledger})")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="uav-quiz-tools", description="UAV license quiz data tools",
+        epilog="Script subcommands accept the script's own options; `uav-quiz-tools <command> --help` lists them.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    p = sub.add_parser("status", help="pipeline plan and image spend (offline, no API calls)")
+    p.set_defaults(func=cmd_status)
+    p = sub.add_parser("stats", help="question, study-aid, analysis and image coverage")
+    p.set_defaults(func=cmd_stats)
+    p = sub.add_parser("whitelist", help="recompute answer whitelists and <bank>_stats.json from public/data/<bank>.json")
+    p.add_argument("--bank", nargs="+", choices=BANKS, help="banks to process (default: all)")
+    p.add_argument("--check", action="store_true", help="only verify; exit 1 if a file is out of date")
+    p.set_defaults(func=cmd_whitelist)
+
+    for command, (_, help_text) in SCRIPTS.items():
+        p = sub.add_parser(command, help=help_text, add_help=False)
+        p.set_defaults(func=None)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    # Script subcommands pass everything after the name straight through
+    if argv and argv[0] in SCRIPTS:
+        run_script(argv[0], argv[1:])
+        return
+    args = build_parser().parse_args(argv)
+    os.chdir(ROOT)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
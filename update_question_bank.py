@@ -1,6 +1,7 @@
 """
 update_question_bank.py
-自動從 CAA 官方網站爬取最新 PDF，解析題目，並產出四個版本的 JSON。
+自動從 CAA 官方網站爬取最新 PDF，解析題目，並產出四個版本的 JSON
+（<bank>.json 題庫與 <bank>_stats.json 統計）。
 
 執行方式：uv run update_question_bank.py
 """
@@ -9,9 +10,9 @@ import os
 import re
 from urllib.parse import urljoin
 
-import pdfplumber
-import requests
-from bs4 import BeautifulSoup
+# pdfplumber / requests / bs4 are imported inside the functions that use them,
+# so process_whitelist() / compute_stats() can be reused (uav-quiz-tools whitelist)
+# without loading them.
 
 # ==========================================
 # 常數設定
@@ -20,6 +21,8 @@ from bs4 import BeautifulSoup
 CAA_URL = "https://www.caa.gov.tw/Article.aspx?a=3833&lang=1"
 CAA_BASE = "https://www.caa.gov.tw"
 OUTPUT_DIR = "public/data"
+STATS_VERSION = 1
+ALL_ABOVE_TEXT = "以上皆是"
 
 BANK_CONFIGS = [
     {
@@ -62,6 +65,9 @@ def scrape_pdf_links(url: str) -> dict[str, str]:
     從 CAA 官方頁面解析 PDF 下載連結。
     回傳 {config_id: 完整下載URL}
     """
+    import requests
+    from bs4 import BeautifulSoup
+
     print(f"正在從 {url} 爬取 PDF 連結...")
     response = requests.get(url, timeout=30)
     response.raise_for_status()
@@ -117,6 +123,8 @@ def download_pdf(url: str, dest_path: str) -> None:
     下載 PDF 到指定路徑。
     若檔案已存在且 Content-Length 相符則跳過下載。
     """
+    import requests
+
     # 先取得 Content-Length
     head = requests.head(url, timeout=30, allow_redirects=True)
     remote_size = int(head.headers.get("Content-Length", -1))
@@ -148,6 +156,8 @@ def parse_pdf_to_questions(pdf_path: str) -> list[dict]:
     使用 pdfplumber 解析 PDF 題庫，回傳原始題目列表。
     格式同 question_bank.json：[{id, question, options, answer, chapter}, ...]
     """
+    import pdfplumber
+
     print(f"  正在解析 PDF：{pdf_path} ...")
 
     full_text = ""
@@ -301,6 +311,60 @@ def process_whitelist(questions: list[dict]) -> dict:
     }
 
 
+# ==========================================
+# 函式五：統計題庫策略分析
+# ==========================================
+
+def compute_stats(questions: list[dict]) -> dict:
+    """
+    一次走訪計算前端各畫面要用的統計（須在 process_whitelist 之後呼叫）：
+    章節題數／可無腦背題數、正解選項分布、「以上皆是」題的分類（題目索引）。
+    輸出至 public/data/<bank>_stats.json，前端不必每次重新掃描整個題庫。
+    """
+    chapters: dict[str, dict] = {}  # dict 保留章節首次出現的順序
+    answers = {key: 0 for key in "ABCD"}
+    all_above_correct: list[int] = []
+    all_above_trap: list[int] = []
+    memorizable = 0
+
+    for index, question in enumerate(questions):
+        chapter = chapters.setdefault(
+            question.get("chapter", ""),
+            {"chapter": question.get("chapter", ""), "total": 0, "memorizable": 0},
+        )
+        chapter["total"] += 1
+        if question.get("can_memorize_directly"):
+            chapter["memorizable"] += 1
+            memorizable += 1
+
+        ans_key = question.get("answer")
+        if ans_key in answers:
+            answers[ans_key] += 1
+
+        options = question.get("options", {})
+        if any(ALL_ABOVE_TEXT in text for text in options.values()):
+            if ALL_ABOVE_TEXT in options.get(ans_key, ""):
+                all_above_correct.append(index)
+            else:
+                all_above_trap.append(index)
+
+    return {
+        "version": STATS_VERSION,
+        "questions": len(questions),
+        "memorizable": memorizable,
+        "chapters": list(chapters.values()),
+        "answers": answers,
+        "all_above": {"correct": all_above_correct, "trap": all_above_trap},
+    }
+
+
+def write_stats(stats: dict, path: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
 # ==========================================
 # 主程式
 # ==========================================
@@ -347,10 +411,15 @@ def main():
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(output, f, ensure_ascii=False, indent=2)
 
+        stats_path = f"{OUTPUT_DIR}/{config_id}_stats.json"
+        stats = compute_stats(output["questions"])
+        write_stats(stats, stats_path)
+
         print(
-            f"  完成：{len(questions)} 題，白名單 {len(output['answer_option_whitelist'])} 項"
+            f"  完成：{len(questions)} 題，白名單 {len(output['answer_option_whitelist'])} 項，"
+            f"可無腦背 {stats['memorizable']} 題"
         )
-        print(f"  輸出至：{output_path}\n")
+        print(f"  輸出至：{output_path}、{stats_path}\n")
 
     print("=" * 50)
     print("所有版本更新完成！")